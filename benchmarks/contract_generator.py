@@ -0,0 +1,107 @@
+import argparse
+import sys
+
+HEADER = "def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:"
+
+def _guard(clause, level, and_width, sigs):
+    terms = []
+    for j in range(and_width):
+        if j < sigs:
+            terms.append(f'pylutus_sig("party{clause}_{level}_{j}")')
+        elif (j - sigs) % 2 == 0:
+            terms.append(f'pylutus_redeemer("action{clause}_{j}")')
+        else:
+            terms.append(f'pylutus_datum("state{clause}_{j}")')
+    return " and ".join(terms)
+
+# Builds a synthetic contract made of `clauses` top-level blocks chained with
+# elif, so every clause can run. Each block nests `depth` ifs whose guards are
+# `and_width`-term and-chains (the first `sigs` terms are signature checks);
+# the innermost body makes `pays` payments.
+def generate_contract(depth=1, and_width=2, pays=1, sigs=1, clauses=1):
+    lines = [HEADER]
+    for clause in range(clauses):
+        for level in range(depth):
+            indent = "    " * (level + 1)
+            keyword = "elif" if level == 0 and clause else "if"
+            lines.append(f"{indent}{keyword} {_guard(clause, level, and_width, sigs)}:")
+        body = "    " * (depth + 1)
+        for k in range(pays):
+            lines.append(f'{body}pylutus_pay("payee{clause}_{k}", {2000000 + k})')
+        lines.append(f"{body}return True")
+        for level in range(depth - 1, 0, -1):
+            indent = "    " * (level + 1)
+            lines.append(f"{indent}else:")
+            lines.append(f"{indent}    return False")
+    lines.append("    else:")
+    lines.append("        return False")
+    lines.append("    return False")
+    return "\n".join(lines) + "\n"
+
+VALUES = ("a", "b", "c")
+PARTIES = ("k1", "k2", "k3")
+
+def _random_guard(rng):
+    terms = []
+    for _ in range(rng.randint(1, 3)):
+        roll = rng.random()
+        if roll < 0.3:
+            terms.append(f'pylutus_redeemer("{rng.choice(VALUES)}")')
+        elif roll < 0.5:
+            terms.append(f'pylutus_datum("{rng.choice(VALUES)}")')
+        elif roll < 0.75:
+            terms.append(f'pylutus_sig("{rng.choice(PARTIES)}")')
+        elif roll < 0.9:
+            terms.append(f'redeemer {rng.choice(["==", "!=", "<", ">"])} datum')
+        else:
+            terms.append(rng.choice(["True", "False", "1 == 1", "2 < 1"]))
+    return " and ".join(terms)
+
+def _random_block(rng, depth, indent):
+    lines = []
+    if rng.random() < 0.5:
+        lines.append(indent + rng.choice([f'pylutus_sig("{rng.choice(PARTIES)}")', 'pylutus_pay("k1", 2000000)',
+                                          "return True", "return False"]))
+    if depth > 0 and rng.random() < 0.8:
+        lines.append(f"{indent}if {_random_guard(rng)}:")
+        lines += _random_block(rng, depth - 1, indent + "    ")
+        for _ in range(rng.randint(0, 2)):
+            lines.append(f"{indent}elif {_random_guard(rng)}:")
+            lines += _random_block(rng, depth - 1, indent + "    ")
+        if rng.random() < 0.5:
+            lines.append(f"{indent}else:")
+            lines += _random_block(rng, depth - 1, indent + "    ")
+    roll = rng.random()
+    if roll < 0.4:
+        lines.append(indent + "return True")
+    elif roll < 0.7:
+        lines.append(indent + "return False")
+    elif roll < 0.8:
+        lines.append(f'{indent}return pylutus_sig("{rng.choice(PARTIES)}")')
+    elif roll < 0.9 and depth > 0:
+        lines.append(f"{indent}if {_random_guard(rng)}:")
+        lines.append(f"{indent}    return True")
+    if not lines:
+        lines.append(indent + "return True")
+    return lines
+
+# A random contract of nested if/elif/else blocks for randomized tests: guards
+# mix signature, datum, redeemer and constant tests over a few values (so some
+# branches overlap or can never run), and blocks may hold statements after a
+# return. The same rng state always gives the same contract.
+def random_contract(rng, depth=3):
+    return "\n".join([HEADER] + _random_block(rng, depth, "    ")) + "\n"
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic Pylutus contract.")
+    arg_parser.add_argument("--depth", type=int, default=1)
+    arg_parser.add_argument("--and-width", type=int, default=2)
+    arg_parser.add_argument("--pays", type=int, default=1)
+    arg_parser.add_argument("--sigs", type=int, default=1)
+    arg_parser.add_argument("--clauses", type=int, default=1)
+    args = arg_parser.parse_args(argv)
+    sys.stdout.write(generate_contract(args.depth, args.and_width, args.pays, args.sigs, args.clauses))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.contract_generator import generate_contract
+from compiler import __version__
+from compiler.ast_parser import PylutusParser
+from compiler.type_checker import TypeChecker
+from compiler.semantic_validator import SemanticValidator
+from compiler.ir import IRTransformer
+from pylutus_forge import generate_haskell_code
+
+SIZES = {
+    "tiny": {"depth": 1, "and_width": 1, "pays": 1, "sigs": 1, "clauses": 1},
+    "small": {"depth": 2, "and_width": 2, "pays": 1, "sigs": 1, "clauses": 10},
+    "medium": {"depth": 4, "and_width": 4, "pays": 2, "sigs": 2, "clauses": 100},
+    "large": {"depth": 6, "and_width": 8, "pays": 4, "sigs": 3, "clauses": 500},
+    "deep": {"depth": 40, "and_width": 2, "pays": 1, "sigs": 1, "clauses": 20},
+    "wide": {"depth": 1, "and_width": 64, "pays": 16, "sigs": 16, "clauses": 50},
+}
+DEFAULT_SIZES = ["tiny", "small", "medium", "large"]
+STAGES = ["parse", "type_check", "semantic", "ir", "codegen"]
+
+def _parse(source, state):
+    parser = PylutusParser()
+    state["ast"] = parser.parse(source)
+    return parser.errors
+
+def _type_check(source, state):
+    type_checker = TypeChecker()
+    type_checker.check(state["ast"])
+    return type_checker.errors
+
+def _semantic(source, state):
+    semantic_validator = SemanticValidator()
+    semantic_validator.validate(state["ast"])
+    return semantic_validator.errors
+
+def _ir(source, state):
+    transformer = IRTransformer()
+    state["ir"] = transformer.transform(state["ast"])
+    return transformer.errors
+
+def _codegen(source, state):
+    state["code"] = generate_haskell_code(state["ir"].children[0], {})
+    return []
+
+STAGE_FUNCTIONS = {
+    "parse": _parse,
+    "type_check": _type_check,
+    "semantic": _semantic,
+    "ir": _ir,
+    "codegen": _codegen,
+}
+
+def _count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+def run_pipeline(source, measure):
+    state = {}
+    results = {}
+    for stage in STAGES:
+        value, errors = measure(lambda: STAGE_FUNCTIONS[stage](source, state))
+        if errors:
+            raise RuntimeError(f"Generated contract failed in {stage}: {errors[0]}")
+        results[stage] = value
+    return results, state
+
+def _time(call):
+    start = time.perf_counter()
+    errors = call()
+    return time.perf_counter() - start, errors
+
+def _peak_memory(call):
+    tracemalloc.start()
+    try:
+        errors = call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, errors
+
+# Timings are the best of `repeat` runs; peak memory comes from a separate
+# tracemalloc run so tracing overhead does not leak into the latencies.
+def benchmark(name, params, repeat=5):
+    source = generate_contract(**params)
+    timings = {stage: [] for stage in STAGES}
+    state = {}
+    for _ in range(repeat):
+        seconds, state = run_pipeline(source, _time)
+        for stage in STAGES:
+            timings[stage].append(seconds[stage])
+    peaks, _ = run_pipeline(source, _peak_memory)
+
+    stages = {stage: {"seconds": min(timings[stage]), "peak_bytes": peaks[stage]} for stage in STAGES}
+    total = sum(stage["seconds"] for stage in stages.values())
+    lines = source.count("\n")
+    return {
+        "name": name,
+        "params": params,
+        "source_bytes": len(source.encode()),
+        "source_lines": lines,
+        "ir_nodes": _count_nodes(state["ir"]),
+        "output_bytes": len(state["code"].encode()),
+        "stages": stages,
+        "total_seconds": total,
+        "contracts_per_second": 1 / total if total else None,
+        "lines_per_second": lines / total if total else None,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(sizes=None, repeat=5):
+    sizes = sizes or DEFAULT_SIZES
+    return {
+        "compiler_version": __version__,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": [benchmark(name, SIZES[name], repeat) for name in sizes],
+    }
+
+def format_results(report):
+    lines = [f"{'size':<8} {'lines':>7} {'nodes':>8} " + " ".join(f"{stage:>11}" for stage in STAGES) + f" {'total':>10} {'peak KiB':>9}"]
+    for result in report["results"]:
+        stages = result["stages"]
+        peak = max(stage["peak_bytes"] for stage in stages.values()) / 1024
+        lines.append(
+            f"{result['name']:<8} {result['source_lines']:>7} {result['ir_nodes']:>8} "
+            + " ".join(f"{stages[stage]['seconds'] * 1000:>9.2f}ms" for stage in STAGES)
+            + f" {result['total_seconds'] * 1000:>8.2f}ms {peak:>9.0f}"
+        )
+    return "\n".join(lines)
+
+def compare_results(baseline, report):
+    previous = {result["name"]: result for result in baseline["results"]}
+    lines = [f"Compared with {baseline.get('commit') or 'baseline'} (ratio > 1 is slower)"]
+    for result in report["results"]:
+        old = previous.get(result["name"])
+        if old is None or old["params"] != result["params"]:
+            continue
+        ratios = []
+        for stage in STAGES:
+            before = old["stages"][stage]["seconds"]
+            ratios.append(f"{stage} {result['stages'][stage]['seconds'] / before:.2f}x" if before else f"{stage} n/a")
+        lines.append(f"    {result['name']}: " + ", ".join(ratios))
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark the Pylutus compiler stages on synthetic contracts.")
+    arg_parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                            help=f"Comma-separated sizes to run ({', '.join(SIZES)}).")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Timed runs per size; the best run is reported.")
+    arg_parser.add_argument("-o", "--output", help="Write results as JSON to this file.")
+    arg_parser.add_argument("--compare", metavar="FILE", help="Compare against a previous JSON result file.")
+    return arg_parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        print(f"Unknown benchmark size: {', '.join(unknown)}")
+        return 2
+
+    report = run_benchmarks(sizes, args.repeat)
+    print(format_results(report))
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print(compare_results(json.load(f), report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,2 +1,3 @@
 # Empty init file for compiler package
 
+__version__ = "0.4.0"
@@ -1,52 +1,144 @@
 import ast
 
+from compiler.traversal import visit_all, walk
+
+EMPTY_CHILDREN = ()
+VALIDATOR_ARGS = ("datum", "redeemer", "ctx")
+
+# Template parameter values. They behave as the plain str/int every compiler
+# stage expects while remembering which parameter they came from, so a compiled
+# template can be re-instantiated with other values (see compiler.template).
+class ParamStr(str):
+    def __new__(cls, value, name):
+        param = super().__new__(cls, value)
+        param.name = name
+        return param
+
+    def __getnewargs__(self):
+        return str(self), self.name
+
+class ParamInt(int):
+    def __new__(cls, value, name):
+        param = super().__new__(cls, value)
+        param.name = name
+        return param
+
+    def __getnewargs__(self):
+        return int(self), self.name
+
+PARAM_TYPES = {"ParamStr": (ParamStr, str), "ParamInt": (ParamInt, int)}
+
+# Template parameters are keyword-only arguments of the validator annotated
+# ParamStr or ParamInt with a literal default, e.g. `*, owner: ParamStr = "abc123"`.
+# Macro arguments may name them; a plain compile uses the defaults.
+def template_params(node):
+    params = {}
+    errors = []
+    for arg, default in zip(node.args.kwonlyargs, node.args.kw_defaults):
+        annotation = arg.annotation.id if isinstance(arg.annotation, ast.Name) else None
+        kind, base = PARAM_TYPES.get(annotation, (None, None))
+        if kind is None or not isinstance(default, ast.Constant) or type(default.value) is not base:
+            errors.append(f"Invalid template parameter '{arg.arg}' at line {node.lineno}. Expected ParamStr or ParamInt with a literal default.")
+        elif arg.arg in VALIDATOR_ARGS:
+            errors.append(f"Template parameter '{arg.arg}' at line {node.lineno} shadows a validator argument.")
+        else:
+            params[arg.arg] = kind(default.value, arg.arg)
+    return params, errors
+
+def param_argument(node, params, kind):
+    if isinstance(node, ast.Name) and isinstance(params.get(node.id), kind):
+        return params[node.id]
+    return None
+
+# A module may define several validators, e.g. the spend, mint and stake
+# scripts of one protocol: `validator` itself or any name ending in `_validator`.
+def is_validator_name(name):
+    return name == "validator" or (name.endswith("_validator") and len(name) > len("_validator"))
+
+# CamelCase form of a validator name, used for its Haskell definitions:
+# spend_validator -> SpendValidator.
+def validator_title(name):
+    return "".join(part[:1].upper() + part[1:] for part in name.split("_"))
+
+def invalid_name_error(node):
+    return f"Invalid function name '{node.name}' at line {node.lineno}. Expected 'validator' or a name ending in '_validator'."
+
+# Validators whose names would give the same Haskell definitions.
+def duplicate_validators(statements):
+    errors = []
+    seen = set()
+    for node in statements:
+        if isinstance(node, ast.FunctionDef) and is_validator_name(node.name):
+            title = validator_title(node.name)
+            if title in seen:
+                errors.append(f"Duplicate validator '{node.name}' at line {node.lineno}.")
+            seen.add(title)
+    return errors
+
+def function_value(name, args, params):
+    value = {"name": name, "args": args}
+    if params:
+        value["params"] = params
+    return value
+
 class PylutusNode:
+    __slots__ = ("node_type", "value", "children", "line_no")
+
     def __init__(self, node_type, value=None, children=None, line_no=None):
         self.node_type = node_type
         self.value = value
-        self.children = children or []
+        self.children = children or EMPTY_CHILDREN
         self.line_no = line_no
 
 class PylutusParser:
     def __init__(self):
         self.errors = []
+        self.params = {}
 
     def parse(self, source):
         try:
             tree = ast.parse(source)
-            return self._convert_ast(tree)
         except SyntaxError as e:
             self.errors.append(f"Syntax error at line {e.lineno}: {e.msg}")
             return None
+        except (RecursionError, MemoryError):
+            self.errors.append("Syntax error: contract is nested too deeply for the Python parser")
+            return None
+        return self.parse_tree(tree)
+
+    # Converts an already parsed Python AST, e.g. one built programmatically
+    # beyond the nesting depth ast.parse accepts.
+    def parse_tree(self, tree):
+        return walk(tree, self._convert_ast)
 
+    # Leaves are converted directly; nodes with children return a generator for
+    # compiler.traversal.walk that yields each child and receives its conversion.
     def _convert_ast(self, node):
         if isinstance(node, ast.Module):
-            return PylutusNode("Module", children=[self._convert_ast(n) for n in node.body])
+            return self._convert_module(node)
         
         elif isinstance(node, ast.FunctionDef):
-            if node.name != "validator":
-                self.errors.append(f"Invalid function name '{node.name}' at line {node.lineno}. Expected 'validator'.")
+            if not is_validator_name(node.name):
+                self.errors.append(invalid_name_error(node))
                 return None
             args = [arg.arg for arg in node.args.args]
-            if len(args) == 1 and args[0] == "ctx":
-                return PylutusNode("FunctionDef", value={"name": node.name, "args": ["ctx"]}, 
-                                  children=[self._convert_ast(n) for n in node.body], line_no=node.lineno)
-            elif len(args) == 3 and args[0] == "datum" and args[1] == "redeemer" and args[2] == "ctx":
-                return PylutusNode("FunctionDef", value={"name": node.name, "args": ["datum", "redeemer", "ctx"]}, 
-                                  children=[self._convert_ast(n) for n in node.body], line_no=node.lineno)
-            else:
+            if not (len(args) == 1 and args[0] == "ctx") and not (len(args) == 3 and args[0] == "datum" and args[1] == "redeemer" and args[2] == "ctx"):
                 self.errors.append(f"Invalid arguments at line {node.lineno}. Expected 'ctx' or 'datum, redeemer, ctx'.")
                 return None
+            self.params, errors = template_params(node)
+            if errors:
+                self.errors.extend(errors)
+                return None
+            return self._convert_function(node, args)
         
         elif isinstance(node, ast.If):
-            test = self._convert_ast(node.test)
-            body = [self._convert_ast(n) for n in node.body]
-            orelse = [self._convert_ast(n) for n in node.orelse]
-            return PylutusNode("If", children=[test] + body + orelse, line_no=node.lineno)
+            return self._convert_if(node)
         
         elif isinstance(node, ast.Return):
-            value = self._convert_ast(node.value)
-            return PylutusNode("Return", children=[value], line_no=node.lineno)
+            if node.value is None:
+                self.errors.append(f"Unsupported syntax at line {node.lineno}: empty return")
+                return None
+            return self._convert_return(node)
         
         elif isinstance(node, ast.NameConstant):
             return PylutusNode("Bool", value=node.value, line_no=node.lineno)
@@ -56,43 +148,43 @@ class PylutusParser:
         
         elif isinstance(node, ast.Call):
             if isinstance(node.func, ast.Name) and node.func.id == "pylutus_sig":
-                if len(node.args) != 1 or not isinstance(node.args[0], ast.Str):
+                value = self._string_argument(node)
+                if value is None:
                     self.errors.append(f"Invalid pylutus_sig call at line {node.lineno}.")
                     return None
-                return PylutusNode("PylutusSig", value=node.args[0].s, line_no=node.lineno)
+                return PylutusNode("PylutusSig", value=value, line_no=node.lineno)
             elif isinstance(node.func, ast.Name) and node.func.id == "pylutus_pay":
-                if len(node.args) != 2 or not isinstance(node.args[0], ast.Str) or not isinstance(node.args[1], ast.Num):
+                if len(node.args) == 2:
+                    addr = node.args[0].s if isinstance(node.args[0], ast.Str) else param_argument(node.args[0], self.params, ParamStr)
+                    amount = node.args[1].n if isinstance(node.args[1], ast.Num) else param_argument(node.args[1], self.params, ParamInt)
+                if len(node.args) != 2 or addr is None or amount is None:
                     self.errors.append(f"Invalid pylutus_pay call at line {node.lineno}.")
                     return None
-                return PylutusNode("PylutusPay", value={"addr": node.args[0].s, "amount": node.args[1].n}, line_no=node.lineno)
+                return PylutusNode("PylutusPay", value={"addr": addr, "amount": amount}, line_no=node.lineno)
             elif isinstance(node.func, ast.Name) and node.func.id == "pylutus_datum":
-                if len(node.args) != 1 or not isinstance(node.args[0], ast.Str):
+                value = self._string_argument(node)
+                if value is None:
                     self.errors.append(f"Invalid pylutus_datum call at line {node.lineno}.")
                     return None
-                return PylutusNode("PylutusDatum", value=node.args[0].s, line_no=node.lineno)
+                return PylutusNode("PylutusDatum", value=value, line_no=node.lineno)
             elif isinstance(node.func, ast.Name) and node.func.id == "pylutus_redeemer":
-                if len(node.args) != 1 or not isinstance(node.args[0], ast.Str):
+                value = self._string_argument(node)
+                if value is None:
                     self.errors.append(f"Invalid pylutus_redeemer call at line {node.lineno}.")
                     return None
-                return PylutusNode("PylutusRedeemer", value=node.args[0].s, line_no=node.lineno)
+                return PylutusNode("PylutusRedeemer", value=value, line_no=node.lineno)
         
         elif isinstance(node, ast.BoolOp):
-            if isinstance(node.op, ast.And):
-                op = "And"
-            else:
+            if not isinstance(node.op, ast.And):
                 self.errors.append(f"Only 'and' operator supported at line {node.lineno}.")
                 return None
-            children = [self._convert_ast(n) for n in node.values]
-            return PylutusNode("BoolOp", value=op, children=children, line_no=node.lineno)
+            return self._convert_boolop(node)
         
         elif isinstance(node, ast.Compare):
             if len(node.ops) != 1 or len(node.comparators) != 1:
                 self.errors.append(f"Complex comparisons not supported at line {node.lineno}.")
                 return None
-            left = self._convert_ast(node.left)
-            right = self._convert_ast(node.comparators[0])
-            op_type = type(node.ops[0]).__name__
-            return PylutusNode("Compare", value=op_type, children=[left, right], line_no=node.lineno)
+            return self._convert_compare(node)
         
         elif isinstance(node, ast.Name):
             return PylutusNode("Name", value=node.id, line_no=node.lineno)
@@ -103,3 +195,39 @@ class PylutusParser:
         else:
             self.errors.append(f"Unsupported syntax at line {node.lineno}: {type(node).__name__}")
             return None
+
+    def _string_argument(self, node):
+        if len(node.args) != 1:
+            return None
+        if isinstance(node.args[0], ast.Str):
+            return node.args[0].s
+        return param_argument(node.args[0], self.params, ParamStr)
+
+    def _convert_module(self, node):
+        children = yield from visit_all(node.body)
+        self.errors.extend(duplicate_validators(node.body))
+        return PylutusNode("Module", children=children)
+
+    def _convert_function(self, node, args):
+        children = yield from visit_all(node.body)
+        return PylutusNode("FunctionDef", value=function_value(node.name, args, self.params), children=children, line_no=node.lineno)
+
+    def _convert_if(self, node):
+        test = yield node.test
+        body = yield from visit_all(node.body)
+        orelse = yield from visit_all(node.orelse)
+        return PylutusNode("If", value=len(body), children=[test] + body + orelse, line_no=node.lineno)
+
+    def _convert_return(self, node):
+        value = yield node.value
+        return PylutusNode("Return", children=[value], line_no=node.lineno)
+
+    def _convert_boolop(self, node):
+        children = yield from visit_all(node.values)
+        return PylutusNode("BoolOp", value="And", children=children, line_no=node.lineno)
+
+    def _convert_compare(self, node):
+        left = yield node.left
+        right = yield node.comparators[0]
+        op_type = type(node.ops[0]).__name__
+        return PylutusNode("Compare", value=op_type, children=[left, right], line_no=node.lineno)
@@ -0,0 +1,92 @@
+from compiler.traversal import walk
+
+FALSE = 0
+TRUE = 1
+_TERMINAL = float("inf")
+
+# Reduced ordered binary decision diagrams. A diagram is an index into the
+# parallel lists variables/lows/highs; FALSE and TRUE are the two terminals and
+# a smaller variable sits nearer the root. node() keeps one entry per
+# (variable, low, high) in the unique table, so equal functions share an index
+# and a condition is unsatisfiable exactly when it is FALSE. Results of ite are
+# memoized in the computed table and evaluated with compiler.traversal.walk, so
+# deep diagrams need no recursion.
+class BDD:
+    def __init__(self):
+        self.variables = [_TERMINAL, _TERMINAL]
+        self.lows = [FALSE, TRUE]
+        self.highs = [FALSE, TRUE]
+        self.unique = {}
+        self.computed = {}
+
+    def __len__(self):
+        return len(self.variables)
+
+    def node(self, variable, low, high):
+        if low == high:
+            return low
+        key = (variable, low, high)
+        index = self.unique.get(key)
+        if index is None:
+            index = len(self.variables)
+            self.variables.append(variable)
+            self.lows.append(low)
+            self.highs.append(high)
+            self.unique[key] = index
+        return index
+
+    def variable(self, variable):
+        return self.node(variable, FALSE, TRUE)
+
+    # The conjunction of (variable, value) literals, built bottom-up.
+    def cube(self, literals):
+        result = TRUE
+        for variable, value in sorted(literals, reverse=True):
+            result = self.node(variable, FALSE, result) if value else self.node(variable, result, FALSE)
+        return result
+
+    # if f then g else h.
+    def ite(self, f, g, h):
+        return walk((f, g, h), self._ite)
+
+    def conjoin(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def disjoin(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def negate(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def _ite(self, item):
+        f, g, h = item
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        result = self.computed.get(item)
+        if result is not None:
+            return result
+        return self._split(item)
+
+    def _split(self, item):
+        variables = self.variables
+        top = min(variables[item[0]], variables[item[1]], variables[item[2]])
+        lows = []
+        highs = []
+        for operand in item:
+            if variables[operand] == top:
+                lows.append(self.lows[operand])
+                highs.append(self.highs[operand])
+            else:
+                lows.append(operand)
+                highs.append(operand)
+        low = yield tuple(lows)
+        high = yield tuple(highs)
+        result = self.node(top, low, high)
+        self.computed[item] = result
+        return result
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from compiler import __version__
+
+DEFAULT_CACHE_DIR = ".pylutus_cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Haskell is cached as the module itself; the UPLC targets cache their list of
+# artifacts as JSON.
+SUFFIXES = {"haskell": ".hs"}
+JSON_SUFFIX = ".json"
+# The compiler's own sources go into every key, so an edited pass never serves
+# output cached by the previous build.
+COMPILER_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILER_SOURCES = [COMPILER_DIR, os.path.join(os.path.dirname(COMPILER_DIR), "pylutus_forge.py")]
+
+_fingerprint = None
+
+def compiler_fingerprint():
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256(__version__.encode("utf-8"))
+        paths = []
+        for source in COMPILER_SOURCES:
+            if os.path.isdir(source):
+                paths.extend(os.path.join(source, name) for name in sorted(os.listdir(source)) if name.endswith(".py"))
+            elif os.path.exists(source):
+                paths.append(source)
+        for path in paths:
+            with open(path, "rb") as f:
+                digest.update(os.path.basename(path).encode("utf-8"))
+                digest.update(b"\0")
+                digest.update(f.read())
+                digest.update(b"\0")
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+class CompileCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, source, key_map, options=None):
+        digest = hashlib.sha256()
+        for part in (compiler_fingerprint(), json.dumps(key_map, sort_keys=True), json.dumps(options or {}, sort_keys=True), source):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        target = (options or {}).get("target", "haskell")
+        return digest.hexdigest() + SUFFIXES.get(target, JSON_SUFFIX)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                code = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return code
+
+    def put(self, key, code):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(code)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith((JSON_SUFFIX,) + tuple(SUFFIXES.values())):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def prune(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        count = len(self.entries())
+        shutil.rmtree(self.directory, ignore_errors=True)
+        return count
@@ -0,0 +1,295 @@
+import copy
+import json
+
+from compiler.dispatch import DispatchPlan, dispatch_strategy, first_if, is_invalid
+from compiler.ir import split_if
+from compiler.sharing import SharingPlan
+
+# Execution units are in the ledger's CPU/memory units; sizes are bytes of the
+# serialized script. The figures are conservative defaults meant to be tuned
+# with --cost-model against measured scripts.
+DEFAULT_COST_MODEL = {
+    "txSignedBy": {"cpu": 1200000, "mem": 4200},
+    "checkPayment": {"cpu": 2600000, "mem": 9000},
+    "checkPayment_per_output": {"cpu": 1900000, "mem": 6800},
+    "equality": {"cpu": 320000, "mem": 1100},
+    "trace": {"cpu": 230000, "mem": 600},
+    "branch": {"cpu": 180000, "mem": 500},
+    "dispatch": {"cpu": 900000, "mem": 2400},
+    "validator": {"cpu": 1500000, "mem": 5000},
+    "assumed_outputs": 4,
+    "size": {
+        "base": 220,
+        "node": 6,
+        "key": 32,
+        "trace_message": 2,
+        "helpers": {"checkPayment": 180},
+    },
+}
+
+def load_cost_model(path=None):
+    model = copy.deepcopy(DEFAULT_COST_MODEL)
+    if path:
+        with open(path, 'r') as f:
+            overrides = json.load(f)
+        for name, value in overrides.items():
+            if isinstance(value, dict) and isinstance(model.get(name), dict):
+                model[name].update(value)
+            else:
+                model[name] = value
+    return model
+
+def parse_budget(text):
+    budget = {}
+    for item in text.split(","):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if name not in ("cpu", "mem", "size") or not value.strip().isdigit():
+            raise ValueError(f"Invalid budget entry '{item}'. Expected cpu=N, mem=N or size=N.")
+        budget[name] = int(value)
+    return budget
+
+class CostEstimator:
+    def __init__(self, model=None, options=None):
+        options = options or {}
+        self.model = model or DEFAULT_COST_MODEL
+        self.traces = not options.get("release")
+        self.trace_wrappers = self.traces and not options.get("opt_level")
+        self.dispatch = dispatch_strategy(options)
+        self.share = bool(options.get("opt_level"))
+        self.plan = None
+        self.sharing = None
+        self.hoisted = set()
+        self.sized_keys = set()
+        self.size = 0
+        self.helpers = set()
+        self.paths = []
+
+    def _add(self, total, name, times=1):
+        total[0] += self.model[name]["cpu"] * times
+        total[1] += self.model[name]["mem"] * times
+
+    def _node_size(self, extra=0):
+        self.size += self.model["size"]["node"] + extra
+
+    def _trace(self, total, message):
+        if self.traces:
+            self._add(total, "trace")
+            self._node_size(len(message) * self.model["size"]["trace_message"])
+
+    # Path totals are [cpu, mem, evaluated bindings]; each branch gets its own.
+    def _fork(self, total):
+        return [total[0], total[1], set(total[2])]
+
+    # Hoisted PubKeyHash constants are stored once however often they are used.
+    def _key_size(self, key):
+        if key in self.hoisted:
+            if key in self.sized_keys:
+                return
+            self.sized_keys.add(key)
+        self.size += self.model["size"]["key"]
+
+    # A condition bound with `let` costs its evaluation the first time a path
+    # uses it and nothing afterwards; its text is sized once, with the bindings.
+    # total None sizes a condition without costing it, sized False the reverse.
+    def condition(self, node, total, sized=True, defining=None):
+        stack = [(node, sized, defining)]
+        while stack:
+            node, sized, defining = stack.pop()
+            if sized:
+                self._node_size()
+            if node is not defining and self.sharing.name(node) is not None:
+                if total is not None and id(node) not in total[2]:
+                    total[2].add(id(node))
+                    stack.append((node, False, node))
+                continue
+            if node.node_type == "And":
+                stack.extend((child, sized, defining) for child in node.children)
+            elif node.node_type == "SigCheck":
+                if total is not None:
+                    self._add(total, "txSignedBy")
+                if sized:
+                    self._key_size(node.value)
+            elif node.node_type in ("DatumCheck", "RedeemerCheck"):
+                if total is not None:
+                    self._add(total, "equality")
+                if sized:
+                    self.size += len(node.value)
+            elif node.node_type == "Compare":
+                if total is not None:
+                    self._add(total, "equality")
+                stack.extend((child, sized, defining) for child in node.children)
+
+    def _signature(self, node, total):
+        if self.sharing.name(node) is None:
+            self._add(total, "txSignedBy")
+            self._key_size(node.value)
+        else:
+            self.condition(node, total, sized=False)
+
+    def statement(self, node, total):
+        self._node_size()
+        if node.node_type == "Pay":
+            self.helpers.add("checkPayment")
+            self._add(total, "checkPayment")
+            self._add(total, "checkPayment_per_output", self.model["assumed_outputs"])
+            self._key_size(node.value["addr"])
+            self._trace(total, "Payment failed")
+        elif node.node_type == "SigCheck":
+            self._signature(node, total)
+            self._trace(total, "Signature check")
+        elif node.node_type == "Return":
+            value = node.children[0]
+            if value.node_type == "SigCheck":
+                self._signature(value, total)
+                self._trace(total, "Signature check")
+            elif value.node_type != "Bool" or value.value is not True or self.trace_wrappers:
+                self._trace(total, "Return")
+
+    def branch(self, statements, total):
+        has_return = False
+        for child in statements:
+            if child.node_type in ("Pay", "Return", "SigCheck"):
+                self.statement(child, total)
+                has_return = has_return or (child.node_type == "Return" and child.children[0].node_type == "Bool")
+        if self.trace_wrappers:
+            if not has_return:
+                self._trace(total, "Return")
+            self._trace(total, "Valid")
+
+    # Mirrors HaskellEmitter: statements before an if run on every path through
+    # it, each if splits the path in two, and lowered chains split it once per
+    # clause. Work items are expanded from an explicit stack so nested ifs need
+    # no recursion; each path is named after the last decision on it.
+    def estimate(self, function):
+        self.size = self.model["size"]["base"]
+        self.helpers = set()
+        self.paths = []
+        self.plan = DispatchPlan(function, self.dispatch)
+        self.sharing = SharingPlan(function, self.plan, self.share)
+        key_uses = {}
+        for (_, key), count in self.sharing.key_uses.items():
+            key_uses[key] = key_uses.get(key, 0) + count
+        self.hoisted = {key for key, count in key_uses.items() if count > 1}
+        self.sized_keys = set()
+        for node in self.sharing.bindings:
+            self.condition(node, None, defining=node)
+        prefix = [0, 0, set()]
+        self._add(prefix, "validator")
+
+        work = [("block", function.children, prefix, "body")]
+        while work:
+            item = work.pop()
+            work.extend(reversed(getattr(self, "_expand_" + item[0])(*item[1:])))
+
+        for helper in sorted(self.helpers):
+            self.size += self.model["size"]["helpers"][helper]
+
+        path_reports = [{"path": name, "cpu": total[0], "mem": total[1]} for name, total in self.paths]
+        worst = max(path_reports, key=lambda p: (p["cpu"], p["mem"]))
+        return {
+            "validator": function.value["name"],
+            "script_size": self.size,
+            "worst_case": worst,
+            "paths": path_reports,
+        }
+
+    def _expand_invalid(self, total, name):
+        self._trace(total, "Invalid")
+        self.paths.append((name, total))
+        return []
+
+    def _expand_block(self, statements, total, name):
+        position = first_if(statements)
+        if position is None:
+            self.branch(statements, total)
+            self.paths.append((name, total))
+            return []
+        for statement in statements[:position]:
+            if statement.node_type in ("Pay", "Return", "SigCheck"):
+                self.statement(statement, total)
+        node = statements[position]
+        chain = self.plan.chain(node)
+        if chain is not None and chain.strategy == "tagged":
+            return self._case(chain, total)
+        if chain is not None:
+            return [("arms", chain.balanced_clauses(), total, f"case@{chain.line_no}")]
+        return [("if", node, statements[position + 1:], total)]
+
+    def _expand_if(self, node, rest, total):
+        test, then_branch, _ = split_if(node)
+        otherwise = self.plan.effective_else(node, rest)
+        self._add(total, "branch")
+        self.condition(test, total)
+        pending = [("block", then_branch, self._fork(total), f"if@{node.line_no}:then")]
+        if is_invalid(otherwise):
+            return pending + [("invalid", self._fork(total), f"if@{node.line_no}:else")]
+        return pending + [("block", otherwise, self._fork(total), f"if@{node.line_no}:else")]
+
+    def _expand_guard(self, test, body, total, name):
+        self._add(total, "branch")
+        self.condition(test, total)
+        return [("block", body, self._fork(total), name), ("invalid", self._fork(total), f"{name}:else")]
+
+    def _case(self, chain, total):
+        self._add(total, "dispatch")
+        self._node_size()
+        pending = []
+        for clause in chain.clauses:
+            self._node_size(len(clause.value))
+            name = f"case@{chain.line_no}:{clause.value}"
+            if clause.rest is None:
+                pending.append(("block", clause.body, self._fork(total), name))
+            else:
+                pending.append(("guard", clause.rest, clause.body, self._fork(total), name))
+        if len(chain.clauses) < len(self.plan.tagged[chain.subject]):
+            pending.append(("invalid", self._fork(total), f"case@{chain.line_no}:default"))
+        return pending
+
+    # Balanced chains pay one ordering test per level of the binary search.
+    def _expand_arms(self, clauses, total, name):
+        if len(clauses) == 1:
+            return self._expand_guard(clauses[0].test, clauses[0].body, total, f"{name}:{clauses[0].value}")
+        middle = len(clauses) // 2
+        self._add(total, "branch")
+        self._add(total, "equality")
+        self._node_size(len(clauses[middle].value))
+        return [("arms", clauses[:middle], self._fork(total), name), ("arms", clauses[middle:], total, name)]
+
+def estimate_costs(function, model=None, options=None):
+    return CostEstimator(model, options).estimate(function)
+
+# One report per validator of a module. A module with several validators gets
+# a combined report for budget checks: the largest script and the worst path
+# of any validator, named after its validator.
+def estimate_module_costs(module, model=None, options=None):
+    reports = [estimate_costs(function, model, options) for function in module.children]
+    if len(reports) == 1:
+        return reports[0]
+    worst = max(reports, key=lambda r: (r["worst_case"]["cpu"], r["worst_case"]["mem"]))
+    return {
+        "validators": reports,
+        "script_size": max(report["script_size"] for report in reports),
+        "worst_case": dict(worst["worst_case"], path=f"{worst['validator']}:{worst['worst_case']['path']}"),
+    }
+
+def check_budget(report, budget):
+    actual = {
+        "cpu": report["worst_case"]["cpu"],
+        "mem": report["worst_case"]["mem"],
+        "size": report["script_size"],
+    }
+    return [
+        f"Budget exceeded: {name} {actual[name]} > {limit} (worst path {report['worst_case']['path']})"
+        for name, limit in budget.items()
+        if actual[name] > limit
+    ]
+
+def format_report(report):
+    if "validators" in report:
+        return "\n".join(format_report(validator) for validator in report["validators"])
+    lines = [f"{report['validator']}: script size ~{report['script_size']} bytes"]
+    for path in report["paths"]:
+        marker = " (worst case)" if path is report["worst_case"] else ""
+        lines.append(f"    {path['path']}: cpu {path['cpu']}, mem {path['mem']}{marker}")
+    return "\n".join(lines)
@@ -0,0 +1,249 @@
+import re
+
+from compiler.ir import IRNode, split_if
+
+SUBJECTS = {"redeemer": "RedeemerCheck", "datum": "DatumCheck"}
+TYPE_NAMES = {"redeemer": "RedeemerAction", "datum": "DatumState"}
+DECODERS = {
+    "redeemer": "PlutusTx.unsafeFromBuiltinData (getRedeemer redeemer)",
+    "datum": "PlutusTx.unsafeFromBuiltinData (getDatum datum)",
+}
+STRATEGIES = ("linear", "balanced", "tagged")
+
+_CONSTRUCTOR = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+_RESERVED = {"True", "False", "Just", "Nothing", "Left", "Right", "LT", "EQ", "GT",
+             "Datum", "Redeemer", "ScriptContext", "PubKeyHash", "RedeemerAction", "DatumState"}
+
+def is_return_false(node):
+    return node.node_type == "Return" and node.children[0].node_type == "Bool" and not node.children[0].value
+
+def is_invalid(statements, start=0):
+    return all(is_return_false(statements[position]) for position in range(start, len(statements)))
+
+def first_if(statements, start=0):
+    for position in range(start, len(statements)):
+        if statements[position].node_type == "If":
+            return position
+    return None
+
+def _if_returns(node, memo):
+    stack = [node]
+    while stack:
+        top = stack[-1]
+        if id(top) in memo:
+            stack.pop()
+            continue
+        _, then_branch, else_branch = split_if(top)
+        pending = [block[-1] for block in (then_branch, else_branch)
+                   if block and block[-1].node_type == "If" and id(block[-1]) not in memo]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        memo[id(top)] = all(
+            block and (block[-1].node_type == "Return" or (block[-1].node_type == "If" and memo[id(block[-1])]))
+            for block in (then_branch, else_branch)
+        )
+    return memo[id(node)]
+
+# memo maps id(If node) to whether it always returns; pass the same dict for a
+# whole walk over one tree so nested ifs are analysed once.
+def always_returns(statements, memo=None):
+    if not statements:
+        return False
+    last = statements[-1]
+    if last.node_type == "If":
+        return _if_returns(last, {} if memo is None else memo)
+    return last.node_type == "Return"
+
+# The statements that run when an if's test fails. Without an else clause, a
+# then branch that always returns makes the rest of the enclosing block the else.
+def effective_else(node, rest, memo=None):
+    _, then_branch, else_branch = split_if(node)
+    if else_branch:
+        return else_branch
+    return list(rest) if always_returns(then_branch, memo) else []
+
+# effective_else without copying the rest of the block: the statements that run
+# when the if at statements[position] fails are block[start:] for the returned
+# (block, start), or nothing when it returns None.
+def failure_block(statements, position, memo=None):
+    _, then_branch, else_branch = split_if(statements[position])
+    if else_branch:
+        return else_branch, 0
+    if always_returns(then_branch, memo):
+        return statements, position + 1
+    return None
+
+def constructor_name(value):
+    return value[:1].upper() + value[1:]
+
+class Clause:
+    def __init__(self, value, test, rest, body, line_no):
+        self.value = value
+        self.test = test
+        self.rest = rest
+        self.body = body
+        self.line_no = line_no
+
+class Chain:
+    def __init__(self, subject, clauses, line_no):
+        self.subject = subject
+        self.clauses = clauses
+        self.line_no = line_no
+        self.strategy = None
+
+    def balanced_clauses(self):
+        return sorted(self.clauses, key=lambda clause: clause.value.encode("utf-8"))
+
+# Splits a guard into the subject value it tests and the remaining condition.
+# Only guards with exactly one check on the subject qualify.
+def _subject_term(test, subject):
+    kind = SUBJECTS[subject]
+    if test.node_type == kind:
+        return test.value, None
+    if test.node_type != "And":
+        return None
+    terms = []
+    pending = [test]
+    while pending:
+        node = pending.pop()
+        if node.node_type == "And":
+            pending.extend(reversed(node.children))
+        else:
+            terms.append(node)
+    matches = [term for term in terms if term.node_type == kind]
+    if len(matches) != 1:
+        return None
+    others = [term for term in terms if term is not matches[0]]
+    if len(others) == 1:
+        return matches[0].value, others[0]
+    return matches[0].value, IRNode("And", children=others, line_no=test.line_no)
+
+# A chain is an if/elif (or return-terminated if, if, ...) sequence whose guards
+# test the same subject against distinct values and whose final fallthrough is
+# invalid, so the guards are mutually exclusive and order does not matter.
+# `failed` collects (subject, id(if)) pairs known not to start a chain, so
+# probing every if of a long non-qualifying sequence stays linear.
+def find_chain(node, rest, memo=None, failed=None):
+    failed = set() if failed is None else failed
+    for subject in SUBJECTS:
+        if (subject, id(node)) in failed:
+            continue
+        clauses = []
+        nodes = []
+        seen = {}
+        current, following = node, rest
+        repeat = None
+        while True:
+            test, then_branch, _ = split_if(current)
+            match = _subject_term(test, subject)
+            if match is None or match[0] in seen:
+                if match is not None:
+                    repeat = seen[match[0]]
+                default = [current]
+                break
+            seen[match[0]] = len(clauses)
+            clauses.append(Clause(match[0], test, match[1], then_branch, current.line_no))
+            nodes.append(current)
+            block = effective_else(current, following, memo)
+            if block and block[0].node_type == "If":
+                current, following = block[0], block[1:]
+                continue
+            default = block
+            break
+        if len(clauses) >= 2 and is_invalid(default):
+            return Chain(subject, clauses, node.line_no)
+        # Starting later cannot help unless it skips the first copy of a
+        # repeated value.
+        for scanned in nodes[:len(nodes) if repeat is None else repeat + 1]:
+            failed.add((subject, id(scanned)))
+    return None
+
+def _count_checks(function):
+    counts = dict.fromkeys(SUBJECTS, 0)
+    kinds = {kind: subject for subject, kind in SUBJECTS.items()}
+    stack = [function]
+    while stack:
+        node = stack.pop()
+        subject = kinds.get(node.node_type)
+        if subject:
+            counts[subject] += 1
+        stack.extend(node.children)
+    return counts
+
+# Decides, for one validator, which if-chains the emitter lowers and how:
+# "tagged" chains become a case over an integer-tagged constructor type,
+# "balanced" chains a binary search over the sorted subject values. Chains that
+# stay "linear" (and all other ifs) are emitted as if/else if.
+class DispatchPlan:
+    def __init__(self, function, strategy="linear"):
+        self.chains = {}
+        self.tagged = {}
+        self.returns = {}
+        self._failed = set()
+        if strategy == "linear" or function.value["args"] != ["datum", "redeemer", "ctx"]:
+            return
+
+        found = []
+        blocks = [function.children]
+        while blocks:
+            statements = blocks.pop()
+            position = first_if(statements)
+            if position is None:
+                continue
+            node = statements[position]
+            chain = find_chain(node, statements[position + 1:], self.returns, self._failed)
+            if chain is None:
+                _, then_branch, _ = split_if(node)
+                blocks.append(then_branch)
+                blocks.append(self.effective_else(node, statements[position + 1:]))
+                continue
+            found.append((node, chain))
+            blocks.extend(clause.body for clause in chain.clauses)
+
+        if strategy == "tagged":
+            self._choose_tagged([chain for _, chain in found], _count_checks(function))
+        for node, chain in found:
+            if chain.subject in self.tagged:
+                chain.strategy = "tagged"
+            elif len(chain.clauses) >= 3:
+                chain.strategy = "balanced"
+            else:
+                continue
+            self.chains[id(node)] = chain
+
+    # A subject is tagged only when every check on it is a chain guard, so no
+    # string comparison against the decoded value remains anywhere. Both types
+    # share one module namespace, so a subject whose constructor names are
+    # already taken by the other stays balanced.
+    def _choose_tagged(self, chains, counts):
+        taken = set()
+        for subject in SUBJECTS:
+            values = []
+            guards = 0
+            for chain in chains:
+                if chain.subject != subject:
+                    continue
+                guards += len(chain.clauses)
+                values.extend(clause.value for clause in chain.clauses if clause.value not in values)
+            if not guards or guards != counts[subject]:
+                continue
+            names = [constructor_name(value) for value in values]
+            if all(_CONSTRUCTOR.match(value) for value in values) and len(set(names)) == len(names) \
+                    and not (_RESERVED | taken) & set(names):
+                self.tagged[subject] = values
+                taken.update(names)
+
+    def chain(self, node):
+        return self.chains.get(id(node))
+
+    def effective_else(self, node, rest):
+        return effective_else(node, rest, self.returns)
+
+    def failure_block(self, statements, position):
+        return failure_block(statements, position, self.returns)
+
+def dispatch_strategy(options):
+    options = options or {}
+    return options.get("dispatch") or ("balanced" if options.get("opt_level") else "linear")
@@ -0,0 +1,254 @@
+import ast
+from types import GeneratorType
+
+from compiler.ast_parser import (ParamInt, ParamStr, duplicate_validators, function_value, invalid_name_error,
+                                 is_validator_name, param_argument, template_params)
+from compiler.ir import ExpressionTable, IRNode
+from compiler.reachability import reachability_warnings
+from compiler.traversal import visit_all, walk
+
+STATEMENT = 0
+RETURN_VALUE = 1
+EXPRESSION = 2
+
+# Single-pass replacement for PylutusParser, TypeChecker, SemanticValidator and
+# IRTransformer: walks the Python AST once, builds IR directly and collects the
+# errors each staged pass would have reported.
+class FusedFrontEnd:
+    def __init__(self):
+        self.parse_errors = []
+        self.type_errors = []
+        self.semantic_errors = []
+        self.semantic_warnings = []
+        self.ir_errors = []
+        self.symbol_table = {"datum": "Datum", "redeemer": "Redeemer", "ctx": "ScriptContext"}
+        self.params = {}
+        self.expressions = ExpressionTable()
+
+    def compile(self, source):
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            self.parse_errors.append(f"Syntax error at line {e.lineno}: {e.msg}")
+            return None
+        except (RecursionError, MemoryError):
+            self.parse_errors.append("Syntax error: contract is nested too deeply for the Python parser")
+            return None
+        return self.compile_tree(tree)
+
+    def compile_tree(self, tree):
+        ir, _, _ = self.visit(tree, STATEMENT)
+        if ir is not None and not any(errors for _, errors in self.stage_errors()):
+            self.semantic_warnings = reachability_warnings(ir)
+        return ir
+
+    def stage_errors(self):
+        return [
+            ("Parse errors", self.parse_errors),
+            ("Type errors", self.type_errors),
+            ("Semantic errors", self.semantic_errors),
+            ("IR transformation errors", self.ir_errors),
+        ]
+
+    # Each handler returns (ir_node, kind, type_name), where kind is the node type
+    # the staged parser would have produced and type_name what TypeChecker.infer_type
+    # would report for it. A None kind means the staged parser yields no node.
+    # Handlers with children are generators driven by compiler.traversal.walk:
+    # they yield (node, context) pairs and receive each child's result.
+    def visit(self, node, context):
+        return walk((node, context), self._visit)
+
+    def _visit(self, item):
+        result = self._dispatch(*item)
+        if type(result) is GeneratorType:
+            return self._checked(result)
+        return self._check_kind(result)
+
+    def _checked(self, handler):
+        result = yield from handler
+        return self._check_kind(result)
+
+    def _check_kind(self, result):
+        if result[1] is None:
+            self.ir_errors.append("Invalid AST node: None")
+        return result
+
+    def _dispatch(self, node, context):
+        handler = self._DISPATCH.get(type(node))
+        if handler is None:
+            self.parse_errors.append(f"Unsupported syntax at line {node.lineno}: {type(node).__name__}")
+            return None, None, "unknown"
+        return handler(self, node, context)
+
+    def _visit_block(self, statements):
+        results = yield from visit_all((statement, STATEMENT) for statement in statements)
+        return results, [ir for ir, _, _ in results if ir is not None]
+
+    def _visit_module(self, node, context):
+        _, children = yield from self._visit_block(node.body)
+        self.parse_errors.extend(duplicate_validators(node.body))
+        if not children:
+            self.ir_errors.append("Empty module")
+            return None, "Module", "unknown"
+        return IRNode("Module", children=children), "Module", "unknown"
+
+    def _visit_function(self, node, context):
+        if not is_validator_name(node.name):
+            self.parse_errors.append(invalid_name_error(node))
+            return None, None, "unknown"
+        args = [arg.arg for arg in node.args.args]
+        if args != ["ctx"] and args != ["datum", "redeemer", "ctx"]:
+            self.parse_errors.append(f"Invalid arguments at line {node.lineno}. Expected 'ctx' or 'datum, redeemer, ctx'.")
+            return None, None, "unknown"
+        self.params, errors = template_params(node)
+        if errors:
+            self.parse_errors.extend(errors)
+            return None, None, "unknown"
+
+        results, children = yield from self._visit_block(node.body)
+        if context != EXPRESSION and results:
+            _, last_kind, last_type = results[-1]
+            if last_kind == "Return" and last_type != "bool":
+                self.type_errors.append(f"Return value must be bool at line {node.lineno}")
+        if not children:
+            self.ir_errors.append(f"Empty function body at line {node.lineno}")
+            return None, "FunctionDef", "unknown"
+        return IRNode("FunctionDef", value=function_value(node.name, args, self.params), children=children, line_no=node.lineno), "FunctionDef", "unknown"
+
+    def _visit_if(self, node, context):
+        test, test_kind, test_type = yield node.test, EXPRESSION
+        if context != EXPRESSION and test_type != "bool":
+            self.type_errors.append(f"Condition must be bool, got {test_type} at line {node.lineno}")
+        if context == STATEMENT and test_kind == "Bool" and test.value is True:
+            self.semantic_errors.append(f"Unreachable else clause at line {node.lineno}")
+
+        _, then_body = yield from self._visit_block(node.body)
+        _, else_body = yield from self._visit_block(node.orelse)
+        if test is None or not (then_body or else_body):
+            self.ir_errors.append(f"Invalid if condition or body at line {node.lineno}")
+            return None, "If", "unknown"
+        return IRNode("If", value=len(then_body), children=[test] + then_body + else_body, line_no=node.lineno), "If", "unknown"
+
+    def _visit_return(self, node, context):
+        if node.value is None:
+            self.parse_errors.append(f"Unsupported syntax at line {node.lineno}: empty return")
+            return None, None, "unknown"
+        value, _, value_type = yield node.value, RETURN_VALUE
+        if value is None:
+            self.ir_errors.append(f"Invalid return value at line {node.lineno}")
+            return None, "Return", value_type
+        return IRNode("Return", children=[value], line_no=node.lineno), "Return", value_type
+
+    def _visit_constant(self, node, context):
+        value = node.value
+        if value is None or isinstance(value, bool):
+            return self.expressions.node("Bool", value=value, line_no=node.lineno), "Bool", "bool"
+        if isinstance(value, (int, float, complex)):
+            return self.expressions.node("Num", value=value, line_no=node.lineno), "Num", "number"
+        self.parse_errors.append(f"Unsupported syntax at line {node.lineno}: Constant")
+        return None, None, "unknown"
+
+    def _visit_call(self, node, context):
+        if not isinstance(node.func, ast.Name):
+            return None, None, "unknown"
+        handler = self._CALLS.get(node.func.id)
+        if handler is None:
+            return None, None, "unknown"
+        return handler(self, node, context)
+
+    def _argument(self, node, kind):
+        if kind is ParamStr and _is_str(node) or kind is ParamInt and _is_num(node):
+            return node.value
+        return param_argument(node, self.params, kind)
+
+    def _string_argument_call(self, node, name, kind):
+        value = self._argument(node.args[0], ParamStr) if len(node.args) == 1 else None
+        if value is None:
+            self.parse_errors.append(f"Invalid {name} call at line {node.lineno}.")
+            return None, None, "unknown"
+        return self.expressions.node(kind, value=value, line_no=node.lineno), kind, "bool"
+
+    def _visit_sig(self, node, context):
+        return self._string_argument_call(node, "pylutus_sig", "SigCheck")
+
+    def _visit_datum(self, node, context):
+        return self._string_argument_call(node, "pylutus_datum", "DatumCheck")
+
+    def _visit_redeemer(self, node, context):
+        return self._string_argument_call(node, "pylutus_redeemer", "RedeemerCheck")
+
+    def _visit_pay(self, node, context):
+        if len(node.args) == 2:
+            addr = self._argument(node.args[0], ParamStr)
+            amount = self._argument(node.args[1], ParamInt)
+        if len(node.args) != 2 or addr is None or amount is None:
+            self.parse_errors.append(f"Invalid pylutus_pay call at line {node.lineno}.")
+            return None, None, "unknown"
+        numeric = isinstance(amount, (int, float))
+        if context != EXPRESSION and (not numeric or amount <= 0):
+            self.type_errors.append(f"Payment amount must be positive at line {node.lineno}")
+        if context == STATEMENT and numeric and amount < 1000000:
+            self.semantic_errors.append(f"Payment amount must be at least 1 ADA at line {node.lineno}")
+        value = {"addr": addr, "amount": amount}
+        return IRNode("Pay", value=value, line_no=node.lineno), "Pay", "void"
+
+    def _visit_boolop(self, node, context):
+        if not isinstance(node.op, ast.And):
+            self.parse_errors.append(f"Only 'and' operator supported at line {node.lineno}.")
+            return None, None, "unknown"
+        results = yield from visit_all((value, EXPRESSION) for value in node.values)
+        if context != EXPRESSION:
+            for _, _, child_type in results:
+                if child_type != "bool":
+                    self.type_errors.append(f"Boolean operation requires bool operands at line {node.lineno}")
+        children = [ir for ir, _, _ in results if ir is not None]
+        if len(children) < 2:
+            self.ir_errors.append(f"Invalid boolean operation at line {node.lineno}")
+            return None, "BoolOp", "bool"
+        return self.expressions.node("And", children=children, line_no=node.lineno), "BoolOp", "bool"
+
+    def _visit_compare(self, node, context):
+        if len(node.ops) != 1 or len(node.comparators) != 1:
+            self.parse_errors.append(f"Complex comparisons not supported at line {node.lineno}.")
+            return None, None, "unknown"
+        left, _, left_type = yield node.left, EXPRESSION
+        right, _, right_type = yield node.comparators[0], EXPRESSION
+        if context != EXPRESSION and left_type != right_type:
+            self.type_errors.append(f"Type mismatch in comparison at line {node.lineno}")
+        if left is None or right is None:
+            self.ir_errors.append(f"Invalid comparison operands at line {node.lineno}")
+            return None, "Compare", "bool"
+        op_type = type(node.ops[0]).__name__
+        return self.expressions.node("Compare", value=op_type, children=[left, right], line_no=node.lineno), "Compare", "bool"
+
+    def _visit_name(self, node, context):
+        return self.expressions.node("Name", value=node.id, line_no=node.lineno), "Name", self.symbol_table.get(node.id, "unknown")
+
+    def _visit_expr(self, node, context):
+        return self._dispatch(node.value, context)
+
+    _DISPATCH = {
+        ast.Module: _visit_module,
+        ast.FunctionDef: _visit_function,
+        ast.If: _visit_if,
+        ast.Return: _visit_return,
+        ast.Constant: _visit_constant,
+        ast.Call: _visit_call,
+        ast.BoolOp: _visit_boolop,
+        ast.Compare: _visit_compare,
+        ast.Name: _visit_name,
+        ast.Expr: _visit_expr,
+    }
+
+    _CALLS = {
+        "pylutus_sig": _visit_sig,
+        "pylutus_pay": _visit_pay,
+        "pylutus_datum": _visit_datum,
+        "pylutus_redeemer": _visit_redeemer,
+    }
+
+def _is_str(node):
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+def _is_num(node):
+    return isinstance(node, ast.Constant) and isinstance(node.value, (int, float, complex)) and not isinstance(node.value, bool)
@@ -0,0 +1,251 @@
+from compiler.dispatch import effective_else, first_if, is_invalid
+from compiler.ir import split_if
+from compiler.optimizer import COMPARISONS
+from compiler.traversal import visit_all, walk
+
+class TxOut:
+    def __init__(self, address, lovelace):
+        self.address = address
+        self.lovelace = lovelace
+
+class ScriptContext:
+    def __init__(self, signatories=(), outputs=(), datum=None, redeemer=None):
+        self.signatories = list(signatories)
+        self.outputs = list(outputs)
+        self.datum = datum
+        self.redeemer = redeemer
+
+# Reference semantics for the IR, following the structure HaskellEmitter emits:
+# statements before a block's first if must all hold, that if selects the then
+# branch or the statements that run when its test fails (its else clause, or the
+# rest of the block when the then branch always returns), and a block without an
+# if holds when every statement in it holds. Dispatch lowering does not change
+# these semantics, so the interpreter does not follow it.
+class Interpreter:
+    def __init__(self, parties=None):
+        self.parties = parties or {}
+
+    def key(self, name):
+        return self.parties.get(name, name)
+
+    def run(self, function, ctx):
+        returns = {}
+        statements = function.children
+        while True:
+            position = first_if(statements)
+            if position is None:
+                return self.branch(statements, ctx)
+            if not self.branch(statements[:position], ctx):
+                return False
+            node = statements[position]
+            test, then_branch, _ = split_if(node)
+            if self.condition(test, ctx):
+                statements = then_branch
+                continue
+            statements = effective_else(node, statements[position + 1:], returns)
+            if is_invalid(statements):
+                return False
+
+    def branch(self, statements, ctx):
+        return all(self.statement(child, ctx) for child in statements if child.node_type in ("Pay", "Return", "SigCheck"))
+
+    def statement(self, node, ctx):
+        if node.node_type == "Return":
+            value = node.children[0]
+            if value.node_type == "Bool":
+                return bool(value.value)
+            elif value.node_type == "SigCheck":
+                return self.condition(value, ctx)
+            return False
+        elif node.node_type == "Pay":
+            address = self.key(node.value["addr"])
+            amount = node.value["amount"]
+            return any(o.address == address and o.lovelace == amount for o in ctx.outputs)
+        elif node.node_type == "SigCheck":
+            return self.condition(node, ctx)
+        return False
+
+    def condition(self, node, ctx):
+        return walk(node, lambda child: self._condition(child, ctx))
+
+    def _condition(self, node, ctx):
+        if node.node_type == "And":
+            return self._and(node)
+        elif node.node_type == "SigCheck":
+            return self.key(node.value) in ctx.signatories
+        elif node.node_type == "DatumCheck":
+            return ctx.datum == node.value
+        elif node.node_type == "RedeemerCheck":
+            return ctx.redeemer == node.value
+        elif node.node_type == "Compare":
+            op = COMPARISONS.get(node.value)
+            if op is None:
+                return False
+            return self._compare(node, op)
+        elif node.node_type in ("Bool", "Num"):
+            return node.value
+        elif node.node_type == "Name":
+            return getattr(ctx, node.value, None) if node.value in ("datum", "redeemer") else None
+        return False
+
+    def _and(self, node):
+        for child in node.children:
+            if not (yield child):
+                return False
+        return True
+
+    def _compare(self, node, op):
+        left = yield node.children[0]
+        right = yield node.children[1]
+        try:
+            return bool(op(left, right))
+        except TypeError:
+            return False
+
+def evaluate(function, ctx, parties=None):
+    return Interpreter(parties).run(function, ctx)
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Batched evaluation requires numpy (pip install numpy)") from None
+    return numpy
+
+# Columnar batch of mock transactions. Signatories and outputs are padded 2-D
+# arrays (one row per transaction); padding uses "" for keys and addresses.
+class TransactionBatch:
+    def __init__(self, signatories, output_addresses, output_lovelace, datum, redeemer):
+        np = _numpy()
+        self.signatories = np.asarray(signatories, dtype=str)
+        self.output_addresses = np.asarray(output_addresses, dtype=str)
+        self.output_lovelace = np.asarray(output_lovelace, dtype=np.int64)
+        self.datum = np.asarray(datum, dtype=str)
+        self.redeemer = np.asarray(redeemer, dtype=str)
+
+    def __len__(self):
+        return len(self.datum)
+
+    @classmethod
+    def from_contexts(cls, contexts):
+        np = _numpy()
+        contexts = list(contexts)
+        size = len(contexts)
+        sig_width = max([len(c.signatories) for c in contexts] + [1])
+        out_width = max([len(c.outputs) for c in contexts] + [1])
+        signatories = np.full((size, sig_width), "", dtype=object)
+        addresses = np.full((size, out_width), "", dtype=object)
+        lovelace = np.zeros((size, out_width), dtype=np.int64)
+        for row, ctx in enumerate(contexts):
+            signatories[row, :len(ctx.signatories)] = ctx.signatories
+            for column, output in enumerate(ctx.outputs):
+                addresses[row, column] = output.address
+                lovelace[row, column] = output.lovelace
+        datum = [c.datum or "" for c in contexts]
+        redeemer = [c.redeemer or "" for c in contexts]
+        return cls(signatories.astype(str), addresses.astype(str), lovelace, datum, redeemer)
+
+    @classmethod
+    def random(cls, size, parties, datums=("",), redeemers=("",), amounts=(2000000,), max_signatories=3, max_outputs=3, seed=None):
+        np = _numpy()
+        rng = np.random.default_rng(seed)
+        keys = np.asarray(list(parties) + [""], dtype=str)
+        signatories = rng.choice(keys, size=(size, max_signatories))
+        addresses = rng.choice(keys, size=(size, max_outputs))
+        lovelace = rng.choice(np.asarray(amounts, dtype=np.int64), size=(size, max_outputs))
+        datum = rng.choice(np.asarray(datums, dtype=str), size=size)
+        redeemer = rng.choice(np.asarray(redeemers, dtype=str), size=size)
+        return cls(signatories, addresses, lovelace, datum, redeemer)
+
+    def context(self, row):
+        return ScriptContext(
+            signatories=[s for s in self.signatories[row] if s],
+            outputs=[TxOut(a, int(l)) for a, l in zip(self.output_addresses[row], self.output_lovelace[row]) if a],
+            datum=str(self.datum[row]),
+            redeemer=str(self.redeemer[row]),
+        )
+
+class BatchInterpreter(Interpreter):
+    def __init__(self, batch, parties=None):
+        super().__init__(parties)
+        self.np = _numpy()
+        self.batch = batch
+
+    def _full(self, value):
+        return self.np.full(len(self.batch), bool(value))
+
+    def _mask(self, value):
+        return self._full(value) if self.np.ndim(value) == 0 else value
+
+    # Every row takes both sides of each if, so blocks are evaluated with walk
+    # and combined with np.where.
+    def run(self, function, ctx=None):
+        returns = {}
+        return walk(function.children, lambda statements: self.block(statements, ctx, returns))
+
+    def block(self, statements, ctx, returns):
+        position = first_if(statements)
+        if position is None:
+            return self.branch(statements, ctx)
+        return self._block(statements, position, ctx, returns)
+
+    def _block(self, statements, position, ctx, returns):
+        node = statements[position]
+        test, then_branch, _ = split_if(node)
+        before = self.branch(statements[:position], ctx)
+        mask = self._mask(self.condition(test, ctx))
+        passed = yield then_branch
+        otherwise = effective_else(node, statements[position + 1:], returns)
+        failed = self._full(False) if is_invalid(otherwise) else (yield otherwise)
+        return self.np.logical_and(before, self.np.where(mask, passed, failed))
+
+    def branch(self, statements, ctx):
+        result = self._full(True)
+        for child in statements:
+            if child.node_type in ("Pay", "Return", "SigCheck"):
+                result = self.np.logical_and(result, self.statement(child, ctx))
+        return result
+
+    def statement(self, node, ctx):
+        if node.node_type == "Pay":
+            batch = self.batch
+            matches = (batch.output_addresses == self.key(node.value["addr"])) & (batch.output_lovelace == node.value["amount"])
+            return matches.any(axis=1)
+        result = super().statement(node, ctx)
+        return self._full(result) if isinstance(result, bool) else result
+
+    def _condition(self, node, ctx):
+        batch = self.batch
+        if node.node_type == "And":
+            return self._and(node)
+        elif node.node_type == "SigCheck":
+            return (batch.signatories == self.key(node.value)).any(axis=1)
+        elif node.node_type == "DatumCheck":
+            return batch.datum == node.value
+        elif node.node_type == "RedeemerCheck":
+            return batch.redeemer == node.value
+        elif node.node_type == "Compare":
+            op = COMPARISONS.get(node.value)
+            if op is None:
+                return self._full(False)
+            return self._compare(node, op)
+        elif node.node_type in ("Bool", "Num"):
+            return node.value
+        elif node.node_type == "Name":
+            return getattr(batch, node.value) if node.value in ("datum", "redeemer") else None
+        return self._full(False)
+
+    def _and(self, node):
+        masks = yield from visit_all(node.children)
+        return self.np.logical_and.reduce([self._mask(mask) for mask in masks])
+
+    def _compare(self, node, op):
+        left = yield node.children[0]
+        right = yield node.children[1]
+        try:
+            return self.np.broadcast_to(self.np.asarray(op(left, right), dtype=bool), (len(self.batch),))
+        except TypeError:
+            return self._full(False)
+
+def evaluate_batch(function, batch, parties=None):
+    return BatchInterpreter(batch, parties).run(function)
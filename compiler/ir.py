@@ -1,100 +1,285 @@
+from array import array
+from enum import IntEnum
+
+from compiler.ast_parser import EMPTY_CHILDREN, ParamInt, ParamStr
+from compiler.traversal import visit_all, walk
+
+class IRKind(IntEnum):
+    Module = 0
+    FunctionDef = 1
+    If = 2
+    Return = 3
+    Bool = 4
+    Num = 5
+    SigCheck = 6
+    Pay = 7
+    DatumCheck = 8
+    RedeemerCheck = 9
+    And = 10
+    Compare = 11
+    Name = 12
+
 class IRNode:
+    __slots__ = ("node_type", "value", "children", "line_no")
+
     def __init__(self, node_type, value=None, children=None, line_no=None):
         self.node_type = node_type
         self.value = value
-        self.children = children or []
+        self.children = children or EMPTY_CHILDREN
         self.line_no = line_no
 
+EXPRESSION_KINDS = frozenset(("Bool", "Num", "Name", "SigCheck", "DatumCheck", "RedeemerCheck", "And", "Compare"))
+
+# Hash-consing for expression nodes: a structurally identical expression built
+# twice comes back as the same node, so equal guards share one subtree and can be
+# recognised by identity. Children must already come from the same table. A
+# shared node keeps the line number of its first occurrence. Statements (If,
+# Return, Pay, ...) are never shared, and IR nodes are never mutated in place.
+class ExpressionTable:
+    def __init__(self):
+        self.nodes = {}
+
+    def node(self, node_type, value=None, children=None, line_no=None):
+        key = (node_type, value_key(value), tuple(id(child) for child in children or ()))
+        node = self.nodes.get(key)
+        if node is None:
+            node = IRNode(node_type, value=value, children=children, line_no=line_no)
+            self.nodes[key] = node
+        return node
+
+def _hash_cons(node, table):
+    children = yield from visit_all(node.children)
+    if node.node_type in EXPRESSION_KINDS:
+        return table.node(node.node_type, node.value, children, node.line_no)
+    if all(a is b for a, b in zip(children, node.children)):
+        return node
+    return IRNode(node.node_type, value=node.value, children=children, line_no=node.line_no)
+
+# Re-shares expressions in a tree built without a table, e.g. after optimizer
+# passes rebuilt some of them.
+def hash_cons(root, table=None):
+    table = ExpressionTable() if table is None else table
+    return walk(root, lambda node: _hash_cons(node, table))
+
+NO_NODE = -1
+NO_LINE = -1
+
+# Template parameters are keyed by name, not by their default, so passes such as
+# conjunction deduplication never merge two parameters that share a default.
+def value_key(value):
+    if isinstance(value, (ParamStr, ParamInt)):
+        return (type(value), value.name)
+    if isinstance(value, dict):
+        return (dict,) + tuple((k, value_key(v)) for k, v in sorted(value.items()))
+    if isinstance(value, list):
+        return (list,) + tuple(value_key(v) for v in value)
+    return (type(value), value)
+
+def _structural_key(node):
+    children = yield from visit_all(node.children)
+    return (node.node_type, value_key(node.value), tuple(children))
+
+def structural_key(node):
+    return walk(node, _structural_key)
+
+# An If node keeps its then branch followed by its else branch in children[1:];
+# value holds the number of then-branch statements.
+def split_if(node):
+    then_count = len(node.children) - 1 if node.value is None else node.value
+    return node.children[0], node.children[1:1 + then_count], node.children[1 + then_count:]
+
+# Array-backed IR for very large contracts: one entry per node in pre-order, with
+# children linked through first_child/next_sibling indices and values interned in
+# a shared table.
+class FlatIR:
+    __slots__ = ("kinds", "value_index", "first_child", "next_sibling", "line_nos", "values", "_value_ids")
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.value_index = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.line_nos = array("i")
+        self.values = []
+        self._value_ids = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def intern_value(self, value):
+        key = value_key(value)
+        index = self._value_ids.get(key)
+        if index is None:
+            index = len(self.values)
+            self._value_ids[key] = index
+            self.values.append(value)
+        return index
+
+    def add(self, kind, value=None, line_no=None):
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.value_index.append(self.intern_value(value))
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.line_nos.append(NO_LINE if line_no is None else line_no)
+        return index
+
+    def kind(self, index):
+        return IRKind(self.kinds[index])
+
+    def value(self, index):
+        return self.values[self.value_index[index]]
+
+    def line_no(self, index):
+        line_no = self.line_nos[index]
+        return None if line_no == NO_LINE else line_no
+
+    def children(self, index):
+        child = self.first_child[index]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    @classmethod
+    def from_tree(cls, root):
+        flat = cls()
+        last_child = {}
+        stack = [(root, NO_NODE)]
+        while stack:
+            node, parent = stack.pop()
+            index = flat.add(IRKind[node.node_type], node.value, node.line_no)
+            if parent != NO_NODE:
+                previous = last_child.get(parent, NO_NODE)
+                if previous == NO_NODE:
+                    flat.first_child[parent] = index
+                else:
+                    flat.next_sibling[previous] = index
+                last_child[parent] = index
+            for child in reversed(node.children):
+                stack.append((child, index))
+        return flat
+
+    def to_tree(self):
+        nodes = [None] * len(self)
+        for index in range(len(self) - 1, -1, -1):
+            children = [nodes[child] for child in self.children(index)]
+            nodes[index] = IRNode(self.kind(index).name, self.value(index), children, self.line_no(index))
+        return nodes[0] if nodes else None
+
 class IRTransformer:
     def __init__(self):
         self.errors = []
+        self.expressions = ExpressionTable()
 
     def transform(self, ast_node):
+        return walk(ast_node, self._transform)
+
+    def _transform(self, ast_node):
         if ast_node is None:
             self.errors.append("Invalid AST node: None")
             return None
 
         if ast_node.node_type == "Module":
-            children = [self.transform(child) for child in ast_node.children]
-            children = [c for c in children if c is not None]
-            if not children:
-                self.errors.append("Empty module")
-                return None
-            return IRNode("Module", children=children, line_no=ast_node.line_no)
+            return self._transform_module(ast_node)
         
         elif ast_node.node_type == "FunctionDef":
-            children = [self.transform(child) for child in ast_node.children]
-            children = [c for c in children if c is not None]
-            if not children:
-                self.errors.append(f"Empty function body at line {ast_node.line_no}")
-                return None
-            return IRNode("FunctionDef", value=ast_node.value, children=children, line_no=ast_node.line_no)
+            return self._transform_function(ast_node)
         
         elif ast_node.node_type == "If":
             if len(ast_node.children) < 1:
                 self.errors.append(f"Invalid if statement at line {ast_node.line_no}")
                 return None
-            test = self.transform(ast_node.children[0])
-            body = [self.transform(child) for child in ast_node.children[1:]]
-            body = [c for c in body if c is not None]
-            if test is None or not body:
-                self.errors.append(f"Invalid if condition or body at line {ast_node.line_no}")
-                return None
-            return IRNode("If", children=[test] + body, line_no=ast_node.line_no)
+            return self._transform_if(ast_node)
         
         elif ast_node.node_type == "Return":
             if len(ast_node.children) != 1:
                 self.errors.append(f"Invalid return statement at line {ast_node.line_no}")
                 return None
-            value = self.transform(ast_node.children[0])
-            if value is None:
-                self.errors.append(f"Invalid return value at line {ast_node.line_no}")
-                return None
-            return IRNode("Return", children=[value], line_no=ast_node.line_no)
+            return self._transform_return(ast_node)
         
         elif ast_node.node_type == "Bool":
-            return IRNode("Bool", value=ast_node.value, line_no=ast_node.line_no)
+            return self.expressions.node("Bool", value=ast_node.value, line_no=ast_node.line_no)
         
         elif ast_node.node_type == "Num":
-            return IRNode("Num", value=ast_node.value, line_no=ast_node.line_no)
+            return self.expressions.node("Num", value=ast_node.value, line_no=ast_node.line_no)
         
         elif ast_node.node_type == "PylutusSig":
-            return IRNode("SigCheck", value=ast_node.value, line_no=ast_node.line_no)
+            return self.expressions.node("SigCheck", value=ast_node.value, line_no=ast_node.line_no)
         
         elif ast_node.node_type == "PylutusPay":
             return IRNode("Pay", value=ast_node.value, line_no=ast_node.line_no)
         
         elif ast_node.node_type == "PylutusDatum":
-            return IRNode("DatumCheck", value=ast_node.value, line_no=ast_node.line_no)
+            return self.expressions.node("DatumCheck", value=ast_node.value, line_no=ast_node.line_no)
         
         elif ast_node.node_type == "PylutusRedeemer":
-            return IRNode("RedeemerCheck", value=ast_node.value, line_no=ast_node.line_no)
+            return self.expressions.node("RedeemerCheck", value=ast_node.value, line_no=ast_node.line_no)
         
         elif ast_node.node_type == "BoolOp":
             if ast_node.value != "And":
                 self.errors.append(f"Unsupported boolean operation {ast_node.value} at line {ast_node.line_no}")
                 return None
-            children = [self.transform(child) for child in ast_node.children]
-            children = [c for c in children if c is not None]
-            if len(children) < 2:
-                self.errors.append(f"Invalid boolean operation at line {ast_node.line_no}")
-                return None
-            return IRNode("And", children=children, line_no=ast_node.line_no)
+            return self._transform_and(ast_node)
         
         elif ast_node.node_type == "Compare":
             if len(ast_node.children) != 2:
                 self.errors.append(f"Invalid comparison at line {ast_node.line_no}")
                 return None
-            left = self.transform(ast_node.children[0])
-            right = self.transform(ast_node.children[1])
-            if left is None or right is None:
-                self.errors.append(f"Invalid comparison operands at line {ast_node.line_no}")
-                return None
-            return IRNode("Compare", value=ast_node.value, children=[left, right], line_no=ast_node.line_no)
+            return self._transform_compare(ast_node)
         
         elif ast_node.node_type == "Name":
-            return IRNode("Name", value=ast_node.value, line_no=ast_node.line_no)
+            return self.expressions.node("Name", value=ast_node.value, line_no=ast_node.line_no)
         
         else:
             self.errors.append(f"Unsupported AST node {ast_node.node_type} at line {ast_node.line_no}")
             return None
+
+    def _transform_module(self, ast_node):
+        children = yield from visit_all(ast_node.children)
+        children = [c for c in children if c is not None]
+        if not children:
+            self.errors.append("Empty module")
+            return None
+        return IRNode("Module", children=children, line_no=ast_node.line_no)
+
+    def _transform_function(self, ast_node):
+        children = yield from visit_all(ast_node.children)
+        children = [c for c in children if c is not None]
+        if not children:
+            self.errors.append(f"Empty function body at line {ast_node.line_no}")
+            return None
+        return IRNode("FunctionDef", value=ast_node.value, children=children, line_no=ast_node.line_no)
+
+    def _transform_if(self, ast_node):
+        test = yield ast_node.children[0]
+        then_count = len(ast_node.children) - 1 if ast_node.value is None else ast_node.value
+        body = yield from visit_all(ast_node.children[1:])
+        then_count = sum(1 for c in body[:then_count] if c is not None)
+        body = [c for c in body if c is not None]
+        if test is None or not body:
+            self.errors.append(f"Invalid if condition or body at line {ast_node.line_no}")
+            return None
+        return IRNode("If", value=then_count, children=[test] + body, line_no=ast_node.line_no)
+
+    def _transform_return(self, ast_node):
+        value = yield ast_node.children[0]
+        if value is None:
+            self.errors.append(f"Invalid return value at line {ast_node.line_no}")
+            return None
+        return IRNode("Return", children=[value], line_no=ast_node.line_no)
+
+    def _transform_and(self, ast_node):
+        children = yield from visit_all(ast_node.children)
+        children = [c for c in children if c is not None]
+        if len(children) < 2:
+            self.errors.append(f"Invalid boolean operation at line {ast_node.line_no}")
+            return None
+        return self.expressions.node("And", children=children, line_no=ast_node.line_no)
+
+    def _transform_compare(self, ast_node):
+        left = yield ast_node.children[0]
+        right = yield ast_node.children[1]
+        if left is None or right is None:
+            self.errors.append(f"Invalid comparison operands at line {ast_node.line_no}")
+            return None
+        return self.expressions.node("Compare", value=ast_node.value, children=[left, right], line_no=ast_node.line_no)
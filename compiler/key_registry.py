@@ -0,0 +1,117 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+PUBKEYHASH_PATTERN = re.compile(r"^[0-9a-fA-F]{56}$")
+LOOKUP_CHUNK = 500
+
+class SqliteKeyRegistry:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True)
+            self._local.connection = connection
+        return connection
+
+    def lookup_many(self, names):
+        names = list(names)
+        found = {}
+        connection = self._connection()
+        for start in range(0, len(names), LOOKUP_CHUNK):
+            chunk = names[start:start + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = connection.execute(f"SELECT name, pubkeyhash FROM parties WHERE name IN ({placeholders})", chunk)
+            found.update(rows)
+        return found
+
+# Registries are shared per path; a rebuilt file (new inode, size or mtime)
+# gets a fresh registry so no thread keeps reading the replaced database.
+_registries = {}
+_registries_lock = threading.Lock()
+
+def registry_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+def open_registry(path):
+    with _registries_lock:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Key registry not found: {path}")
+        stamp = registry_stamp(path)
+        cached = _registries.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, SqliteKeyRegistry(path))
+            _registries[path] = cached
+        return cached[1]
+
+def build_registry(path, entries):
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("CREATE TABLE parties (name TEXT PRIMARY KEY, pubkeyhash TEXT NOT NULL) WITHOUT ROWID")
+        connection.executemany("INSERT OR REPLACE INTO parties (name, pubkeyhash) VALUES (?, ?)", entries)
+    connection.close()
+
+# Resolves the party names used by one compilation. Every distinct name is looked
+# up once; raw 28-byte hex key hashes are accepted without a registry entry.
+class KeyResolver:
+    def __init__(self, registry):
+        self.registry = registry
+        self.resolved = {}
+        self.errors = []
+
+    def resolve(self, ir):
+        first_use = {}
+        stack = [ir]
+        while stack:
+            node = stack.pop()
+            if node.node_type == "SigCheck":
+                first_use.setdefault(node.value, node.line_no)
+            elif node.node_type == "Pay":
+                first_use.setdefault(node.value["addr"], node.line_no)
+            stack.extend(reversed(node.children))
+
+        pending = [name for name in first_use if name not in self.resolved]
+        self.resolved.update(self.registry.lookup_many(pending))
+        for name in pending:
+            if name in self.resolved:
+                continue
+            if PUBKEYHASH_PATTERN.match(name):
+                self.resolved[name] = name
+            else:
+                self.errors.append(f"Unknown party '{name}' at line {first_use[name]}")
+        return self.resolved
+
+def read_entries(path):
+    if path.endswith(".json"):
+        with open(path, 'r') as f:
+            return list(json.load(f).items())
+    with open(path, newline="") as f:
+        return [(row[0], row[1]) for row in csv.reader(f) if len(row) >= 2 and not row[0].startswith("#")]
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python3 -m compiler.key_registry <parties.csv|parties.json> <registry.sqlite>")
+        return 1
+    entries = read_entries(sys.argv[1])
+    build_registry(sys.argv[2], entries)
+    print(f"Indexed {len(entries)} parties into {sys.argv[2]}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import operator
+
+from compiler.dispatch import first_if, is_return_false
+from compiler.ir import IRNode, hash_cons, split_if, structural_key
+from compiler.reachability import analyze_reachability
+from compiler.traversal import visit_all, walk
+
+COMPARISONS = {
+    "Eq": operator.eq,
+    "NotEq": operator.ne,
+    "Lt": operator.lt,
+    "LtE": operator.le,
+    "Gt": operator.gt,
+    "GtE": operator.ge,
+}
+
+def _rebuild(node, children, value=None):
+    value = node.value if value is None else value
+    if value is node.value and len(children) == len(node.children) and all(a is b for a, b in zip(children, node.children)):
+        return node
+    return IRNode(node.node_type, value=value, children=children, line_no=node.line_no)
+
+def _bool(value, line_no):
+    return IRNode("Bool", value=value, line_no=line_no)
+
+def _is_literal(node):
+    return node.node_type in ("Bool", "Num") and node.value is not None
+
+def _fold_constants(node):
+    children = yield from visit_all(node.children)
+
+    if node.node_type == "And":
+        kept = []
+        for child in children:
+            if child.node_type == "Bool" and child.value is True:
+                continue
+            if child.node_type == "Bool" and child.value is False:
+                return _bool(False, node.line_no)
+            kept.append(child)
+        if not kept:
+            return _bool(True, node.line_no)
+        if len(kept) == 1:
+            return kept[0]
+        return _rebuild(node, kept)
+
+    if node.node_type == "Compare" and node.value in COMPARISONS:
+        left, right = children
+        if _is_literal(left) and _is_literal(right):
+            try:
+                return _bool(bool(COMPARISONS[node.value](left.value, right.value)), node.line_no)
+            except TypeError:
+                pass
+
+    return _rebuild(node, children)
+
+def fold_constants(node):
+    return walk(node, _fold_constants)
+
+# The operands of a whole nested and-chain are gathered at its outermost And, so
+# each term is visited and keyed once however deeply the chain nests.
+def _flatten_conjunctions(node):
+    if node.node_type != "And":
+        children = yield from visit_all(node.children)
+        return _rebuild(node, children)
+
+    operands = []
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        if current.node_type == "And":
+            pending.extend(reversed(current.children))
+        else:
+            operands.append(current)
+    terms = yield from visit_all(operands)
+
+    flat = []
+    seen = set()
+    for term in terms:
+        key = structural_key(term)
+        if key not in seen:
+            seen.add(key)
+            flat.append(term)
+    if len(flat) == 1:
+        return flat[0]
+    return _rebuild(node, flat)
+
+def flatten_conjunctions(node):
+    return walk(node, _flatten_conjunctions)
+
+def _constant_test(node):
+    test = node.children[0]
+    if test.node_type != "Bool":
+        return None
+    return bool(test.value)
+
+def _return(value, line_no):
+    return IRNode("Return", children=[_bool(value, line_no)], line_no=line_no)
+
+def _is_return_true(node):
+    return node.node_type == "Return" and node.children[0].node_type == "Bool" and node.children[0].value is True
+
+# Rewrites each block exactly as the interpreter runs it. An if whose test is a
+# constant (or whose branch decisions maps by id) is replaced by the statements
+# that run: its then branch, or what runs when the test fails, spliced into the
+# block just as the interpreter continues there. Statements after an if that
+# never continues past it are dropped. Statements before a block's first if all
+# have to hold, so one returning False makes the block return False and a
+# Return True that is not the last statement adds nothing.
+#
+# Whether a block always returns decides what runs when an enclosing if's test
+# fails, so a block inside an if is only rewritten when it still always returns
+# exactly when it did. Statements come back as (statement, always_returns), and
+# returns holds the same for each rebuilt if.
+class _DeadCodeEliminator:
+    def __init__(self, decisions=None):
+        self.decisions = decisions or {}
+        self.decided = {}
+        self.returns = {}
+
+    def visit(self, node):
+        if node.node_type == "Module":
+            results = yield from visit_all(node.children)
+            return _rebuild(node, [child for child, _ in results]), False
+
+        if node.node_type == "FunctionDef":
+            body, _ = yield from self._block(node.children, nested=False)
+            if not body:
+                body = [_return(False, node.line_no)]
+            return _rebuild(node, body), False
+
+        if node.node_type == "If":
+            test, then_branch, else_branch = split_if(node)
+            then_branch, then_returns = yield from self._block(then_branch)
+            else_branch, else_returns = yield from self._block(else_branch)
+            rebuilt = _rebuild(node, [test] + then_branch + else_branch, value=len(then_branch))
+            decision = self.decisions.get(id(node))
+            self.decided[rebuilt] = _constant_test(rebuilt) if decision is None else decision
+            self.returns[rebuilt] = then_returns and else_returns
+            return rebuilt, then_returns and else_returns
+
+        return node, node.node_type == "Return"
+
+    def _block(self, statements, nested=True):
+        results = yield from visit_all(statements)
+        block = [statement for statement, _ in results]
+        returns = bool(results) and results[-1][1]
+        spliced = self._splice(block)
+        if not nested:
+            return spliced, self._returns(spliced)
+        if self._returns(spliced) == returns:
+            return spliced, returns
+        return block, returns
+
+    def _returns(self, statements):
+        if not statements:
+            return False
+        last = statements[-1]
+        if last.node_type == "If":
+            return self.returns[last]
+        return last.node_type == "Return"
+
+    def _splice(self, statements):
+        result = []
+        while statements:
+            position = first_if(statements)
+            before = statements if position is None else statements[:position]
+            for statement in before:
+                if is_return_false(statement):
+                    result.append(statement)
+                    return self._drop_true_returns(result)
+            result.extend(before)
+            if position is None:
+                break
+            node = statements[position]
+            rest = statements[position + 1:]
+            _, then_branch, else_branch = split_if(node)
+            decision = self.decided[node]
+            if decision is None:
+                result.append(node)
+                if else_branch or not self._returns(then_branch):
+                    break
+                statements = rest
+            elif decision:
+                statements = then_branch or [_return(True, node.line_no)]
+            else:
+                statements = else_branch or (rest if self._returns(then_branch) else [])
+                if not statements:
+                    statements = [_return(False, node.line_no)]
+        return self._drop_true_returns(result)
+
+    def _drop_true_returns(self, statements):
+        last = len(statements) - 1
+        return [statement for position, statement in enumerate(statements)
+                if position == last or not _is_return_true(statement)]
+
+def eliminate_dead_code(node):
+    return walk(node, _DeadCodeEliminator().visit)[0]
+
+# Inlines the branch of each if that ReachabilityAnalysis found to be the only
+# one that can run, with the same rewriting as eliminate_dead_code.
+def prune_unreachable(node):
+    decisions = {}
+    for function in node.children if node.node_type == "Module" else [node]:
+        for finding in analyze_reachability(function):
+            decisions[id(finding.node)] = finding.reachable
+    if not decisions:
+        return node
+    return walk(node, _DeadCodeEliminator(decisions).visit)[0]
+
+class PassManager:
+    def __init__(self, passes):
+        self.passes = list(passes)
+
+    def run(self, ir):
+        for optimization in self.passes:
+            ir = optimization(ir)
+        return ir
+
+PIPELINES = {
+    0: [],
+    1: [fold_constants, prune_unreachable, eliminate_dead_code, hash_cons],
+    2: [flatten_conjunctions, fold_constants, prune_unreachable, eliminate_dead_code, hash_cons],
+}
+
+def optimize(ir, level=1):
+    return PassManager(PIPELINES[level]).run(ir)
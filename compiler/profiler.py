@@ -0,0 +1,144 @@
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+def tree_shape(root):
+    if root is None:
+        return 0, 0
+    nodes = 0
+    depth = 0
+    stack = [(root, 1)]
+    while stack:
+        node, level = stack.pop()
+        nodes += 1
+        depth = max(depth, level)
+        stack.extend((child, level + 1) for child in node.children if child is not None)
+    return nodes, depth
+
+class StageRecord:
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.seconds = 0.0
+        self.allocated_bytes = None
+        self.peak_bytes = None
+        self.nodes = None
+        self.depth = None
+        self.output_bytes = None
+
+    def measure_tree(self, root):
+        self.nodes, self.depth = tree_shape(root)
+
+    def to_dict(self):
+        record = {"name": self.name, "start": self.start, "seconds": self.seconds}
+        for field in ("allocated_bytes", "peak_bytes", "nodes", "depth", "output_bytes"):
+            value = getattr(self, field)
+            if value is not None:
+                record[field] = value
+        return record
+
+class CountingStream:
+    def __init__(self, stream):
+        self.stream = stream
+        self.written = 0
+
+    def write(self, text):
+        self.written += len(text.encode("utf-8"))
+        self.stream.write(text)
+
+# Collects per-stage timings for each compiled contract. Memory figures come
+# from tracemalloc, which is only started while a stage runs under a profiler
+# created with memory=True. Profiles are plain dicts so worker processes can
+# return them to the parent.
+class Profiler:
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.contracts = []
+        self.current = None
+
+    @contextlib.contextmanager
+    def contract(self, name):
+        profile = {"contract": name, "pid": os.getpid(), "stages": []}
+        self.current = profile
+        try:
+            yield profile
+        finally:
+            profile["total_seconds"] = sum(stage["seconds"] for stage in profile["stages"])
+            self.contracts.append(profile)
+            self.current = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = StageRecord(name, time.perf_counter())
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - record.start
+            if self.memory:
+                after, peak = tracemalloc.get_traced_memory()
+                record.allocated_bytes = after - before
+                record.peak_bytes = peak - before
+            if tracing:
+                tracemalloc.stop()
+            if self.current is None:
+                self.current = {"contract": "<source>", "pid": os.getpid(), "stages": [], "total_seconds": 0.0}
+                self.contracts.append(self.current)
+            self.current["stages"].append(record.to_dict())
+
+    def extend(self, profiles):
+        self.contracts.extend(profiles)
+
+    def to_json(self):
+        origin = self._origin()
+        contracts = []
+        for profile in self.contracts:
+            stages = [dict(stage, start=stage["start"] - origin) for stage in profile["stages"]]
+            contracts.append(dict(profile, stages=stages))
+        return {"contracts": contracts}
+
+    # Chrome trace event format (chrome://tracing, Perfetto): one complete event
+    # per stage, one thread per contract, timestamps in microseconds.
+    def chrome_trace(self):
+        origin = self._origin()
+        events = []
+        for tid, profile in enumerate(self.contracts, 1):
+            events.append({"name": "thread_name", "ph": "M", "pid": profile["pid"], "tid": tid,
+                           "args": {"name": profile["contract"]}})
+            for stage in profile["stages"]:
+                args = {k: v for k, v in stage.items() if k not in ("name", "start", "seconds")}
+                events.append({
+                    "name": stage["name"],
+                    "cat": "compile",
+                    "ph": "X",
+                    "ts": (stage["start"] - origin) * 1e6,
+                    "dur": stage["seconds"] * 1e6,
+                    "pid": profile["pid"],
+                    "tid": tid,
+                    "args": dict(args, contract=profile["contract"]),
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_profile(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def _origin(self):
+        starts = [stage["start"] for profile in self.contracts for stage in profile["stages"]]
+        return min(starts) if starts else 0.0
+
+def stage(profiler, name):
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name)
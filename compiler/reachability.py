@@ -0,0 +1,207 @@
+from compiler.ast_parser import ParamInt, ParamStr
+from compiler.bdd import BDD, FALSE, TRUE
+from compiler.dispatch import effective_else, first_if, is_invalid
+from compiler.ir import split_if, structural_key
+from compiler.traversal import visit_all, walk
+
+# The staged front end's AST names for IR node types, so the analysis runs on
+# either tree.
+KINDS = {
+    "PylutusSig": "SigCheck",
+    "PylutusDatum": "DatumCheck",
+    "PylutusRedeemer": "RedeemerCheck",
+    "PylutusPay": "Pay",
+    "BoolOp": "And",
+}
+SUBJECTS = ("DatumCheck", "RedeemerCheck")
+MIRRORED = {"Gt": "Lt", "GtE": "LtE"}
+# Datum and redeemer bits sit above every other variable.
+_DOMAIN_BASE = -(1 << 62)
+
+def _kind(node):
+    return KINDS.get(node.node_type, node.node_type)
+
+def _literal(value):
+    return not isinstance(value, (ParamStr, ParamInt))
+
+class Finding:
+    def __init__(self, node, reachable, message):
+        self.node = node
+        self.reachable = reachable
+        self.message = message
+
+# Which branches of a validator's ifs can run, following the interpreter's
+# semantics: statements before a block's first if must hold, a failing test
+# continues with the effective else, and the path condition of a branch is the
+# conjunction of every test and requirement on the way to it. Guards become
+# BDDs: a signature, an opaque comparison or any other atom is one variable,
+# while the literal values checked against the datum (or redeemer) are codes of
+# one bit vector, so two different values can never hold together and codes
+# past the last value stand for any other one. Template parameters stay
+# symbolic. Variables are numbered newest first, so conjoining a path with a
+# new guard touches only the top of the path's diagram, and ifs inside a branch
+# that can never run are not visited, so the cost follows the number of guards
+# rather than the number of paths.
+#
+# findings holds one Finding per if with a branch that can never run;
+# reachable is then True when only the then branch can run, False when only
+# the else branch can.
+class ReachabilityAnalysis:
+    def __init__(self):
+        self.bdd = BDD()
+        self.atoms = {}
+        self.codes = {}
+        self.bits = {}
+        self.conditions = {}
+        self.findings = []
+        self._next = 0
+
+    def analyze(self, function):
+        if not self._collect_codes(function):
+            return self.findings
+        returns = {}
+        work = [(function.children, TRUE)]
+        while work:
+            statements, path = work.pop()
+            position = first_if(statements)
+            if position is None:
+                continue
+            for statement in statements[:position]:
+                path = self.bdd.conjoin(path, self._requirement(statement))
+            if path == FALSE:
+                continue
+            node = statements[position]
+            test, then_branch, _ = split_if(node)
+            otherwise = effective_else(node, statements[position + 1:], returns)
+            condition = self.condition(test)
+            then_path = self.bdd.conjoin(path, condition)
+            else_path = self.bdd.conjoin(path, self.bdd.negate(condition))
+            if not (test.node_type == "Bool" and test.value is True):
+                self._report(node, condition, then_path, else_path, otherwise)
+            if else_path != FALSE and not is_invalid(otherwise):
+                work.append((otherwise, else_path))
+            if then_path != FALSE:
+                work.append((then_branch, then_path))
+        return self.findings
+
+    def _report(self, node, condition, then_path, else_path, otherwise):
+        line = node.line_no
+        if then_path == FALSE:
+            if condition == FALSE:
+                message = f"Unreachable branch at line {line}: its condition can never hold"
+            else:
+                message = f"Unreachable branch at line {line}: earlier conditions already cover it"
+            self.findings.append(Finding(node, False, message))
+        elif else_path == FALSE:
+            if is_invalid(otherwise):
+                message = f"Redundant condition at line {line}: it always holds there"
+            else:
+                message = f"Unreachable else branch at line {line}: the condition always holds there"
+            self.findings.append(Finding(node, True, message))
+
+    # What a statement before the first if of a block requires to continue.
+    def _requirement(self, node):
+        kind = _kind(node)
+        if kind == "SigCheck":
+            return self.condition(node)
+        if kind == "Return":
+            value = node.children[0]
+            if value.node_type == "Bool":
+                return TRUE if value.value else FALSE
+            if _kind(value) == "SigCheck":
+                return self.condition(value)
+            return FALSE
+        return TRUE
+
+    def condition(self, node):
+        return walk(node, self._condition)
+
+    def _condition(self, node):
+        result = self.conditions.get(id(node))
+        if result is not None:
+            return result
+        if _kind(node) == "And":
+            return self._conjunction(node)
+        result = self._atom(node)
+        self.conditions[id(node)] = result
+        return result
+
+    # The operands of a nested and-chain are gathered first and conjoined from
+    # the bottom variable up, so each step only adds to the top of the result.
+    def _conjunction(self, node):
+        operands = []
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            if _kind(current) == "And":
+                pending.extend(reversed(current.children))
+            else:
+                operands.append(current)
+        results = yield from visit_all(operands)
+        variables = self.bdd.variables
+        result = TRUE
+        for operand in sorted(results, key=lambda operand: variables[operand], reverse=True):
+            result = self.bdd.conjoin(operand, result)
+        self.conditions[id(node)] = result
+        return result
+
+    def _atom(self, node):
+        kind = _kind(node)
+        if kind == "Bool":
+            return TRUE if node.value else FALSE
+        if kind in SUBJECTS and _literal(node.value):
+            code = self.codes[kind][node.value]
+            return self.bdd.cube([(bit, bool(code >> position & 1)) for position, bit in enumerate(self.bits[kind])])
+        if kind == "Compare":
+            return self._compare(node)
+        return self._variable((kind,) + structural_key(node)[1:])
+
+    # Gt and GtE are mirrored to Lt and LtE, and NotEq is the negation of Eq over
+    # the unordered operand pair, so `a > b` and `b < a` share a variable.
+    def _compare(self, node):
+        op = node.value
+        left, right = (structural_key(child) for child in node.children)
+        if op in MIRRORED:
+            op, left, right = MIRRORED[op], right, left
+        if op not in ("Eq", "NotEq"):
+            return self._variable(("Compare", op, left, right))
+        if left == right:
+            return TRUE if op == "Eq" else FALSE
+        equal = self._variable(("Eq", frozenset((left, right))))
+        return equal if op == "Eq" else self.bdd.negate(equal)
+
+    def _variable(self, key):
+        variable = self.atoms.get(key)
+        if variable is None:
+            self._next -= 1
+            variable = self.atoms[key] = self._next
+        return self.bdd.variable(variable)
+
+    # Numbers the literal values of each subject in order of appearance and
+    # gives the subject enough bits for one code more than it has values.
+    # Returns False for a tree with statements the parser dropped, which is
+    # left unanalysed.
+    def _collect_codes(self, function):
+        stack = [function]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                return False
+            kind = _kind(node)
+            if kind in SUBJECTS and _literal(node.value):
+                codes = self.codes.setdefault(kind, {})
+                codes.setdefault(node.value, len(codes))
+            stack.extend(reversed(node.children))
+        base = _DOMAIN_BASE
+        for kind, codes in self.codes.items():
+            width = len(codes).bit_length()
+            self.bits[kind] = list(range(base, base + width))
+            base += width
+        return True
+
+def analyze_reachability(function):
+    return ReachabilityAnalysis().analyze(function)
+
+def reachability_warnings(root):
+    functions = root.children if root.node_type == "Module" else [root]
+    return [finding.message for function in functions for finding in analyze_reachability(function)]
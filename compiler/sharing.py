@@ -0,0 +1,91 @@
+from collections import Counter
+
+from compiler.dispatch import first_if
+from compiler.ir import split_if
+
+BINDABLE = frozenset(("SigCheck", "DatumCheck", "RedeemerCheck", "And", "Compare"))
+
+# Walks the statements HaskellEmitter renders, in emission order, and returns the
+# condition roots it renders (if tests, chain guards, signature statements) and
+# the party keys of the pay statements.
+def _emitted(function, plan):
+    roots = []
+    pays = []
+    blocks = [function.children]
+    while blocks:
+        statements = blocks.pop()
+        position = first_if(statements)
+        for statement in statements if position is None else statements[:position]:
+            if statement.node_type == "SigCheck":
+                roots.append(statement)
+            elif statement.node_type == "Return" and statement.children[0].node_type == "SigCheck":
+                roots.append(statement.children[0])
+            elif statement.node_type == "Pay":
+                pays.append(statement.value["addr"])
+        if position is None:
+            continue
+        node = statements[position]
+        chain = plan.chain(node)
+        if chain is None:
+            test, then_branch, _ = split_if(node)
+            roots.append(test)
+            blocks.append(plan.effective_else(node, statements[position + 1:]))
+            blocks.append(then_branch)
+            continue
+        for clause in chain.clauses:
+            condition = clause.rest if chain.strategy == "tagged" else clause.test
+            if condition is not None:
+                roots.append(condition)
+        blocks.extend(reversed([clause.body for clause in chain.clauses]))
+    return roots, pays
+
+# Decides which conditions the emitter binds once with `let` and which party
+# keys it hoists to top-level PubKeyHash bindings. Conditions are shared when
+# the hash-consed IR renders the same node more than once; a node inside a bound
+# condition is rendered once, as part of the binding. bindings lists the shared
+# nodes children first, so every binding only refers to earlier ones.
+class SharingPlan:
+    def __init__(self, function, plan, enabled=True):
+        self.names = {}
+        self.bindings = []
+        self.key_uses = Counter()
+        if not enabled:
+            return
+        roots, pays = _emitted(function, plan)
+
+        order = []
+        seen = set()
+        stack = [(root, False) for root in reversed(roots)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                order.append(node)
+                continue
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+
+        uses = Counter(id(root) for root in roots)
+        rendered = {}
+        for node in reversed(order):
+            count = uses[id(node)]
+            if count > 1 and node.node_type in BINDABLE:
+                count = 1
+                self.names[id(node)] = None
+            rendered[id(node)] = count
+            for child in node.children:
+                uses[id(child)] += count
+
+        for node in order:
+            if id(node) in self.names:
+                self.names[id(node)] = f"cond{len(self.bindings) + 1}"
+                self.bindings.append(node)
+            if node.node_type == "SigCheck":
+                self.key_uses[("pylutus_sig", node.value)] += rendered[id(node)]
+        for key in pays:
+            self.key_uses[("pylutus_pay", key)] += 1
+
+    def name(self, node):
+        return self.names.get(id(node))
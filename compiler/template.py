@@ -0,0 +1,98 @@
+from compiler.ast_parser import ParamInt, ParamStr
+from compiler.ir import IRNode
+
+PARAM_NAMES = {ParamStr: "a string", ParamInt: "an integer"}
+
+def _is_param(value):
+    return isinstance(value, (ParamStr, ParamInt))
+
+def _params_in(value):
+    if isinstance(value, dict):
+        return [v for v in value.values() if _is_param(v)]
+    return [value] if _is_param(value) else []
+
+def _substitute(value, values):
+    if isinstance(value, dict):
+        return {key: _substitute(item, values) for key, item in value.items()}
+    return values[value.name] if _is_param(value) else value
+
+# A validator compiled once with its template parameters still in place. The IR
+# nodes whose subtree holds a parameter value are recorded children-first, so
+# each instantiation rebuilds only those nodes, once each even where hash-consing
+# shares them between branches, and reuses every other subtree of the template.
+# Validators of one module that declare a parameter of the same name share it
+# (the first declaration's default wins), so one value reaches all of them.
+class TemplateIR:
+    def __init__(self, ir):
+        self.ir = ir
+        self.functions = {id(function) for function in ir.children}
+        self.params = {}
+        for function in ir.children:
+            for name, default in function.value.get("params", {}).items():
+                self.params.setdefault(name, default)
+        self.amounts = []
+        self.dirty = []
+        if self.params:
+            self._index()
+
+    def _index(self):
+        dirty = set()
+        seen = set()
+        stack = [(self.ir, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                if id(node) in seen:
+                    continue
+                seen.add(id(node))
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+                continue
+            if node.node_type == "Pay" and isinstance(node.value["amount"], ParamInt):
+                self.amounts.append((node.value["amount"].name, node.line_no))
+            if id(node) in self.functions or _params_in(node.value) or any(id(child) in dirty for child in node.children):
+                dirty.add(id(node))
+                self.dirty.append(node)
+
+    # Checks a parameter set the way the front end checks literal arguments and
+    # returns the full set of values (defaults filled in) and any errors.
+    def bind(self, values):
+        values = dict(values or {})
+        errors = [f"Unknown template parameter '{name}'" for name in values if name not in self.params]
+        bound = {}
+        for name, default in self.params.items():
+            value = values.get(name, default)
+            base = str if isinstance(default, ParamStr) else int
+            if type(value) is not base and not isinstance(value, type(default)):
+                errors.append(f"Template parameter '{name}' must be {PARAM_NAMES[type(default)]}")
+                continue
+            bound[name] = base(value)
+        for name, line_no in self.amounts:
+            if name not in bound:
+                continue
+            if bound[name] <= 0:
+                errors.append(f"Payment amount must be positive at line {line_no}")
+            elif bound[name] < 1000000:
+                errors.append(f"Payment amount must be at least 1 ADA at line {line_no}")
+        return bound, errors
+
+    def instantiate(self, values):
+        bound, errors = self.bind(values)
+        if errors:
+            return None, errors
+        return self.substitute(bound), []
+
+    # bound must hold a value for every parameter.
+    def substitute(self, bound):
+        if not self.dirty:
+            return self.ir
+        copies = {}
+        for node in self.dirty:
+            children = [copies.get(id(child), child) for child in node.children]
+            if id(node) in self.functions:
+                value = dict(node.value)
+                value.pop("params", None)
+            else:
+                value = _substitute(node.value, bound)
+            copies[id(node)] = IRNode(node.node_type, value, children, node.line_no)
+        return copies[id(self.ir)]
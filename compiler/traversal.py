@@ -0,0 +1,34 @@
+from types import GeneratorType
+
+# Runs a recursive tree walk on an explicit stack instead of the Python call
+# stack. visit(item) either returns its result directly (leaves) or returns a
+# generator that yields each child item it needs, receives that child's result
+# back from the yield, and returns its own result. Children are visited in the
+# order they are yielded, so side effects such as error reporting happen in the
+# same order as in the equivalent recursive code.
+def walk(root, visit):
+    result = visit(root)
+    if type(result) is not GeneratorType:
+        return result
+    stack = [result]
+    result = None
+    while stack:
+        try:
+            child = stack[-1].send(result)
+        except StopIteration as stop:
+            stack.pop()
+            result = stop.value
+            continue
+        result = visit(child)
+        if type(result) is GeneratorType:
+            stack.append(result)
+            result = None
+    return result
+
+# Yields each item to walk and returns the list of their results, for use with
+# `yield from` inside a visit generator.
+def visit_all(items):
+    results = []
+    for item in items:
+        results.append((yield item))
+    return results
@@ -0,0 +1,650 @@
+import hashlib
+import json
+
+from compiler.traversal import visit_all, walk
+
+EMPTY = ()
+
+# Untyped Plutus Core terms. kind is one of var, lam, apply, force, delay, con,
+# builtin and error. Variables and binders carry names; flat encoding and the
+# evaluator work on de Bruijn indices, where a var's value is its index instead.
+class Term:
+    __slots__ = ("kind", "value", "children")
+
+    def __init__(self, kind, value=None, children=EMPTY):
+        self.kind = kind
+        self.value = value
+        self.children = children
+
+def var(name):
+    return Term("var", name)
+
+def lam(name, body):
+    return Term("lam", name, (body,))
+
+def apply(function, *args):
+    for arg in args:
+        function = Term("apply", None, (function, arg))
+    return function
+
+def force(term):
+    return Term("force", None, (term,))
+
+def delay(term):
+    return Term("delay", None, (term,))
+
+def con(type_name, value):
+    return Term("con", (type_name, value))
+
+def builtin(name):
+    return Term("builtin", name)
+
+def error():
+    return Term("error")
+
+# Polymorphic builtins need one force per type variable before they can be
+# applied; builtin_term adds them.
+def builtin_term(name):
+    term = builtin(name)
+    for _ in range(BUILTINS[name][0]):
+        term = force(term)
+    return term
+
+def let(name, value, body):
+    return apply(lam(name, body), value)
+
+# (forces, arity) of the Plutus V1 builtins, in flat-encoding tag order.
+BUILTIN_SIGNATURES = [
+    ("addInteger", 0, 2), ("subtractInteger", 0, 2), ("multiplyInteger", 0, 2),
+    ("divideInteger", 0, 2), ("quotientInteger", 0, 2), ("remainderInteger", 0, 2),
+    ("modInteger", 0, 2), ("equalsInteger", 0, 2), ("lessThanInteger", 0, 2),
+    ("lessThanEqualsInteger", 0, 2), ("appendByteString", 0, 2), ("consByteString", 0, 2),
+    ("sliceByteString", 0, 3), ("lengthOfByteString", 0, 1), ("indexByteString", 0, 2),
+    ("equalsByteString", 0, 2), ("lessThanByteString", 0, 2), ("lessThanEqualsByteString", 0, 2),
+    ("sha2_256", 0, 1), ("sha3_256", 0, 1), ("blake2b_256", 0, 1),
+    ("verifyEd25519Signature", 0, 3), ("appendString", 0, 2), ("equalsString", 0, 2),
+    ("encodeUtf8", 0, 1), ("decodeUtf8", 0, 1), ("ifThenElse", 1, 3),
+    ("chooseUnit", 1, 2), ("trace", 1, 2), ("fstPair", 2, 1),
+    ("sndPair", 2, 1), ("chooseList", 2, 3), ("mkCons", 1, 2),
+    ("headList", 1, 1), ("tailList", 1, 1), ("nullList", 1, 1),
+    ("chooseData", 1, 6), ("constrData", 0, 2), ("mapData", 0, 1),
+    ("listData", 0, 1), ("iData", 0, 1), ("bData", 0, 1),
+    ("unConstrData", 0, 1), ("unMapData", 0, 1), ("unListData", 0, 1),
+    ("unIData", 0, 1), ("unBData", 0, 1), ("equalsData", 0, 2),
+    ("mkPairData", 0, 2), ("mkNilData", 0, 1), ("mkNilPairData", 0, 1),
+]
+BUILTINS = {name: (forces, arity) for name, forces, arity in BUILTIN_SIGNATURES}
+BUILTIN_TAGS = {name: tag for tag, (name, _, _) in enumerate(BUILTIN_SIGNATURES)}
+
+# Plutus Data values are tuples: ("Constr", tag, fields), ("Map", pairs),
+# ("List", items), ("I", integer) and ("B", bytes), with tuples for sequences so
+# equal data compare equal.
+def constr(tag, *fields):
+    return ("Constr", tag, tuple(fields))
+
+def data_map(pairs):
+    return ("Map", tuple((key, value) for key, value in pairs))
+
+def data_list(items):
+    return ("List", tuple(items))
+
+def data_int(value):
+    return ("I", value)
+
+def data_bytes(value):
+    return ("B", bytes(value))
+
+# Constant types are names for the ground types and ("list", t) or
+# ("pair", a, b) for the builtin containers.
+def type_text(type_name):
+    if isinstance(type_name, str):
+        return type_name
+    return "(" + " ".join(type_text(part) if i else part for i, part in enumerate(type_name)) + ")"
+
+def data_text(data):
+    kind = data[0]
+    if kind == "Constr":
+        return f"Constr {data[1]} [{', '.join(data_text(field) for field in data[2])}]"
+    if kind == "Map":
+        return f"Map [{', '.join(f'({data_text(k)}, {data_text(v)})' for k, v in data[1])}]"
+    if kind == "List":
+        return f"List [{', '.join(data_text(item) for item in data[1])}]"
+    if kind == "I":
+        return f"I {data[1]}"
+    return f"B #{data[1].hex()}"
+
+def constant_text(type_name, value):
+    if type_name == "integer":
+        return str(value)
+    if type_name == "bytestring":
+        return "#" + value.hex()
+    if type_name == "string":
+        return json.dumps(value, ensure_ascii=False)
+    if type_name == "unit":
+        return "()"
+    if type_name == "bool":
+        return "True" if value else "False"
+    if type_name == "data":
+        return f"({data_text(value)})"
+    if type_name[0] == "list":
+        return "[" + ", ".join(constant_text(type_name[1], item) for item in value) + "]"
+    return f"({constant_text(type_name[1], value[0])}, {constant_text(type_name[2], value[1])})"
+
+# Applications print as [f a b] rather than nested [[f a] b].
+def _text(term, out):
+    stack = [term]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            out.append(item)
+            continue
+        kind = item.kind
+        if kind == "var":
+            out.append(str(item.value))
+        elif kind == "lam":
+            out.append(f"(lam {item.value} ")
+            stack.extend((")", item.children[0]))
+        elif kind == "apply":
+            args = []
+            while item.kind == "apply":
+                args.append(item.children[1])
+                item = item.children[0]
+            out.append("[")
+            stack.append("]")
+            for arg in args:
+                stack.extend((arg, " "))
+            stack.append(item)
+        elif kind in ("force", "delay"):
+            out.append(f"({kind} ")
+            stack.extend((")", item.children[0]))
+        elif kind == "con":
+            type_name, value = item.value
+            out.append(f"(con {type_text(type_name)} {constant_text(type_name, value)})")
+        elif kind == "builtin":
+            out.append(f"(builtin {item.value})")
+        else:
+            out.append("(error)")
+
+def term_text(term):
+    out = []
+    _text(term, out)
+    return "".join(out)
+
+def term_size(term):
+    count = 0
+    stack = [term]
+    while stack:
+        term = stack.pop()
+        count += 1
+        stack.extend(term.children)
+    return count
+
+def _debruijn(item):
+    term, scope, depth = item
+    if term.kind == "var":
+        if term.value not in scope:
+            raise ValueError(f"Free variable '{term.value}' in UPLC term")
+        return Term("var", depth - scope[term.value] + 1)
+    if term.kind == "lam":
+        inner = dict(scope)
+        inner[term.value] = depth + 1
+        body = yield (term.children[0], inner, depth + 1)
+        return Term("lam", 0, (body,))
+    if not term.children:
+        return term
+    children = yield from visit_all((child, scope, depth) for child in term.children)
+    return Term(term.kind, term.value, tuple(children))
+
+# Replaces names with de Bruijn indices (1 refers to the nearest lambda).
+def to_debruijn(term):
+    return walk((term, {}, 0), _debruijn)
+
+# ---------------------------------------------------------------------------
+# CBOR encoding of Plutus Data, as done by the ledger: constructor tags 121-127
+# and 1280-1400 with 102 for the rest, indefinite-length non-empty lists,
+# definite maps, bytestrings chunked at 64 bytes and big integers as tags 2/3.
+
+def _cbor_head(major, argument):
+    if argument < 24:
+        return bytes([(major << 5) | argument])
+    for info, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+        if argument < 1 << (8 * size):
+            return bytes([(major << 5) | info]) + argument.to_bytes(size, "big")
+    raise ValueError("CBOR argument too large")
+
+def cbor_bytes(value):
+    return _cbor_head(2, len(value)) + value
+
+def _cbor_chunked_bytes(value):
+    if len(value) <= 64:
+        return cbor_bytes(value)
+    chunks = b"".join(cbor_bytes(value[i:i + 64]) for i in range(0, len(value), 64))
+    return b"\x5f" + chunks + b"\xff"
+
+def _cbor_list(items, out):
+    if not items:
+        out.append(b"\x80")
+        return
+    out.append(b"\x9f")
+    for item in items:
+        _cbor_data(item, out)
+    out.append(b"\xff")
+
+def _cbor_data(data, out):
+    kind = data[0]
+    if kind == "Constr":
+        tag = data[1]
+        if tag < 7:
+            out.append(_cbor_head(6, 121 + tag))
+        elif tag < 128:
+            out.append(_cbor_head(6, 1280 + tag - 7))
+        else:
+            out.append(_cbor_head(6, 102))
+            out.append(b"\x82")
+            out.append(_cbor_int(tag))
+        _cbor_list(data[2], out)
+    elif kind == "Map":
+        out.append(_cbor_head(5, len(data[1])))
+        for key, value in data[1]:
+            _cbor_data(key, out)
+            _cbor_data(value, out)
+    elif kind == "List":
+        _cbor_list(data[1], out)
+    elif kind == "I":
+        out.append(_cbor_int(data[1]))
+    else:
+        out.append(_cbor_chunked_bytes(data[1]))
+
+def _cbor_int(value):
+    if 0 <= value < 1 << 64:
+        return _cbor_head(0, value)
+    if -(1 << 64) <= value < 0:
+        return _cbor_head(1, -1 - value)
+    magnitude = value if value >= 0 else -1 - value
+    raw = magnitude.to_bytes((magnitude.bit_length() + 7) // 8, "big")
+    return _cbor_head(6, 2 if value >= 0 else 3) + _cbor_chunked_bytes(raw)
+
+def encode_data(data):
+    out = []
+    _cbor_data(data, out)
+    return b"".join(out)
+
+class _CborReader:
+    def __init__(self, raw):
+        self.raw = raw
+        self.position = 0
+
+    def byte(self):
+        if self.position >= len(self.raw):
+            raise ValueError("Truncated CBOR")
+        value = self.raw[self.position]
+        self.position += 1
+        return value
+
+    def head(self):
+        first = self.byte()
+        major, info = first >> 5, first & 31
+        if info < 24:
+            return major, info
+        if info == 31:
+            return major, None
+        size = {24: 1, 25: 2, 26: 4, 27: 8}.get(info)
+        if size is None:
+            raise ValueError("Invalid CBOR head")
+        start = self.position
+        self.position += size
+        if self.position > len(self.raw):
+            raise ValueError("Truncated CBOR")
+        return major, int.from_bytes(self.raw[start:self.position], "big")
+
+    def at_break(self):
+        if self.position < len(self.raw) and self.raw[self.position] == 0xff:
+            self.position += 1
+            return True
+        return False
+
+    def bytestring(self, major, length):
+        if major != 2:
+            raise ValueError("Expected a CBOR bytestring")
+        if length is not None:
+            start = self.position
+            self.position += length
+            if self.position > len(self.raw):
+                raise ValueError("Truncated CBOR")
+            return bytes(self.raw[start:self.position])
+        chunks = []
+        while not self.at_break():
+            chunks.append(self.bytestring(*self.head()))
+        return b"".join(chunks)
+
+    def items(self, length):
+        items = []
+        if length is None:
+            while not self.at_break():
+                items.append(self.data())
+        else:
+            for _ in range(length):
+                items.append(self.data())
+        return items
+
+    def data(self):
+        major, argument = self.head()
+        if major == 0:
+            return ("I", argument)
+        if major == 1:
+            return ("I", -1 - argument)
+        if major == 2:
+            return ("B", self.bytestring(major, argument))
+        if major == 4:
+            return ("List", tuple(self.items(argument)))
+        if major == 5:
+            pairs = []
+            if argument is None:
+                while not self.at_break():
+                    pairs.append((self.data(), self.data()))
+            else:
+                for _ in range(argument):
+                    pairs.append((self.data(), self.data()))
+            return ("Map", tuple(pairs))
+        if major == 6:
+            if argument in (2, 3):
+                magnitude = int.from_bytes(self.bytestring(*self.head()), "big")
+                return ("I", magnitude if argument == 2 else -1 - magnitude)
+            if 121 <= argument <= 127:
+                tag = argument - 121
+            elif 1280 <= argument <= 1400:
+                tag = argument - 1280 + 7
+            elif argument == 102:
+                major, length = self.head()
+                if major != 4 or length != 2:
+                    raise ValueError("Invalid general constructor")
+                tag = self.data()[1]
+            else:
+                raise ValueError(f"Unsupported CBOR tag {argument}")
+            major, length = self.head()
+            if major != 4:
+                raise ValueError("Constructor fields must be a list")
+            return ("Constr", tag, tuple(self.items(length)))
+        raise ValueError("Unsupported CBOR item in Plutus data")
+
+def decode_data(raw):
+    reader = _CborReader(raw)
+    data = reader.data()
+    if reader.position != len(raw):
+        raise ValueError("Trailing bytes after Plutus data")
+    return data
+
+def unwrap_cbor_bytes(raw):
+    reader = _CborReader(raw)
+    value = reader.bytestring(*reader.head())
+    if reader.position != len(raw):
+        raise ValueError("Trailing bytes after CBOR bytestring")
+    return value
+
+# ---------------------------------------------------------------------------
+# Flat encoding (Plutus Core specification, appendix C). Bits are written most
+# significant first; naturals are little-endian groups of 7 bits with a
+# continuation bit; padding ("filler") is zero bits followed by a one.
+
+TERM_TAGS = {"var": 0, "delay": 1, "lam": 2, "apply": 3, "con": 4, "force": 5, "error": 6, "builtin": 7}
+TAG_TERMS = {tag: kind for kind, tag in TERM_TAGS.items()}
+TYPE_TAGS = {"integer": 0, "bytestring": 1, "string": 2, "unit": 3, "bool": 4, "data": 8}
+TAG_TYPES = {tag: name for name, tag in TYPE_TAGS.items()}
+
+class BitWriter:
+    def __init__(self):
+        self.out = bytearray()
+        self.current = 0
+        self.used = 0
+
+    def bits(self, value, count):
+        for shift in range(count - 1, -1, -1):
+            self.current = (self.current << 1) | ((value >> shift) & 1)
+            self.used += 1
+            if self.used == 8:
+                self.out.append(self.current)
+                self.current = 0
+                self.used = 0
+
+    def filler(self):
+        self.bits(0, 7 - self.used)
+        self.bits(1, 1)
+
+    def natural(self, value):
+        while True:
+            group = value & 0x7f
+            value >>= 7
+            self.bits(group | (0x80 if value else 0), 8)
+            if not value:
+                return
+
+    def integer(self, value):
+        self.natural(value << 1 if value >= 0 else (-value << 1) - 1)
+
+    def bytestring(self, value):
+        self.filler()
+        for start in range(0, len(value), 255):
+            chunk = value[start:start + 255]
+            self.out.append(len(chunk))
+            self.out.extend(chunk)
+        self.out.append(0)
+
+class BitReader:
+    def __init__(self, raw):
+        self.raw = raw
+        self.position = 0
+
+    def bits(self, count):
+        end = self.position + count
+        if end > len(self.raw) * 8:
+            raise ValueError("Truncated flat encoding")
+        first, last = self.position >> 3, (end + 7) >> 3
+        window = int.from_bytes(self.raw[first:last], "big")
+        self.position = end
+        return (window >> ((last << 3) - end)) & ((1 << count) - 1)
+
+    def filler(self):
+        while not self.bits(1):
+            pass
+
+    def natural(self):
+        value = 0
+        shift = 0
+        while True:
+            group = self.bits(8)
+            value |= (group & 0x7f) << shift
+            shift += 7
+            if not group & 0x80:
+                return value
+
+    def integer(self):
+        value = self.natural()
+        return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+    def bytestring(self):
+        self.filler()
+        chunks = []
+        while True:
+            length = self.bits(8)
+            if not length:
+                return b"".join(chunks)
+            start = self.position >> 3
+            if start + length > len(self.raw):
+                raise ValueError("Truncated flat encoding")
+            chunks.append(bytes(self.raw[start:start + length]))
+            self.position += length * 8
+
+def _type_tags(type_name, tags):
+    if isinstance(type_name, str):
+        tags.append(TYPE_TAGS[type_name])
+    elif type_name[0] == "list":
+        tags.extend((7, 5))
+        _type_tags(type_name[1], tags)
+    else:
+        tags.extend((7, 7, 6))
+        _type_tags(type_name[1], tags)
+        _type_tags(type_name[2], tags)
+    return tags
+
+def _write_constant(writer, type_name, value):
+    if type_name == "integer":
+        writer.integer(value)
+    elif type_name == "bytestring":
+        writer.bytestring(value)
+    elif type_name == "string":
+        writer.bytestring(value.encode("utf-8"))
+    elif type_name == "bool":
+        writer.bits(1 if value else 0, 1)
+    elif type_name == "data":
+        writer.bytestring(encode_data(value))
+    elif type_name == "unit":
+        pass
+    elif type_name[0] == "list":
+        for item in value:
+            writer.bits(1, 1)
+            _write_constant(writer, type_name[1], item)
+        writer.bits(0, 1)
+    else:
+        _write_constant(writer, type_name[1], value[0])
+        _write_constant(writer, type_name[2], value[1])
+
+def _read_type(tags):
+    tag = tags.pop()
+    if tag in TAG_TYPES:
+        return TAG_TYPES[tag]
+    if tag != 7:
+        raise ValueError(f"Unknown constant type tag {tag}")
+    inner = tags.pop()
+    if inner == 5:
+        return ("list", _read_type(tags))
+    if inner == 7 and tags.pop() == 6:
+        first = _read_type(tags)
+        return ("pair", first, _read_type(tags))
+    raise ValueError("Unknown constant type application")
+
+def _read_constant(reader, type_name):
+    if type_name == "integer":
+        return reader.integer()
+    if type_name == "bytestring":
+        return reader.bytestring()
+    if type_name == "string":
+        return reader.bytestring().decode("utf-8")
+    if type_name == "bool":
+        return bool(reader.bits(1))
+    if type_name == "data":
+        return decode_data(reader.bytestring())
+    if type_name == "unit":
+        return None
+    if type_name[0] == "list":
+        items = []
+        while reader.bits(1):
+            items.append(_read_constant(reader, type_name[1]))
+        return tuple(items)
+    first = _read_constant(reader, type_name[1])
+    return (first, _read_constant(reader, type_name[2]))
+
+# Encodes a de Bruijn term; lambda binders take no bits.
+def _flat_term(writer, term):
+    stack = [term]
+    while stack:
+        term = stack.pop()
+        kind = term.kind
+        writer.bits(TERM_TAGS[kind], 4)
+        if kind == "var":
+            writer.natural(term.value)
+        elif kind == "con":
+            type_name, value = term.value
+            for tag in _type_tags(type_name, []):
+                writer.bits(1, 1)
+                writer.bits(tag, 4)
+            writer.bits(0, 1)
+            _write_constant(writer, type_name, value)
+        elif kind == "builtin":
+            writer.bits(BUILTIN_TAGS[term.value], 7)
+        else:
+            stack.extend(reversed(term.children))
+
+def _flat_read(reader):
+    def read(item):
+        kind = TAG_TERMS.get(reader.bits(4))
+        if kind is None:
+            raise ValueError("Unknown term tag in flat encoding")
+        if kind == "var":
+            index = reader.natural()
+            if not 0 < index <= item:
+                raise ValueError("Variable index out of scope in flat encoding")
+            return Term("var", f"v{item - index + 1}")
+        if kind == "lam":
+            body = yield item + 1
+            return Term("lam", f"v{item + 1}", (body,))
+        if kind == "apply":
+            function = yield item
+            arg = yield item
+            return Term("apply", None, (function, arg))
+        if kind in ("force", "delay"):
+            inner = yield item
+            return Term(kind, None, (inner,))
+        if kind == "con":
+            tags = []
+            while reader.bits(1):
+                tags.append(reader.bits(4))
+            tags.reverse()
+            type_name = _read_type(tags)
+            return Term("con", (type_name, _read_constant(reader, type_name)))
+        if kind == "builtin":
+            tag = reader.bits(7)
+            if tag >= len(BUILTIN_SIGNATURES):
+                raise ValueError(f"Unknown builtin tag {tag}")
+            return Term("builtin", BUILTIN_SIGNATURES[tag][0])
+        return Term("error")
+
+    return walk(0, read)
+
+# A complete script: the validator term and the Plutus Core language version
+# (1.0.0 for Plutus V1 scripts).
+class Program:
+    def __init__(self, term, version=(1, 0, 0)):
+        self.term = term
+        self.version = version
+
+    def text(self):
+        return f"(program {'.'.join(map(str, self.version))} {term_text(self.term)})"
+
+    def flat(self):
+        writer = BitWriter()
+        for part in self.version:
+            writer.natural(part)
+        _flat_term(writer, to_debruijn(self.term))
+        writer.filler()
+        return bytes(writer.out)
+
+    @classmethod
+    def from_flat(cls, raw):
+        reader = BitReader(raw)
+        version = tuple(reader.natural() for _ in range(3))
+        term = _flat_read(reader)
+        reader.filler()
+        if reader.position != len(raw) * 8:
+            raise ValueError("Trailing bytes after flat program")
+        return cls(term, version)
+
+    # The serialised script the ledger hashes and stores: the flat bytes as a
+    # CBOR bytestring.
+    def script_bytes(self):
+        return cbor_bytes(self.flat())
+
+    def script_hash(self):
+        return hashlib.blake2b(b"\x01" + self.script_bytes(), digest_size=28).hexdigest()
+
+    # cardano-cli text envelope; its cborHex wraps the serialised script in one
+    # more CBOR bytestring.
+    def envelope(self, description=""):
+        return {
+            "type": "PlutusScriptV1",
+            "description": description,
+            "cborHex": cbor_bytes(self.script_bytes()).hex(),
+        }
+
+    @classmethod
+    def from_envelope(cls, envelope):
+        return cls.from_flat(unwrap_cbor_bytes(unwrap_cbor_bytes(bytes.fromhex(envelope["cborHex"]))))
@@ -0,0 +1,327 @@
+import re
+
+from compiler.dispatch import DispatchPlan, failure_block, first_if, is_invalid
+from compiler.ir import split_if
+from compiler.sharing import SharingPlan
+from compiler.traversal import visit_all, walk
+from compiler.uplc import (Program, apply, builtin, builtin_term, con, constr, data_bytes, data_int, data_list,
+                           data_map, delay, error, force, lam, let, var)
+from compiler.uplc_optimizer import optimize_term
+
+# Field positions in the Plutus V1 TxInfo record.
+TX_INFO_OUTPUTS = 1
+TX_INFO_SIGNATORIES = 7
+VALIDATOR_ARGS = ("datum", "redeemer", "ctx")
+
+_HEX = re.compile(r"^(?:[0-9a-fA-F]{2})*$")
+
+# Party keys are hex-encoded public key hashes, as PubKeyHash string literals
+# are in the generated Haskell; anything else is taken as UTF-8 bytes.
+def key_bytes(key):
+    return bytes.fromhex(key) if _HEX.match(key) else key.encode("utf-8")
+
+def pubkeyhash_address(key):
+    return constr(0, constr(0, data_bytes(key_bytes(key))), constr(1))
+
+def lovelace_value(amount):
+    return data_map([(data_bytes(b""), data_map([(data_bytes(b""), data_int(amount))]))])
+
+def text_data(value):
+    return data_bytes(value.encode("utf-8"))
+
+# Plutus V1 ScriptContext data for a mock compiler.interpreter.ScriptContext
+# spending output 0 of an all-zero transaction id, with ada-only outputs to
+# public key addresses. Used to run compiled scripts against the interpreter.
+def script_context_data(ctx):
+    outputs = [constr(0, pubkeyhash_address(o.address), lovelace_value(o.lovelace), constr(1)) for o in ctx.outputs]
+    always = constr(0, constr(0, constr(0), constr(1)), constr(0, constr(2), constr(1)))
+    info = constr(
+        0,
+        data_list([]),
+        data_list(outputs),
+        data_map([]),
+        data_map([]),
+        data_list([]),
+        data_map([]),
+        always,
+        data_list([data_bytes(key_bytes(key)) for key in ctx.signatories]),
+        data_list([]),
+        constr(0, data_bytes(bytes(32))),
+    )
+    purpose = constr(1, constr(0, constr(0, data_bytes(bytes(32))), data_int(0)))
+    return constr(0, info, purpose)
+
+def validator_arguments(ctx):
+    return text_data(ctx.datum or ""), text_data(ctx.redeemer or ""), script_context_data(ctx)
+
+def _if(condition, then_term, else_term):
+    return force(apply(builtin_term("ifThenElse"), condition, delay(then_term), delay(else_term)))
+
+def _bool(value):
+    return con("bool", bool(value))
+
+def _not(term):
+    return apply(builtin_term("ifThenElse"), term, _bool(False), _bool(True))
+
+def _conjunction(terms):
+    terms = [term for term in terms if not (term.kind == "con" and term.value == ("bool", True))]
+    if not terms:
+        return _bool(True)
+    result = terms[-1]
+    for term in reversed(terms[:-1]):
+        result = _if(term, result, _bool(False))
+    return result
+
+def _field(record, index):
+    for _ in range(index):
+        record = apply(builtin_term("tailList"), record)
+    return apply(builtin_term("headList"), record)
+
+# Lowers a validator's IR straight to Untyped Plutus Core, with the semantics of
+# compiler.interpreter: statements before a block's first if must all hold, and
+# the if continues with its then branch or its effective else. The script takes
+# datum, redeemer and context as Plutus V1 data and fails (error) unless the
+# body holds. Signature and payment checks walk the context's signatories and
+# outputs with a list helper tied through a Z combinator; helpers and context
+# fields are bound once at the top, and only when used. From -O1 conditions the
+# Haskell emitter would let-bind are bound once as delayed terms, and the
+# result goes through the UPLC optimizer.
+class UPLCLowering:
+    def __init__(self, parties=None, options=None):
+        options = options or {}
+        self.parties = parties or {}
+        self.traces = not options.get("release")
+        self.level = options.get("opt_level", 0)
+        self.sharing = None
+        self._defining = None
+        self.returns = {}
+        self.used = set()
+        self.errors = []
+        self._names = 0
+
+    def fresh(self, base):
+        self._names += 1
+        return f"{base}_{self._names}"
+
+    def key(self, name):
+        return self.parties.get(name, name)
+
+    def trace_if_false(self, message, term):
+        if not self.traces:
+            return term
+        failure = apply(builtin_term("trace"), con("string", message), _bool(False))
+        if term.kind == "con" and term.value == ("bool", False):
+            return failure
+        return _if(term, _bool(True), failure)
+
+    def signature(self, key):
+        self.used.add("signatories")
+        member = apply(builtin("equalsData"), con("data", data_bytes(key_bytes(self.key(key)))))
+        return apply(var("anyList"), member, var("signatories"))
+
+    def payment(self, value, line_no):
+        amount = value["amount"]
+        if isinstance(amount, bool) or not isinstance(amount, int):
+            self.errors.append(f"UPLC supports integer payment amounts only at line {line_no}")
+            amount = 0
+        self.used.add("paysTo")
+        address = con("data", pubkeyhash_address(self.key(value["addr"])))
+        return apply(var("paysTo"), address, con("data", lovelace_value(amount)))
+
+    def lower(self, function):
+        self.sharing = SharingPlan(function, DispatchPlan(function, "linear"), bool(self.level))
+        bindings = []
+        for node in self.sharing.bindings:
+            self._defining = node
+            bindings.append((self.sharing.name(node), delay(self.condition(node))))
+        self._defining = None
+        body = walk(function.children, self._block)
+        body = force(apply(builtin_term("ifThenElse"), body, delay(con("unit", None)), delay(error())))
+        for name, definition in reversed(bindings):
+            body = let(name, definition, body)
+        body = self.wrap_helpers(body)
+        term = lam("datum", lam("redeemer", lam("ctx", body)))
+        if self.level:
+            term = optimize_term(term)
+        return Program(term)
+
+    def wrap_helpers(self, body):
+        helpers = []
+        if self.used:
+            helpers.append(("anyList", self.any_list()))
+            context = apply(builtin_term("sndPair"), apply(builtin("unConstrData"), var("ctx")))
+            info = apply(builtin_term("headList"), context)
+            helpers.append(("txInfoFields", apply(builtin_term("sndPair"), apply(builtin("unConstrData"), info))))
+        if "signatories" in self.used:
+            signatories = _field(var("txInfoFields"), TX_INFO_SIGNATORIES)
+            helpers.append(("signatories", apply(builtin("unListData"), signatories)))
+        if "paysTo" in self.used:
+            outputs = _field(var("txInfoFields"), TX_INFO_OUTPUTS)
+            helpers.append(("outputs", apply(builtin("unListData"), outputs)))
+            helpers.append(("paysTo", self.pays_to()))
+        for name, definition in reversed(helpers):
+            body = let(name, definition, body)
+        return body
+
+    # fix f = (\x -> f (\v -> x x v)) (\x -> f (\v -> x x v))
+    def fix(self):
+        f = self.fresh("f")
+        halves = []
+        for _ in range(2):
+            x, v = self.fresh("x"), self.fresh("v")
+            halves.append(lam(x, apply(var(f), lam(v, apply(var(x), var(x), var(v))))))
+        return lam(f, apply(halves[0], halves[1]))
+
+    # anyList p xs: whether p holds for some element of the builtin list xs.
+    def any_list(self):
+        go, p, xs = self.fresh("go"), self.fresh("p"), self.fresh("xs")
+        head = apply(builtin_term("headList"), var(xs))
+        tail = apply(builtin_term("tailList"), var(xs))
+        step = _if(apply(var(p), head), _bool(True), apply(var(go), var(p), tail))
+        body = force(apply(builtin_term("chooseList"), var(xs), delay(_bool(False)), delay(step)))
+        return apply(self.fix(), lam(go, lam(p, lam(xs, body))))
+
+    # paysTo address value: some output pays exactly value to address.
+    def pays_to(self):
+        address, value, output, fields = self.fresh("address"), self.fresh("value"), self.fresh("output"), self.fresh("fields")
+        matches = _conjunction([
+            apply(builtin("equalsData"), _field(var(fields), 0), var(address)),
+            apply(builtin("equalsData"), _field(var(fields), 1), var(value)),
+        ])
+        fields_of = apply(builtin_term("sndPair"), apply(builtin("unConstrData"), var(output)))
+        check = lam(output, let(fields, fields_of, matches))
+        return lam(address, lam(value, apply(var("anyList"), check, var("outputs"))))
+
+    def condition(self, node):
+        return walk(node, self._condition)
+
+    def _condition(self, node):
+        name = self.sharing.name(node)
+        if name is not None and node is not self._defining:
+            return force(var(name))
+        if node.node_type == "And":
+            operands = []
+            pending = [node]
+            while pending:
+                current = pending.pop()
+                if current.node_type == "And" and (current is node or self.sharing.name(current) is None):
+                    pending.extend(reversed(current.children))
+                else:
+                    operands.append(current)
+            terms = yield from visit_all(operands)
+            return _conjunction(terms)
+        elif node.node_type == "Compare":
+            return (yield from self._compare(node))
+        elif node.node_type == "DatumCheck":
+            return apply(builtin("equalsData"), var("datum"), con("data", text_data(node.value)))
+        elif node.node_type == "RedeemerCheck":
+            return apply(builtin("equalsData"), var("redeemer"), con("data", text_data(node.value)))
+        elif node.node_type == "SigCheck":
+            return self.signature(node.value)
+        elif node.node_type == "Bool":
+            return _bool(node.value)
+        self.errors.append(f"Unsupported condition {node.node_type} at line {node.line_no}")
+        return _bool(False)
+
+    # Names compare as data (datum and redeemer order as bytestrings); anything
+    # else compares as integers, booleans counting as 0 and 1 like in Python.
+    def _compare(self, node):
+        left, right = node.children
+        op = node.value
+        if op not in ("Eq", "NotEq", "Lt", "LtE", "Gt", "GtE"):
+            return _bool(False)
+        if op in ("Gt", "GtE"):
+            left, right = right, left
+            op = "Lt" if op == "Gt" else "LtE"
+        if "Name" in (left.node_type, right.node_type):
+            operands = [self._name(child) for child in (left, right)]
+            if op in ("Eq", "NotEq"):
+                equal = apply(builtin("equalsData"), *operands)
+                return equal if op == "Eq" else _not(equal)
+            if left.value == "ctx" or right.value == "ctx":
+                self.errors.append(f"The script context cannot be ordered at line {node.line_no}")
+                return _bool(False)
+            operands = [apply(builtin("unBData"), operand) for operand in operands]
+            name = "lessThanByteString" if op == "Lt" else "lessThanEqualsByteString"
+            return apply(builtin(name), *operands)
+        operands = []
+        for child in (left, right):
+            operands.append((yield from self._integer(child)))
+        if op in ("Eq", "NotEq"):
+            equal = apply(builtin("equalsInteger"), *operands)
+            return equal if op == "Eq" else _not(equal)
+        name = "lessThanInteger" if op == "Lt" else "lessThanEqualsInteger"
+        return apply(builtin(name), *operands)
+
+    def _name(self, node):
+        if node.node_type != "Name" or node.value not in VALIDATOR_ARGS:
+            self.errors.append(f"Cannot compare {node.value!r} at line {node.line_no}")
+            return con("data", data_int(0))
+        return var(node.value)
+
+    def _integer(self, node):
+        if node.node_type == "Num":
+            if isinstance(node.value, bool) or not isinstance(node.value, int):
+                self.errors.append(f"UPLC supports integer literals only at line {node.line_no}")
+                return con("integer", 0)
+            return con("integer", node.value)
+        if node.node_type == "Bool" and node.value is not None:
+            return con("integer", int(node.value))
+        term = yield node
+        return apply(builtin_term("ifThenElse"), term, con("integer", 1), con("integer", 0))
+
+    def statement(self, node):
+        if node.node_type == "Return":
+            value = node.children[0]
+            if value.node_type == "Bool":
+                return _bool(True) if value.value else self.trace_if_false("Return", _bool(False))
+            elif value.node_type == "SigCheck":
+                return self.trace_if_false("Signature check", self.condition(value))
+            return self.trace_if_false("Invalid return", _bool(False))
+        elif node.node_type == "Pay":
+            return self.trace_if_false("Payment failed", self.payment(node.value, node.line_no))
+        elif node.node_type == "SigCheck":
+            return self.trace_if_false("Signature check", self.condition(node))
+        return None
+
+    def statements(self, statements):
+        return [term for term in (self.statement(child) for child in statements) if term is not None]
+
+    # Lowers a block one if at a time. An if whose failing test is invalid
+    # continues down its then branch and any other continues with what runs
+    # when its test fails, so only then branches with a valid alternative are
+    # lowered by the walk. The ifs passed are joined into nested terms from the
+    # innermost out, so long if chains, nested or in sequence, neither deepen
+    # the walk nor copy the rest of the block.
+    def _block(self, statements):
+        levels = []
+        start = 0
+        while True:
+            position = first_if(statements, start)
+            if position is None:
+                term = _conjunction(self.statements(statements[start:]))
+                break
+            terms = self.statements(statements[start:position])
+            node = statements[position]
+            test, then_branch, _ = split_if(node)
+            test = self.condition(test)
+            otherwise = failure_block(statements, position, self.returns)
+            if otherwise is None or is_invalid(*otherwise):
+                levels.append((terms, test, None, self.trace_if_false("Invalid", _bool(False))))
+                statements, start = then_branch, 0
+                continue
+            then_term = yield then_branch
+            levels.append((terms, test, then_term, None))
+            statements, start = otherwise
+        for terms, test, then_term, else_term in reversed(levels):
+            if then_term is None:
+                then_term = term
+            else:
+                else_term = term
+            term = _conjunction(terms + [_if(test, then_term, else_term)])
+        return term
+
+def lower_validator(function, parties=None, options=None):
+    lowering = UPLCLowering(parties, options)
+    program = lowering.lower(function)
+    return program, lowering.errors
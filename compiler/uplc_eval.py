@@ -0,0 +1,300 @@
+import hashlib
+
+from compiler.uplc import BUILTINS, Term, constr, data_bytes, data_int, data_list, data_map, to_debruijn
+
+class EvaluationError(Exception):
+    def __init__(self, message, logs=()):
+        super().__init__(message)
+        self.logs = list(logs)
+
+class VCon:
+    __slots__ = ("type_name", "value")
+
+    def __init__(self, type_name, value):
+        self.type_name = type_name
+        self.value = value
+
+class VLambda:
+    __slots__ = ("body", "env")
+
+    def __init__(self, body, env):
+        self.body = body
+        self.env = env
+
+class VDelay:
+    __slots__ = ("body", "env")
+
+    def __init__(self, body, env):
+        self.body = body
+        self.env = env
+
+class VBuiltin:
+    __slots__ = ("name", "forces", "args")
+
+    def __init__(self, name, forces=0, args=()):
+        self.name = name
+        self.forces = forces
+        self.args = args
+
+def _unwrap(value, type_name):
+    if type(value) is not VCon or value.type_name != type_name:
+        raise EvaluationError(f"Expected a {type_name} constant")
+    return value.value
+
+def _data(value, kind):
+    data = _unwrap(value, "data")
+    if data[0] != kind:
+        raise EvaluationError(f"Expected {kind} data")
+    return data
+
+def _list(value):
+    if type(value) is not VCon or isinstance(value.type_name, str) or value.type_name[0] != "list":
+        raise EvaluationError("Expected a list constant")
+    return value.type_name[1], value.value
+
+def _pair(value):
+    if type(value) is not VCon or isinstance(value.type_name, str) or value.type_name[0] != "pair":
+        raise EvaluationError("Expected a pair constant")
+    return value.type_name, value.value
+
+def _integer(name, op):
+    return lambda a, b: VCon(name, op(_unwrap(a, "integer"), _unwrap(b, "integer")))
+
+def _bytes_compare(op):
+    return lambda a, b: VCon("bool", op(_unwrap(a, "bytestring"), _unwrap(b, "bytestring")))
+
+def _division(op):
+    def run(a, b):
+        divisor = _unwrap(b, "integer")
+        if divisor == 0:
+            raise EvaluationError("Division by zero")
+        return VCon("integer", op(_unwrap(a, "integer"), divisor))
+    return run
+
+def _quotient(a, b):
+    quotient = abs(a) // abs(b)
+    return quotient if (a >= 0) == (b >= 0) else -quotient
+
+def _head(value):
+    element_type, items = _list(value)
+    if not items:
+        raise EvaluationError("headList on an empty list")
+    return VCon(element_type, items[0])
+
+def _tail(value):
+    element_type, items = _list(value)
+    if not items:
+        raise EvaluationError("tailList on an empty list")
+    return VCon(("list", element_type), items[1:])
+
+def _index_bytes(a, b):
+    raw, index = _unwrap(a, "bytestring"), _unwrap(b, "integer")
+    if not 0 <= index < len(raw):
+        raise EvaluationError("indexByteString out of range")
+    return VCon("integer", raw[index])
+
+def _cons_bytes(a, b):
+    byte = _unwrap(a, "integer")
+    if not 0 <= byte < 256:
+        raise EvaluationError("consByteString byte out of range")
+    return VCon("bytestring", bytes([byte]) + _unwrap(b, "bytestring"))
+
+def _slice(a, b, c):
+    start, length, raw = _unwrap(a, "integer"), _unwrap(b, "integer"), _unwrap(c, "bytestring")
+    start = max(start, 0)
+    return VCon("bytestring", raw[start:start + max(length, 0)])
+
+def _decode_utf8(a):
+    try:
+        return VCon("string", _unwrap(a, "bytestring").decode("utf-8"))
+    except UnicodeDecodeError:
+        raise EvaluationError("decodeUtf8 on invalid UTF-8") from None
+
+def _choose_data(value, constr_case, map_case, list_case, int_case, bytes_case):
+    kind = _unwrap(value, "data")[0]
+    return {"Constr": constr_case, "Map": map_case, "List": list_case, "I": int_case, "B": bytes_case}[kind]
+
+def _choose_unit(unit, result):
+    _unwrap(unit, "unit")
+    return result
+
+def _nil(type_name):
+    def run(unit):
+        _unwrap(unit, "unit")
+        return VCon(("list", type_name), ())
+    return run
+
+def _mk_cons(item, rest):
+    element_type, items = _list(rest)
+    if type(item) is not VCon or item.type_name != element_type:
+        raise EvaluationError("mkCons element type mismatch")
+    return VCon(rest.type_name, (item.value,) + items)
+
+def _un_constr(value):
+    data = _data(value, "Constr")
+    return VCon(("pair", "integer", ("list", "data")), (data[1], data[2]))
+
+def _un_map(value):
+    return VCon(("list", ("pair", "data", "data")), _data(value, "Map")[1])
+
+# Builtins the evaluator implements; ifThenElse, chooseUnit, chooseList and
+# chooseData return one of their (already evaluated) arguments, trace logs its
+# message through the machine. verifyEd25519Signature is not supported.
+BUILTIN_FUNCTIONS = {
+    "addInteger": _integer("integer", lambda a, b: a + b),
+    "subtractInteger": _integer("integer", lambda a, b: a - b),
+    "multiplyInteger": _integer("integer", lambda a, b: a * b),
+    "divideInteger": _division(lambda a, b: a // b),
+    "quotientInteger": _division(_quotient),
+    "remainderInteger": _division(lambda a, b: a - b * _quotient(a, b)),
+    "modInteger": _division(lambda a, b: a % b),
+    "equalsInteger": _integer("bool", lambda a, b: a == b),
+    "lessThanInteger": _integer("bool", lambda a, b: a < b),
+    "lessThanEqualsInteger": _integer("bool", lambda a, b: a <= b),
+    "appendByteString": lambda a, b: VCon("bytestring", _unwrap(a, "bytestring") + _unwrap(b, "bytestring")),
+    "consByteString": _cons_bytes,
+    "sliceByteString": _slice,
+    "lengthOfByteString": lambda a: VCon("integer", len(_unwrap(a, "bytestring"))),
+    "indexByteString": _index_bytes,
+    "equalsByteString": _bytes_compare(lambda a, b: a == b),
+    "lessThanByteString": _bytes_compare(lambda a, b: a < b),
+    "lessThanEqualsByteString": _bytes_compare(lambda a, b: a <= b),
+    "sha2_256": lambda a: VCon("bytestring", hashlib.sha256(_unwrap(a, "bytestring")).digest()),
+    "sha3_256": lambda a: VCon("bytestring", hashlib.sha3_256(_unwrap(a, "bytestring")).digest()),
+    "blake2b_256": lambda a: VCon("bytestring", hashlib.blake2b(_unwrap(a, "bytestring"), digest_size=32).digest()),
+    "appendString": lambda a, b: VCon("string", _unwrap(a, "string") + _unwrap(b, "string")),
+    "equalsString": lambda a, b: VCon("bool", _unwrap(a, "string") == _unwrap(b, "string")),
+    "encodeUtf8": lambda a: VCon("bytestring", _unwrap(a, "string").encode("utf-8")),
+    "decodeUtf8": _decode_utf8,
+    "ifThenElse": lambda c, t, e: t if _unwrap(c, "bool") else e,
+    "chooseUnit": _choose_unit,
+    "fstPair": lambda p: VCon(_pair(p)[0][1], _pair(p)[1][0]),
+    "sndPair": lambda p: VCon(_pair(p)[0][2], _pair(p)[1][1]),
+    "chooseList": lambda xs, empty, other: other if _list(xs)[1] else empty,
+    "mkCons": _mk_cons,
+    "headList": _head,
+    "tailList": _tail,
+    "nullList": lambda xs: VCon("bool", not _list(xs)[1]),
+    "chooseData": _choose_data,
+    "constrData": lambda t, fs: VCon("data", constr(_unwrap(t, "integer"), *_list(fs)[1])),
+    "mapData": lambda ps: VCon("data", data_map(_list(ps)[1])),
+    "listData": lambda xs: VCon("data", data_list(_list(xs)[1])),
+    "iData": lambda i: VCon("data", data_int(_unwrap(i, "integer"))),
+    "bData": lambda b: VCon("data", data_bytes(_unwrap(b, "bytestring"))),
+    "unConstrData": _un_constr,
+    "unMapData": _un_map,
+    "unListData": lambda d: VCon(("list", "data"), _data(d, "List")[1]),
+    "unIData": lambda d: VCon("integer", _data(d, "I")[1]),
+    "unBData": lambda d: VCon("bytestring", _data(d, "B")[1]),
+    "equalsData": lambda a, b: VCon("bool", _unwrap(a, "data") == _unwrap(b, "data")),
+    "mkPairData": lambda a, b: VCon(("pair", "data", "data"), (_unwrap(a, "data"), _unwrap(b, "data"))),
+    "mkNilData": _nil("data"),
+    "mkNilPairData": _nil(("pair", "data", "data")),
+}
+
+class EvaluationResult:
+    def __init__(self, value, logs, steps):
+        self.value = value
+        self.logs = logs
+        self.steps = steps
+
+# A CEK machine over de Bruijn terms, run on an explicit frame stack so deeply
+# nested scripts evaluate without recursion. Environments are linked pairs
+# (value, rest). steps counts machine transitions and is capped by max_steps.
+def evaluate_term(term, max_steps=10_000_000):
+    logs = []
+    frames = []
+    env = None
+    steps = 0
+    computing = True
+    value = None
+    while True:
+        steps += 1
+        if steps > max_steps:
+            raise EvaluationError("Step limit exceeded", logs)
+        if computing:
+            kind = term.kind
+            if kind == "var":
+                scope = env
+                for _ in range(term.value - 1):
+                    scope = scope[1]
+                value = scope[0]
+            elif kind == "lam":
+                value = VLambda(term.children[0], env)
+            elif kind == "delay":
+                value = VDelay(term.children[0], env)
+            elif kind == "con":
+                value = VCon(*term.value)
+            elif kind == "builtin":
+                value = VBuiltin(term.value)
+            elif kind == "apply":
+                frames.append(("arg", term.children[1], env))
+                term = term.children[0]
+                continue
+            elif kind == "force":
+                frames.append(("force",))
+                term = term.children[0]
+                continue
+            else:
+                raise EvaluationError("Script called error", logs)
+            computing = False
+            continue
+
+        if not frames:
+            return EvaluationResult(value, logs, steps)
+        frame = frames.pop()
+        if frame[0] == "arg":
+            frames.append(("fun", value))
+            term, env = frame[1], frame[2]
+            computing = True
+        elif frame[0] == "force":
+            if type(value) is VDelay:
+                term, env = value.body, value.env
+                computing = True
+            elif type(value) is VBuiltin and not value.args and value.forces < BUILTINS[value.name][0]:
+                value = VBuiltin(value.name, value.forces + 1)
+            else:
+                raise EvaluationError("Forced a value that is not delayed", logs)
+        else:
+            function = frame[1]
+            if type(function) is VLambda:
+                term, env = function.body, (value, function.env)
+                computing = True
+            elif type(function) is VBuiltin and function.forces == BUILTINS[function.name][0]:
+                args = function.args + (value,)
+                if len(args) < BUILTINS[function.name][1]:
+                    value = VBuiltin(function.name, function.forces, args)
+                elif function.name == "trace":
+                    logs.append(_unwrap(args[0], "string"))
+                    value = args[1]
+                elif function.name in BUILTIN_FUNCTIONS:
+                    try:
+                        value = BUILTIN_FUNCTIONS[function.name](*args)
+                    except EvaluationError as e:
+                        raise EvaluationError(str(e), logs) from None
+                else:
+                    raise EvaluationError(f"Builtin {function.name} is not supported by this evaluator", logs)
+            else:
+                raise EvaluationError("Applied a value that is not a function", logs)
+
+def evaluate(term, max_steps=10_000_000):
+    return evaluate_term(to_debruijn(term), max_steps)
+
+class ValidatorResult:
+    def __init__(self, ok, logs, steps=None, error=None):
+        self.ok = ok
+        self.logs = logs
+        self.steps = steps
+        self.error = error
+
+# Applies a compiled validator to its datum, redeemer and context (Plutus data)
+# and reports whether it accepted: evaluation finished without error.
+def run_validator(program, datum, redeemer, context, max_steps=10_000_000):
+    term = Term("apply", None, (program.term, Term("con", ("data", datum))))
+    term = Term("apply", None, (term, Term("con", ("data", redeemer))))
+    term = Term("apply", None, (term, Term("con", ("data", context))))
+    try:
+        result = evaluate(term, max_steps)
+    except EvaluationError as e:
+        return ValidatorResult(False, e.logs, error=str(e))
+    return ValidatorResult(True, result.logs, result.steps)
@@ -0,0 +1,207 @@
+from collections import Counter
+
+from compiler.uplc import Term, apply, builtin, delay, force
+from compiler.traversal import visit_all, walk
+
+MAX_ROUNDS = 8
+
+def is_value(term):
+    return term.kind in ("lam", "delay", "con", "builtin", "var")
+
+def _variable_uses(term):
+    uses = Counter()
+    stack = [term]
+    while stack:
+        term = stack.pop()
+        if term.kind == "var":
+            uses[term.value] += 1
+        stack.extend(term.children)
+    return uses
+
+# (condition, then, else) of a saturated `[(force (builtin ifThenElse)) c t e]`.
+def _if_parts(term):
+    parts = []
+    while term.kind == "apply" and len(parts) < 3:
+        parts.append(term.children[1])
+        term = term.children[0]
+    if len(parts) == 3 and term.kind == "force" and term.children[0].kind == "builtin" \
+            and term.children[0].value == "ifThenElse":
+        return parts[2], parts[1], parts[0]
+    return None
+
+def _is_pure_head(term):
+    while term.kind == "force":
+        term = term.children[0]
+    return is_value(term)
+
+# Whether evaluating term starts by evaluating the variable name: everything
+# evaluated before it is a value or a (forced) builtin, so nothing can fail or
+# trace first.
+def _evaluated_first(term, name):
+    while True:
+        if term.kind == "var":
+            return term.value == name
+        if term.kind == "force":
+            term = term.children[0]
+        elif term.kind == "apply":
+            function, arg = term.children
+            if function.kind == "var" and function.value == name:
+                return True
+            term = arg if _is_pure_head(function) else function
+        else:
+            return False
+
+def _bool_constant(term):
+    if term.kind == "con" and term.value[0] == "bool":
+        return term.value[1]
+    return None
+
+def _forced_bool(term):
+    return _bool_constant(term.children[0]) if term.kind == "delay" else None
+
+def _is_small(term):
+    return term.kind in ("con", "error")
+
+# (condition, then, else) of `(force [ifThenElse c (delay t) (delay e)])`.
+def _forced_if(term):
+    if term.kind != "force":
+        return None
+    parts = _if_parts(term.children[0])
+    if parts is None or parts[1].kind != "delay" or parts[2].kind != "delay":
+        return None
+    return parts[0], parts[1].children[0], parts[2].children[0]
+
+# Message of `[(force (builtin trace)) message (con bool b)]`, and b.
+def _trace_of_bool(term):
+    if term.kind != "apply" or _bool_constant(term.children[1]) is None:
+        return None
+    message = term.children[0]
+    if message.kind == "apply" and message.children[0].kind == "force" \
+            and message.children[0].children[0].kind == "builtin" \
+            and message.children[0].children[0].value == "trace":
+        return message, _bool_constant(term.children[1])
+    return None
+
+def _if_term(condition, then_term, else_term):
+    if_builtin = force(builtin("ifThenElse"))
+    return force(apply(if_builtin, condition, delay(then_term), delay(else_term)))
+
+# Case-of-case for small branches: `if (if c then a else b) then x else y`
+# becomes `if c then (if a then x else y) else (if b then x else y)`, down to
+# the leaves, where constants pick x or y and `trace m False` becomes a trace
+# in front of y. x and y are constants or error, so copying them is cheap.
+def _select(condition, then_term, else_term):
+    def visit(term):
+        parts = _forced_if(term)
+        if parts is not None:
+            test, first, second = parts
+            first = yield first
+            second = yield second
+            return _if_term(test, first, second)
+        chosen = _bool_constant(term)
+        if chosen is not None:
+            return then_term if chosen else else_term
+        traced = _trace_of_bool(term)
+        if traced is not None:
+            message, chosen = traced
+            return force(apply(message, delay(then_term if chosen else else_term)))
+        return _if_term(term, then_term, else_term)
+    return walk(condition, visit)
+
+# Unchanged terms are kept, so a round that rewrites little allocates little.
+def _rebuild(term, children):
+    if all(new is old for new, old in zip(children, term.children)):
+        return term
+    return Term(term.kind, term.value, tuple(children))
+
+# One bottom-up rewrite over a term whose binders all have distinct names (as
+# UPLCLowering produces them), so substituting a binding never captures a
+# variable. Rules, each preserving evaluation order and failure:
+#   [(lam x x) a]                        => a
+#   [(lam x b) v], x unused, v a value   => b
+#   [(lam x b) v], x used once, v value  => b with v in place of x
+#   [(lam x b) e], x used once and evaluated first in b => b with e for x
+#   (force (delay t))                    => t
+#   if on a constant, branches delayed   => the chosen branch
+#   if c then True else False            => c
+#   if (if ...) then x else y, x and y constants or error => see _select
+class _Rewriter:
+    def __init__(self, term):
+        self.uses = _variable_uses(term)
+        self.inline = {}
+        self.changed = False
+
+    def visit(self, term):
+        kind = term.kind
+        if kind == "var":
+            replacement = self.inline.pop(term.value, None)
+            if replacement is not None:
+                return replacement
+            return term
+        if not term.children:
+            return term
+        if kind == "apply" and term.children[0].kind == "lam":
+            function, arg = term.children
+            name, body = function.value, function.children[0]
+            if body.kind == "var" and body.value == name:
+                self.changed = True
+                return (yield arg)
+            uses = self.uses[name]
+            if uses <= 1 and is_value(arg) or uses == 1 and _evaluated_first(body, name):
+                self.changed = True
+                if uses:
+                    self.inline[name] = yield arg
+                return (yield body)
+        children = yield from visit_all(term.children)
+        if kind == "force":
+            return self._force(children[0]) or _rebuild(term, children)
+        rebuilt = _rebuild(term, children)
+        if kind == "apply":
+            return self._strict_if(rebuilt) or rebuilt
+        return rebuilt
+
+    def _force(self, inner):
+        if inner.kind == "delay":
+            self.changed = True
+            return inner.children[0]
+        parts = _if_parts(inner)
+        if parts is None or parts[1].kind != "delay" or parts[2].kind != "delay":
+            return None
+        condition, then_branch, else_branch = parts
+        chosen = _bool_constant(condition)
+        if chosen is not None:
+            self.changed = True
+            return (then_branch if chosen else else_branch).children[0]
+        if _forced_bool(then_branch) is True and _forced_bool(else_branch) is False:
+            self.changed = True
+            return condition
+        then_term, else_term = then_branch.children[0], else_branch.children[0]
+        if _is_small(then_term) and _is_small(else_term) and \
+                (_forced_if(condition) is not None or _trace_of_bool(condition) is not None):
+            self.changed = True
+            return _select(condition, then_term, else_term)
+        return None
+
+    def _strict_if(self, term):
+        parts = _if_parts(term)
+        if parts is None:
+            return None
+        condition, then_branch, else_branch = parts
+        chosen = _bool_constant(condition)
+        if chosen is not None and is_value(then_branch) and is_value(else_branch):
+            self.changed = True
+            return then_branch if chosen else else_branch
+        if _bool_constant(then_branch) is True and _bool_constant(else_branch) is False:
+            self.changed = True
+            return condition
+        return None
+
+# Rewrites until nothing changes (at most MAX_ROUNDS passes); each pass can
+# expose more work for the next, e.g. an inlined delay meeting its force.
+def optimize_term(term):
+    for _ in range(MAX_ROUNDS):
+        rewriter = _Rewriter(term)
+        term = walk(term, rewriter.visit)
+        if not rewriter.changed:
+            break
+    return term
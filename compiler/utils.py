@@ -1,3 +1,10 @@
+import re
+
 def log_error(message):
     print(f"Error: {message}")
 
+_LINE_PATTERN = re.compile(r"\bline (\d+)")
+
+def error_line(message):
+    match = _LINE_PATTERN.search(message)
+    return int(match.group(1)) if match else None
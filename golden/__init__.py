@@ -0,0 +1 @@
+# Golden-output regression runner for the Pylutus compiler
@@ -0,0 +1,285 @@
+import argparse
+import difflib
+import json
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from pylutus_forge import Diagnostic, collect_contracts, compile_contract, load_key_map
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONTRACTS = ["tests", "templates"]
+DEFAULT_GOLDEN_DIR = os.path.join("tests", "golden")
+DIAGNOSTICS_SUFFIX = ".diagnostics.json"
+
+# String literals stay whole so whitespace inside them still counts; everything
+# else is split into words and operator runs, so layout changes are ignored.
+_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\w+|[^\w\s"]+')
+
+# Which IR construct a line of generated Haskell comes from. A line can carry
+# several (an if test with a signature check and a redeemer comparison).
+CONSTRUCTS = [
+    ("Pay", re.compile(r"checkPayment ctx")),
+    ("SigCheck", re.compile(r"txSignedBy")),
+    ("RedeemerCheck", re.compile(r"redeemer (==|<)")),
+    ("DatumCheck", re.compile(r"datum (==|<)")),
+    ("And", re.compile(r"&&")),
+    ("If", re.compile(r"\bif\b|\belse\b|^\s*\)$")),
+    ("Dispatch", re.compile(r"^\s*case |->|^data |makeIsDataIndexed")),
+    ("Shared", re.compile(r"^\s*(let|in)$|\bcond\d+ =|^pkh\d+ ")),
+    ("Return", re.compile(r'"(Return|Valid|Invalid|Signature check|Invalid return)"|^\s*True$')),
+    ("Helper", re.compile(r"^checkPayment ::|^checkPayment ctx pkh amount|^\s+any \(")),
+    ("Header", re.compile(r"^(--|\{-#|import |mkValidator)")),
+]
+
+# Operand boundaries within a line: a change is attributed to the operand of an
+# and-chain or if/then it falls in rather than to everything on the line.
+_SEPARATOR = re.compile(r"&&|\bif\b|\bthen\b|\belse\b|\bin\b|(?<![=<>/])=(?!=)|\(|\)")
+
+def tokenize(text):
+    tokens = []
+    positions = []
+    for number, line in enumerate(text.splitlines(), 1):
+        for match in _TOKEN.finditer(line):
+            tokens.append(match.group())
+            positions.append((number, match.start()))
+    return tokens, positions
+
+def line_constructs(line):
+    return {name for name, pattern in CONSTRUCTS if pattern.search(line)}
+
+def token_constructs(lines, position, token):
+    found = line_constructs(token)
+    if found:
+        return found
+    number, column = position
+    line = lines[number - 1]
+    start, end = 0, len(line)
+    for match in _SEPARATOR.finditer(line):
+        if match.end() <= column:
+            start = match.end()
+        elif match.start() > column:
+            end = match.start()
+            break
+    return line_constructs(line[start:end]) or line_constructs(line)
+
+# Token-level diff of two programs. Returns None when they only differ in
+# whitespace, otherwise the number of changed tokens, the first difference as
+# (golden line, golden text, output line, output text) and the IR constructs
+# the changed tokens of either side belong to.
+def structural_diff(expected, actual):
+    if expected == actual:
+        return None
+    old, old_positions = tokenize(expected)
+    new, new_positions = tokenize(actual)
+    if old == new:
+        return None
+    expected_lines = expected.splitlines()
+    actual_lines = actual.splitlines()
+    changed = 0
+    first = None
+    constructs = set()
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        changed += max(i2 - i1, j2 - j1)
+        for index in range(i1, i2):
+            constructs |= token_constructs(expected_lines, old_positions[index], old[index])
+        for index in range(j1, j2):
+            constructs |= token_constructs(actual_lines, new_positions[index], new[index])
+        if first is None:
+            old_at = old_positions[min(i1, len(old) - 1)][0] if old else 0
+            new_at = new_positions[min(j1, len(new) - 1)][0] if new else 0
+            first = (
+                old_at, expected_lines[old_at - 1].strip() if old_at else "",
+                new_at, actual_lines[new_at - 1].strip() if new_at else "",
+            )
+    return changed, first, sorted(constructs)
+
+def golden_paths(path, root, golden_dir):
+    relative = os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0]
+    base = os.path.join(golden_dir, relative)
+    return base + ".hs", base + DIAGNOSTICS_SUFFIX
+
+def diagnostics_for(heading, errors):
+    return [
+        {"stage": d.stage, "line": d.line, "message": d.message}
+        for d in Diagnostic.from_errors(heading, errors)
+    ]
+
+class GoldenResult:
+    def __init__(self, path, status, golden=None, detail=None, constructs=None):
+        self.path = path
+        self.status = status
+        self.golden = golden
+        self.detail = detail
+        self.constructs = constructs or []
+
+    @property
+    def failed(self):
+        return self.status not in ("ok", "updated")
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+_worker_state = None
+
+def _init_worker(key_map, root, golden_dir, update, options):
+    global _worker_state
+    _worker_state = (key_map, root, golden_dir, update, options)
+
+# Compiles one contract and compares it with its golden file: the generated
+# program for contracts that compile, the expected diagnostics for those that
+# must fail. Exactly one of the two golden files is expected to exist; with
+# update the right one is (re)written and the other removed.
+def _check(path):
+    key_map, root, golden_dir, update, options = _worker_state
+    code_path, diagnostics_path = golden_paths(path, root, golden_dir)
+    try:
+        with open(path, 'r') as f:
+            source = f.read()
+        code, heading, errors = compile_contract(source, key_map, options)
+    except Exception as e:
+        return GoldenResult(path, "error", detail=f"{type(e).__name__}: {e}")
+
+    if errors:
+        golden, stale = diagnostics_path, code_path
+        output = json.dumps(diagnostics_for(heading, errors), indent=2) + "\n"
+    else:
+        golden, stale = code_path, diagnostics_path
+        output = code
+    expected = _read(golden)
+
+    if update:
+        if os.path.exists(stale):
+            os.remove(stale)
+        if expected == output:
+            return GoldenResult(path, "ok", golden)
+        _write(golden, output)
+        return GoldenResult(path, "updated", golden)
+
+    if expected is None:
+        if os.path.exists(stale):
+            status = "unexpected_failure" if errors else "unexpected_success"
+            detail = errors[0] if errors else None
+            return GoldenResult(path, status, stale, detail)
+        return GoldenResult(path, "missing", golden)
+    if errors:
+        if json.loads(expected) == json.loads(output):
+            return GoldenResult(path, "ok", golden)
+        return GoldenResult(path, "diagnostics_changed", golden, errors[0])
+    diff = structural_diff(expected, output)
+    if diff is None:
+        return GoldenResult(path, "ok", golden)
+    changed, first, constructs = diff
+    return GoldenResult(path, "changed", golden, (changed, first), constructs)
+
+# Goldens under golden_dir that no checked contract produces any more.
+def stale_goldens(results, root, golden_dir):
+    expected = set()
+    for result in results:
+        expected.update(os.path.abspath(p) for p in golden_paths(result.path, root, golden_dir))
+    stale = []
+    for directory, _, files in os.walk(golden_dir):
+        for name in files:
+            path = os.path.abspath(os.path.join(directory, name))
+            if (name.endswith(".hs") or name.endswith(DIAGNOSTICS_SUFFIX)) and path not in expected:
+                stale.append(path)
+    return sorted(stale)
+
+# Checks every contract in parallel. Each worker compiles and diffs its share
+# of the contracts itself, so only the verdicts travel back to this process.
+def run_golden(paths, key_map, root=ROOT, golden_dir=None, jobs=None, update=False, options=None):
+    golden_dir = golden_dir or os.path.join(root, DEFAULT_GOLDEN_DIR)
+    initargs = (key_map, root, golden_dir, update, options or {})
+    if jobs == 1 or len(paths) <= 1:
+        _init_worker(*initargs)
+        return [_check(path) for path in paths]
+    workers = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        return list(pool.map(_check, paths, chunksize=chunksize))
+
+def format_results(results, stale=()):
+    lines = []
+    for result in results:
+        if not result.failed:
+            continue
+        if result.status == "changed":
+            changed, (old_at, old_text, new_at, new_text) = result.detail
+            lines.append(f"{result.path}: {changed} tokens changed in {', '.join(result.constructs) or 'layout'}")
+            lines.append(f"    golden line {old_at}: {old_text}")
+            lines.append(f"    output line {new_at}: {new_text}")
+        elif result.status == "missing":
+            lines.append(f"{result.path}: no golden file (run with --update to create {result.golden})")
+        elif result.status == "unexpected_success":
+            lines.append(f"{result.path}: compiled, but {result.golden} expects it to fail")
+        elif result.status == "unexpected_failure":
+            lines.append(f"{result.path}: failed, but {result.golden} expects it to compile: {result.detail}")
+        elif result.status == "diagnostics_changed":
+            lines.append(f"{result.path}: diagnostics differ from {result.golden}: {result.detail}")
+        else:
+            lines.append(f"{result.path}: {result.detail}")
+    for path in stale:
+        lines.append(f"{path}: stale golden with no contract")
+
+    counts = Counter(result.status for result in results)
+    summary = f"Checked {len(results)} contracts: {counts['ok']} unchanged"
+    for status in ("updated", "changed", "diagnostics_changed", "missing", "unexpected_success", "unexpected_failure", "error"):
+        if counts[status]:
+            summary += f", {counts[status]} {status.replace('_', ' ')}"
+    if stale:
+        summary += f", {len(stale)} stale"
+    lines.append(summary)
+
+    constructs = Counter(name for result in results for name in result.constructs)
+    if constructs:
+        lines.append("Changed IR constructs: " + ", ".join(f"{name} ({count})" for name, count in constructs.most_common()))
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Compare compiled contracts against their golden outputs.")
+    arg_parser.add_argument("contracts", nargs="*", help=f"contract files, directories or glob patterns (default: {' '.join(DEFAULT_CONTRACTS)})")
+    arg_parser.add_argument("--golden-dir", help=f"directory holding the golden files (default: {DEFAULT_GOLDEN_DIR})")
+    arg_parser.add_argument("--root", default=ROOT, help="goldens mirror contract paths relative to this directory")
+    arg_parser.add_argument("--keys", help="key map file (default: pylutus_key.json under --root)")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: CPU count)")
+    arg_parser.add_argument("--update", action="store_true", help="rewrite goldens that changed, create missing ones and remove stale ones")
+    return arg_parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    root = os.path.abspath(args.root)
+    golden_dir = args.golden_dir or os.path.join(root, DEFAULT_GOLDEN_DIR)
+    patterns = args.contracts or [
+        path for path in (os.path.join(root, name) for name in DEFAULT_CONTRACTS) if os.path.isdir(path)
+    ]
+    paths = collect_contracts(patterns)
+    if not paths:
+        print("No .pylutus contracts found.")
+        return 2
+    key_map = load_key_map(args.keys or os.path.join(root, "pylutus_key.json"))
+
+    results = run_golden(paths, key_map, root, golden_dir, args.jobs, args.update)
+    stale = stale_goldens(results, root, golden_dir) if not args.contracts else []
+    if args.update:
+        for path in stale:
+            os.remove(path)
+        stale = []
+    print(format_results(results, stale))
+    return 1 if stale or any(result.failed for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+const path = require("path");
+const vscode = require("vscode");
+const { LanguageClient } = require("vscode-languageclient/node");
+
+let client;
+
+function activate(context) {
+    const config = vscode.workspace.getConfiguration("pylutus");
+    const python = config.get("pythonPath") || "python3";
+    const server = config.get("serverPath") || path.join(context.extensionPath, "..", "pylutus_server.py");
+    const keys = config.get("keyMapPath") || "pylutus_key.json";
+
+    const serverOptions = { command: python, args: [server, keys], options: { cwd: path.dirname(server) } };
+    const clientOptions = { documentSelector: [{ scheme: "file", language: "pylutus" }] };
+
+    client = new LanguageClient("pylutus", "Pylutus Language Server", serverOptions, clientOptions);
+    client.start();
+}
+
+function deactivate() {
+    return client ? client.stop() : undefined;
+}
+
+module.exports = { activate, deactivate };
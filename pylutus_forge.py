@@ -1,201 +1,1016 @@
+import argparse
+import contextlib
+import glob
+import io
 import json
-from compiler.ast_parser import PylutusParser
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from compiler.ast_parser import PylutusParser, validator_title
 from compiler.type_checker import TypeChecker
 from compiler.semantic_validator import SemanticValidator
-from compiler.ir import IRTransformer
+from compiler.ir import IRTransformer, split_if
+from compiler.dispatch import DECODERS, TYPE_NAMES, DispatchPlan, constructor_name, dispatch_strategy, first_if, is_invalid
+from compiler.optimizer import optimize
+from compiler.cost import check_budget, estimate_module_costs, format_report, load_cost_model, parse_budget
+from compiler.fused import FusedFrontEnd
+from compiler.cache import CompileCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from compiler.key_registry import KeyResolver, open_registry, registry_stamp
+from compiler.profiler import CountingStream, Profiler, stage
+from compiler.sharing import SharingPlan
+from compiler.template import TemplateIR
+from compiler.utils import error_line
+from compiler.traversal import visit_all, walk
+from compiler.uplc_codegen import lower_validator
 
 def load_key_map(file_path):
     with open(file_path, 'r') as f:
         return json.load(f)
 
-def generate_haskell_code(ir, key_map):
-    lines = [
-        "-- Auto-generated by Pylutus Forge",
-        "{-# INLINABLE mkValidator #-}",
-        "import PlutusTx.Prelude",
-        "import Plutus.V1.Ledger.Api"
-    ]
-
-    if ir.value["args"] == ["ctx"]:
-        lines.append("mkValidator :: ScriptContext -> Bool")
-        lines.append("mkValidator ctx =")
-    else:
-        lines.append("mkValidator :: Datum -> Redeemer -> ScriptContext -> Bool")
-        lines.append("mkValidator datum redeemer ctx =")
-
-    def generate_condition(node):
-        if node.node_type == "And":
-            return " && ".join(generate_condition(child) for child in node.children)
+# Columns of indentation nested ifs may reach.
+MAX_INDENT = 4 * 32
+
+HELPERS = {
+    "checkPayment": [
+        "checkPayment :: ScriptContext -> PubKeyHash -> Integer -> Bool",
+        "checkPayment ctx pkh amount =",
+        "    any (\\o -> txOutValue o == lovelaceValueOf amount && txOutAddress o == pubKeyHashAddress pkh) (txInfoOutputs $ scriptContextTxInfo ctx)"
+    ],
+}
+
+class HaskellEmitter:
+    def __init__(self, key_map, stream, parties=None, options=None):
+        options = options or {}
+        self.key_map = key_map
+        self.stream = stream
+        self.parties = parties or {}
+        self.constructors = {
+            macro: key_map.get(macro, {}).get("pubkeyhash", "PubKeyHash")
+            for macro in ("pylutus_sig", "pylutus_pay")
+        }
+        # Always-true `traceIfFalse "Return" True` / `"Valid" True` lines are only
+        # kept at -O0; release builds drop trace messages altogether.
+        self.traces = not options.get("release")
+        self.trace_wrappers = self.traces and not options.get("opt_level")
+        self.dispatch = dispatch_strategy(options)
+        self.plan = None
+        # From -O1 on, conditions the IR shares are bound once with `let` and
+        # repeated PubKeyHash constants become top-level bindings.
+        self.share = bool(options.get("opt_level"))
+        self.sharing = None
+        self.type_prefix = ""
+        self.hoisted = {}
+        self._defining = None
+        self.helpers = []
+        self._started = False
+
+    def line(self, text):
+        if self._started:
+            self.stream.write("\n")
+        self._started = True
+        self.stream.write(text)
+
+    def use_helper(self, name):
+        if name not in self.helpers:
+            self.helpers.append(name)
+
+    def pubkeyhash_text(self, macro, key):
+        return f"{self.constructors[macro]} \"{self.parties.get(key, key)}\""
+
+    def pubkeyhash(self, macro, key):
+        text = self.pubkeyhash_text(macro, key)
+        hoisted = self.hoisted.get(text)
+        return text if hoisted is None else hoisted[0]
+
+    def trace(self, message, expression):
+        if not self.traces:
+            return expression
+        if " " in expression:
+            expression = f"({expression})"
+        return f"traceIfFalse \"{message}\" {expression}"
+
+    # ir is a Module or a single FunctionDef. A module's validators share one
+    # Haskell module: the imports, the PubKeyHash constants used more than once
+    # across all of them and each helper are emitted once. With several
+    # validators the tagged dispatch types and constructors are prefixed with
+    # the validator's name so they cannot clash.
+    def emit(self, ir):
+        functions = ir.children if ir.node_type == "Module" else [ir]
+        validators = []
+        for function in functions:
+            plan = DispatchPlan(function, self.dispatch)
+            validators.append((function, plan, SharingPlan(function, plan, self.share)))
+        self.hoist_pubkeyhashes([sharing for _, _, sharing in validators])
+        self.line("-- Auto-generated by Pylutus Forge")
+        for function in functions:
+            self.line(f"{{-# INLINABLE {validator_function(function)} #-}}")
+        self.line("import PlutusTx.Prelude")
+        self.line("import Plutus.V1.Ledger.Api")
+        for function, plan, _ in validators:
+            self.use_validator(function, plan, None, len(functions) > 1)
+            self.emit_action_types()
+        for text, (name, macro) in self.hoisted.items():
+            self.line(f"{name} :: {self.constructors[macro]}")
+            self.line(f"{name} = {text}")
+
+        for index, (function, plan, sharing) in enumerate(validators):
+            if index:
+                self.line("")
+            self.use_validator(function, plan, sharing, len(functions) > 1)
+            self.emit_validator(function)
+
+        for name in self.helpers:
+            self.line("")
+            for text in HELPERS[name]:
+                self.line(text)
+
+    def use_validator(self, function, plan, sharing, prefixed):
+        self.plan = plan
+        self.sharing = sharing
+        self.type_prefix = validator_title(function.value["name"])[:-len("Validator")] if prefixed else ""
+
+    def emit_validator(self, function):
+        name = validator_function(function)
+        if function.value["args"] == ["ctx"]:
+            self.line(f"{name} :: ScriptContext -> Bool")
+            self.line(f"{name} ctx =")
+        else:
+            self.line(f"{name} :: Datum -> Redeemer -> ScriptContext -> Bool")
+            self.line(f"{name} datum redeemer ctx =")
+        self.emit_bindings()
+        self.emit_body(function)
+
+    def constructor(self, value):
+        return self.type_prefix + constructor_name(value)
+
+    # Tagged dispatch decodes the redeemer/datum into a constructor type whose
+    # on-chain encoding is the constructor index.
+    def emit_action_types(self):
+        for subject, values in self.plan.tagged.items():
+            type_name = self.type_prefix + TYPE_NAMES[subject]
+            names = [self.constructor(value) for value in values]
+            tags = ", ".join(f"('{name}, {index})" for index, name in enumerate(names))
+            self.line(f"data {type_name} = {' | '.join(names)}")
+            self.line(f"PlutusTx.makeIsDataIndexed ''{type_name} [{tags}]")
+
+    def hoist_pubkeyhashes(self, sharings):
+        uses = {}
+        for sharing in sharings:
+            for (macro, key), count in sharing.key_uses.items():
+                text = self.pubkeyhash_text(macro, key)
+                total, first_macro = uses.get(text, (0, macro))
+                uses[text] = (total + count, first_macro)
+        for text, (count, macro) in uses.items():
+            if count > 1:
+                self.hoisted[text] = (f"pkh{len(self.hoisted) + 1}", macro)
+
+    def emit_bindings(self):
+        if not self.sharing.bindings:
+            return
+        self.line("    let")
+        for node in self.sharing.bindings:
+            self._defining = node
+            self.line(f"        {self.sharing.name(node)} = {self.condition(node)}")
+        self._defining = None
+        self.line("    in")
+
+    def condition(self, node):
+        return walk(node, self._condition)
+
+    def _condition(self, node):
+        name = self.sharing.name(node)
+        if name is not None and node is not self._defining:
+            return name
+        if node.node_type in ("And", "Compare"):
+            return self._compound_condition(node)
         elif node.node_type == "DatumCheck":
             return f"datum == \"{node.value}\""
         elif node.node_type == "RedeemerCheck":
             return f"redeemer == \"{node.value}\""
         elif node.node_type == "SigCheck":
-            pkh = key_map.get("pylutus_sig", {}).get("pubkeyhash", "PubKeyHash") + f" \"{node.value}\""
-            return f"txSignedBy ctx {pkh}"
-        elif node.node_type == "Compare":
-            left = generate_condition(node.children[0])
-            right = generate_condition(node.children[1])
-            op = "==" if node.value == "Eq" else node.value.lower()
-            return f"{left} {op} {right}"
+            return f"txSignedBy ctx {self.pubkeyhash('pylutus_sig', node.value)}"
+        elif node.node_type == "Bool" and node.value is not None:
+            return str(node.value)
+        elif node.node_type == "Num":
+            return str(node.value)
         return "False"
 
-    def generate_statement(node):
+    # Nested and-chains render without parentheses, so their operands are joined
+    # once at the outermost And instead of rebuilding the string at every level.
+    def _compound_condition(self, node):
+        if node.node_type == "And":
+            operands = []
+            pending = [node]
+            while pending:
+                current = pending.pop()
+                if current.node_type == "And" and (current is node or self.sharing.name(current) is None):
+                    pending.extend(reversed(current.children))
+                else:
+                    operands.append(current)
+            parts = yield from visit_all(operands)
+            return " && ".join(parts)
+        parts = yield from visit_all(node.children)
+        op = "==" if node.value == "Eq" else node.value.lower()
+        return f"{parts[0]} {op} {parts[1]}"
+
+    # Returns the statement text (None when nothing needs emitting) and whether
+    # it counts as the branch's return.
+    def statement(self, node):
         if node.node_type == "Return":
             value = node.children[0]
             if value.node_type == "Bool":
-                return f"traceIfFalse \"Return\" {str(value.value).capitalize()}"
+                if value.value is True and not self.trace_wrappers:
+                    return None, True
+                return self.trace("Return", str(value.value).capitalize()), True
             elif value.node_type == "SigCheck":
-                pkh = key_map.get("pylutus_sig", {}).get("pubkeyhash", "PubKeyHash") + f" \"{value.value}\""
-                return f"traceIfFalse \"Signature check\" (txSignedBy ctx {pkh})"
-            return "traceIfFalse \"Invalid return\" False"
+                return self.trace("Signature check", self.condition(value)), False
+            return self.trace("Invalid return", "False"), False
         elif node.node_type == "Pay":
-            pkh = key_map.get("pylutus_pay", {}).get("pubkeyhash", "PubKeyHash") + f" \"{node.value['addr']}\""
-            amount = node.value["amount"]
-            return f"traceIfFalse \"Payment failed\" (checkPayment ctx {pkh} {amount})"
+            self.use_helper("checkPayment")
+            pkh = self.pubkeyhash("pylutus_pay", node.value["addr"])
+            return self.trace("Payment failed", f"checkPayment ctx {pkh} {node.value['amount']}"), False
         elif node.node_type == "SigCheck":
-            pkh = key_map.get("pylutus_sig", {}).get("pubkeyhash", "PubKeyHash") + f" \"{node.value}\""
-            return f"traceIfFalse \"Signature check\" (txSignedBy ctx {pkh})"
-        return "traceIfFalse \"Invalid\" False"
+            return self.trace("Signature check", self.condition(node)), False
+        return self.trace("Invalid", "False"), False
+
+    # Emits a branch's statements followed by its closing wrapper lines.
+    def emit_statements(self, statements, prefix):
+        has_return = False
+        emitted = 0
+        for child in statements:
+            if child.node_type in ["Pay", "Return", "SigCheck"]:
+                text, is_return = self.statement(child)
+                if text is not None:
+                    self.line(f"{prefix}{text}")
+                    emitted += 1
+                has_return = has_return or is_return
+        if self.trace_wrappers:
+            if not has_return:
+                self.line(f"{prefix}traceIfFalse \"Return\" True")
+            self.line(f"{prefix}traceIfFalse \"Valid\" True")
+        elif not emitted:
+            self.line(f"{prefix}True")
+
+    # Nested ifs indent one level each up to MAX_INDENT, then stay in line:
+    # if/then/else is not layout-sensitive, and without a limit the output of
+    # deeply nested ifs grows with the square of their depth. Case alternatives
+    # always indent, since layout decides where they end.
+    def indent(self, prefix):
+        return prefix if len(prefix) >= MAX_INDENT else prefix + "    "
+
+    def invalid(self, prefix):
+        return f"{prefix}{self.trace('Invalid', 'False')}"
+
+    # Emits a block iteratively: work items are either finished lines or
+    # ("block" | "if" | "guard" | "arms", ...) tuples expanded in order, so
+    # nested ifs need no recursion.
+    def emit_block(self, statements, prefix):
+        work = [("block", statements, prefix)]
+        while work:
+            item = work.pop()
+            if type(item) is str:
+                self.line(item)
+                continue
+            pending = getattr(self, "_expand_" + item[0])(*item[1:])
+            work.extend(reversed(pending))
+
+    def _expand_block(self, statements, prefix, start=0):
+        position = first_if(statements, start)
+        if position is None:
+            self.emit_statements(statements[start:], prefix)
+            return []
+        self.emit_statements_before_if(statements[start:position], prefix)
+        return self._branch_on(statements, position, prefix, f"{prefix}if")
 
-    def generate_body(node, indent=1):
+    def _branch_on(self, statements, position, prefix, opener):
+        chain = self.plan.chain(statements[position])
+        if chain is not None and chain.strategy == "tagged":
+            return self._case(chain, prefix)
+        if chain is not None:
+            return [("arms", chain.subject, chain.balanced_clauses(), prefix)]
+        return [("if", statements, position, prefix, opener)]
+
+    # The statements after an if stay in their block and are addressed by
+    # position, so a long else-if chain is not copied once per if.
+    def _expand_if(self, statements, position, prefix, opener):
+        test, then_branch, _ = split_if(statements[position])
+        otherwise = self.plan.failure_block(statements, position)
+        inner = self.indent(prefix)
+        self.line(f"{opener} {self.condition(test)} then (")
+        pending = [("block", then_branch, inner)]
+        if otherwise is None or is_invalid(*otherwise):
+            return pending + [f"{prefix}) else (", self.invalid(inner), f"{prefix})"]
+        block, start = otherwise
+        if block[start].node_type == "If" and self.plan.chain(block[start]) is None:
+            return pending + [("if", block, start, prefix, f"{prefix}) else if")]
+        return pending + [f"{prefix}) else (", ("block", block, inner, start), f"{prefix})"]
+
+    def _expand_guard(self, test, body, prefix):
+        inner = self.indent(prefix)
+        self.line(f"{prefix}if {self.condition(test)} then (")
+        return [("block", body, inner), f"{prefix}) else (", self.invalid(inner), f"{prefix})"]
+
+    def _case(self, chain, prefix):
+        inner = prefix + "    "
+        body = inner + "    "
+        self.line(f"{prefix}case {DECODERS[chain.subject]} of")
+        pending = []
+        for clause in chain.clauses:
+            pending.append(f"{inner}{self.constructor(clause.value)} -> (")
+            if clause.rest is None:
+                pending.append(("block", clause.body, body))
+            else:
+                pending.append(("guard", clause.rest, clause.body, body))
+            pending.append(f"{inner})")
+        if len(chain.clauses) < len(self.plan.tagged[chain.subject]):
+            pending.extend([f"{inner}_ -> (", self.invalid(body), f"{inner})"])
+        return pending
+
+    # Binary search over the clauses sorted by value: log2(n) ordering tests
+    # followed by the clause's own guard.
+    def _expand_arms(self, subject, clauses, prefix):
+        if len(clauses) == 1:
+            return self._expand_guard(clauses[0].test, clauses[0].body, prefix)
+        middle = len(clauses) // 2
+        inner = self.indent(prefix)
+        self.line(f"{prefix}if {subject} < \"{clauses[middle].value}\" then (")
+        return [("arms", subject, clauses[:middle], inner), f"{prefix}) else (",
+                ("arms", subject, clauses[middle:], inner), f"{prefix})"]
+
+    def emit_body(self, node, indent=1):
         prefix = "    " * indent
-        
         if node.node_type == "If":
-            condition = generate_condition(node.children[0])
-            result = [f"{prefix}if {condition} then ("]
-            
-            # Process then branch
-            then_statements = []
-            else_statements = []
-            in_else = False
-            
-            for child in node.children[1:]:
-                if child.node_type == "Return" and child.children[0].node_type == "Bool" and not child.children[0].value:
-                    in_else = True
-                    continue
-                
-                if not in_else:
-                    if child.node_type in ["Pay", "Return", "SigCheck"]:
-                        then_statements.append(generate_statement(child))
-                else:
-                    if child.node_type in ["Pay", "Return", "SigCheck"]:
-                        else_statements.append(generate_statement(child))
-            
-            # Add then statements
-            for stmt in then_statements:
-                result.append(f"{prefix}    {stmt}")
-            
-            # Add return/valid for then branch
-            has_then_return = any("Return" in stmt for stmt in then_statements)
-            if not has_then_return:
-                result.append(f"{prefix}    traceIfFalse \"Return\" True")
-            result.append(f"{prefix}    traceIfFalse \"Valid\" True")
-            
-            # Add else branch
-            result.append(f"{prefix}) else (")
-            if else_statements:
-                for stmt in else_statements:
-                    result.append(f"{prefix}    {stmt}")
-                has_else_return = any("Return" in stmt for stmt in else_statements)
-                if not has_else_return:
-                    result.append(f"{prefix}    traceIfFalse \"Return\" True")
-                result.append(f"{prefix}    traceIfFalse \"Valid\" True")
-            else:
-                result.append(f"{prefix}    traceIfFalse \"Invalid\" False")
-            
-            result.append(f"{prefix})")
-            return result
+            self.emit_block([node], prefix)
+            return
+        self.emit_block(node.children, prefix)
+
+    def emit_statements_before_if(self, statements, prefix):
+        for child in statements:
+            if child.node_type in ["Pay", "SigCheck", "Return"]:
+                text, _ = self.statement(child)
+                if text is not None:
+                    self.line(f"{prefix}{text}")
+
+def validator_function(function):
+    return "mk" + validator_title(function.value["name"])
+
+def emit_haskell(ir, key_map, stream, parties=None, options=None):
+    emitter = HaskellEmitter(key_map, stream, parties, options)
+    emitter.emit(ir)
+    return emitter
+
+def generate_haskell_code(ir, key_map, parties=None, options=None):
+    out = io.StringIO()
+    emit_haskell(ir, key_map, out, parties, options)
+    return out.getvalue()
+
+# Output file extension per code generation target: Haskell source for the
+# PlutusTx build, a cardano-cli text envelope holding the flat-encoded UPLC
+# script, or the UPLC program as text.
+TARGETS = {"haskell": ".hs", "uplc": ".plutus", "uplc-text": ".uplc"}
+
+def target_extension(options=None):
+    return TARGETS[(options or {}).get("target", "haskell")]
+
+# Code for the target named in options, as (artifacts, errors): a list of
+# (validator name, code) pairs. Haskell is one module for all of ir's
+# validators; the UPLC targets lower each validator directly, without going
+# through Haskell, to a script of its own. The name is None when the contract
+# gives a single artifact.
+def generate_artifacts(ir, key_map, parties=None, options=None):
+    target = (options or {}).get("target", "haskell")
+    if target == "haskell":
+        return [(None, generate_haskell_code(ir, key_map, parties, options))], []
+    functions = ir.children if ir.node_type == "Module" else [ir]
+    artifacts = []
+    errors = []
+    for function in functions:
+        program, lowering_errors = lower_validator(function, parties, options)
+        errors.extend(lowering_errors)
+        if target == "uplc":
+            code = json.dumps(program.envelope(), indent=4) + "\n"
         else:
-            # Handle non-If nodes
-            statements = []
-            has_return = False
-            
-            for child in node.children:
-                if child.node_type in ["Pay", "SigCheck"]:
-                    statements.append(generate_statement(child))
-                elif child.node_type == "Return":
-                    stmt = generate_statement(child)
-                    statements.append(stmt)
-                    if "Return" in stmt:
-                        has_return = True
-                elif child.node_type == "If":
-                    statements.extend(generate_body(child, indent))
-                    return statements  # If node handles its own return/valid
-            
-            result = []
-            for stmt in statements:
-                result.append(f"{prefix}{stmt}")
-            
-            if not has_return:
-                result.append(f"{prefix}traceIfFalse \"Return\" True")
-            result.append(f"{prefix}traceIfFalse \"Valid\" True")
-            
-            return result
-
-    body_lines = generate_body(ir)
-    lines.extend(body_lines)
-
-    # Add checkPayment function if needed
-    if any("checkPayment" in line for line in body_lines):
-        lines.extend([
-            "",
-            "checkPayment :: ScriptContext -> PubKeyHash -> Integer -> Bool",
-            "checkPayment ctx pkh amount =",
-            "    any (\\o -> txOutValue o == lovelaceValueOf amount && txOutAddress o == pubKeyHashAddress pkh) (txInfoOutputs $ scriptContextTxInfo ctx)"
-        ])
-
-    return "\n".join(lines)
-
-def main():
-    import sys
-    if len(sys.argv) != 2:
-        print("Usage: python3 pylutus_forge.py <contract_file>")
-        return
+            code = program.text() + "\n"
+        artifacts.append((function.value["name"] if len(functions) > 1 else None, code))
+    if errors:
+        return None, errors
+    return artifacts, []
 
-    file_path = sys.argv[1]
-    with open(file_path, 'r') as f:
-        source = f.read()
+# In-memory form of generate_artifacts: the code, or a dict of validator name
+# to script when a UPLC target gives one per validator.
+def generate_code(ir, key_map, parties=None, options=None):
+    artifacts, errors = generate_artifacts(ir, key_map, parties, options)
+    if errors:
+        return None, errors
+    if len(artifacts) == 1:
+        return artifacts[0][1], []
+    return dict(artifacts), []
+
+def code_bytes(code):
+    if isinstance(code, dict):
+        return sum(code_bytes(text) for text in code.values())
+    return len(code.encode("utf-8"))
+
+def resolve_parties(ir, options=None):
+    path = (options or {}).get("registry")
+    if not path:
+        return {}, []
+    resolver = KeyResolver(open_registry(path))
+    resolver.resolve(ir)
+    return resolver.resolved, resolver.errors
+
+# Reachability warnings of a successful run are appended to warnings when a
+# list is given.
+def run_front_end(source, options=None, profiler=None, warnings=None):
+    options = options or {}
+    if options.get("fused"):
+        front_end = FusedFrontEnd()
+        with stage(profiler, "front_end") as record:
+            ir = front_end.compile(source)
+            if record:
+                record.measure_tree(ir)
+        for heading, errors in front_end.stage_errors():
+            if errors:
+                return None, heading, errors
+        if warnings is not None:
+            warnings.extend(front_end.semantic_warnings)
+        return ir, None, []
 
     parser = PylutusParser()
-    ast = parser.parse(source)
+    with stage(profiler, "parse") as record:
+        ast = parser.parse(source)
+        if record:
+            record.measure_tree(ast)
     if parser.errors:
-        print("Parse errors:")
-        for error in parser.errors:
-            print(error)
-        return
+        return None, "Parse errors", parser.errors
 
     type_checker = TypeChecker()
-    type_checker.check(ast)
+    with stage(profiler, "type_check"):
+        type_checker.check(ast)
     if type_checker.errors:
-        print("Type errors:")
-        for error in type_checker.errors:
-            print(error)
-        return
+        return None, "Type errors", type_checker.errors
 
     semantic_validator = SemanticValidator()
-    semantic_validator.validate(ast)
+    with stage(profiler, "semantic"):
+        semantic_validator.validate(ast)
     if semantic_validator.errors:
-        print("Semantic errors:")
-        for error in semantic_validator.errors:
-            print(error)
-        return
+        return None, "Semantic errors", semantic_validator.errors
 
     transformer = IRTransformer()
-    ir = transformer.transform(ast)
+    with stage(profiler, "ir") as record:
+        ir = transformer.transform(ast)
+        if record:
+            record.measure_tree(ir)
     if transformer.errors:
-        print("IR transformation errors:")
-        for error in transformer.errors:
-            print(error)
+        return None, "IR transformation errors", transformer.errors
+
+    if warnings is not None:
+        warnings.extend(semantic_validator.warnings)
+    return ir, None, []
+
+# Runs everything up to code generation: front end, key resolution and the
+# IR optimization passes selected by options["opt_level"].
+def prepare_ir(source, options=None, profiler=None, warnings=None):
+    ir, heading, errors = run_front_end(source, options, profiler, warnings)
+    if errors:
+        return None, None, heading, errors
+    with stage(profiler, "resolve_keys"):
+        parties, errors = resolve_parties(ir, options)
+    if errors:
+        return None, None, "Key resolution errors", errors
+    level = (options or {}).get("opt_level", 0)
+    if level:
+        with stage(profiler, "optimize") as record:
+            ir = optimize(ir, level)
+            if record:
+                record.measure_tree(ir)
+    return ir, parties, None, []
+
+def compile_contract(source, key_map, options=None, profiler=None):
+    ir, parties, heading, errors = prepare_ir(source, options, profiler)
+    if errors:
+        return None, heading, errors
+    with stage(profiler, "codegen") as record:
+        code, errors = generate_code(ir, key_map, parties, options)
+        if errors:
+            return None, "Code generation errors", errors
+        if record:
+            record.output_bytes = code_bytes(code)
+    return code, None, []
+
+STAGE_NAMES = {
+    "Parse errors": "parse",
+    "Type errors": "type_check",
+    "Semantic errors": "semantic",
+    "Semantic warnings": "semantic",
+    "IR transformation errors": "ir",
+    "Key resolution errors": "resolve_keys",
+    "Budget errors": "budget",
+    "Code generation errors": "codegen",
+}
+
+class Diagnostic:
+    def __init__(self, stage, message, line=None, severity="error"):
+        self.stage = stage
+        self.message = message
+        self.line = line
+        self.severity = severity
+
+    @classmethod
+    def from_errors(cls, heading, errors, severity="error"):
+        stage_name = STAGE_NAMES.get(heading, heading)
+        return [cls(stage_name, error, error_line(error), severity) for error in errors]
+
+    def to_dict(self):
+        return {"stage": self.stage, "message": self.message, "line": self.line, "severity": self.severity}
+
+class CompileResult:
+    def __init__(self, code=None, diagnostics=None, stages=None, cost=None):
+        self.code = code
+        self.diagnostics = diagnostics or []
+        self.stages = stages or []
+        self.cost = cost
+
+    @property
+    def ok(self):
+        return self.code is not None and not any(d.severity == "error" for d in self.diagnostics)
+
+    def to_dict(self):
+        return {
+            "code": self.code,
+            "diagnostics": [diagnostic.to_dict() for diagnostic in self.diagnostics],
+            "stages": self.stages,
+            "cost": self.cost,
+        }
+
+# Library entry point: compiles one contract entirely in memory and returns a
+# CompileResult. key_map is an already loaded key map; nothing is printed and no
+# file is read or written apart from a key registry named in options, and no
+# state is kept between calls, so it is safe to call from many threads or worker
+# processes at once. Stage timings are always collected; tracemalloc is
+# process-wide, so memory figures are not.
+def compile_source(text, key_map=None, options=None):
+    key_map = key_map or {}
+    options = options or {}
+    profiler = Profiler(memory=False)
+    result = CompileResult()
+    warnings = []
+    with profiler.contract("<source>"):
+        try:
+            ir, parties, heading, errors = prepare_ir(text, options, profiler, warnings)
+        except FileNotFoundError as e:
+            heading, errors = "Key resolution errors", [str(e)]
+        if errors:
+            result.diagnostics = Diagnostic.from_errors(heading, errors)
+        else:
+            if options.get("estimate") or options.get("budget"):
+                with stage(profiler, "estimate"):
+                    result.cost = estimate_module_costs(ir, options.get("cost_model"), options)
+                result.diagnostics = Diagnostic.from_errors("Budget errors", check_budget(result.cost, options.get("budget") or {}))
+            if not result.diagnostics:
+                with stage(profiler, "codegen") as record:
+                    code, errors = generate_code(ir, key_map, parties, options)
+                    if errors:
+                        result.diagnostics = Diagnostic.from_errors("Code generation errors", errors)
+                    else:
+                        result.code = code
+                        record.output_bytes = code_bytes(code)
+    result.diagnostics += Diagnostic.from_errors("Semantic warnings", warnings, "warning")
+    result.stages = profiler.to_json()["contracts"][0]["stages"]
+    return result
+
+# A template compiled once up to code generation. Each instance substitutes its
+# parameter values into the cached IR and goes straight to codegen; party names
+# go through one resolver shared by all instances, so each name is looked up in
+# the registry once.
+class CompiledTemplate:
+    def __init__(self, template, key_map, options=None):
+        self.template = template
+        self.key_map = key_map
+        self.options = options or {}
+        registry = self.options.get("registry")
+        self.resolver = KeyResolver(open_registry(registry)) if registry else None
+
+    @property
+    def params(self):
+        return self.template.params
+
+    def instantiate(self, values=None, profiler=None):
+        ir, errors = self.template.instantiate(values)
+        if errors:
+            return None, "Parameter errors", errors
+        parties = {}
+        if self.resolver is not None:
+            self.resolver.errors = []
+            parties = self.resolver.resolve(ir)
+            if self.resolver.errors:
+                return None, "Key resolution errors", self.resolver.errors
+        with stage(profiler, "codegen") as record:
+            code, errors = generate_code(ir, self.key_map, parties, self.options)
+            if errors:
+                return None, "Code generation errors", errors
+            if record:
+                record.output_bytes = code_bytes(code)
+        return code, None, []
+
+    # Streams (values, code, heading, errors) for each parameter set, so large
+    # runs never hold more than one instance in memory.
+    def instantiate_many(self, param_sets, profiler=None):
+        for values in param_sets:
+            code, heading, errors = self.instantiate(values, profiler)
+            yield values, code, heading, errors
+
+def compile_template(source, key_map, options=None, profiler=None):
+    options = options or {}
+    ir, heading, errors = run_front_end(source, options, profiler)
+    if errors:
+        return None, heading, errors
+    level = options.get("opt_level", 0)
+    if level:
+        with stage(profiler, "optimize") as record:
+            ir = optimize(ir, level)
+            if record:
+                record.measure_tree(ir)
+    with stage(profiler, "template_index"):
+        template = TemplateIR(ir)
+    return CompiledTemplate(template, key_map, options), None, []
+
+def read_param_sets(path):
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# Instantiates one template for every parameter set in a JSON Lines file and
+# writes <name>_<n>.hs (or the target's extension) per set into out_dir, n
+# being the set's position.
+def write_instances(source, path, params_path, out_dir, key_map, options=None, profiler=None):
+    template, heading, errors = compile_template(source, key_map, options, profiler)
+    if errors:
+        return [ContractResult(path, heading=heading, errors=errors)]
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    results = []
+    instances = template.instantiate_many(read_param_sets(params_path), profiler)
+    for index, (_, code, heading, errors) in enumerate(instances, 1):
+        name = f"{path}[{index}]"
+        if errors:
+            results.append(ContractResult(name, heading=heading, errors=errors))
+            continue
+        out_path = os.path.join(out_dir, f"{stem}_{index}{target_extension(options)}")
+        artifacts = code.items() if isinstance(code, dict) else [(None, code)]
+        for validator_name, text in artifacts:
+            with open(artifact_path(out_path, validator_name), 'w') as f:
+                f.write(text)
+        results.append(ContractResult(name, out_path))
+    return results
+
+def collect_contracts(patterns):
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*.pylutus"), recursive=True)
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+        for path in sorted(matches):
+            path = os.path.normpath(path)
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+def output_path_for(path, root, out_dir, extension=".hs"):
+    relative = os.path.relpath(os.path.abspath(path), root)
+    return os.path.join(out_dir, os.path.splitext(relative)[0] + extension)
+
+class TeeStream:
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+
+class ContractResult:
+    def __init__(self, path, out_path=None, heading=None, errors=None, cached=False, cost=None, profile=None, warnings=None):
+        self.path = path
+        self.out_path = out_path
+        self.heading = heading
+        self.errors = errors or []
+        self.cached = cached
+        self.cost = cost
+        self.profile = profile
+        self.warnings = warnings or []
+
+# The path of one artifact of the contract whose output goes to path:
+# escrow.plutus, or protocol.spend_validator.plutus for one of several scripts.
+def artifact_path(path, name):
+    if name is None:
+        return path
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{name}{extension}"
+
+def write_artifacts(open_output, artifacts):
+    for name, code in artifacts:
+        with open_output(name) as stream:
+            stream.write(code)
+
+# Compiles source and writes each artifact to the stream returned by
+# open_output(name), which is only opened once the front end has succeeded.
+# Without a cache Haskell is emitted straight into the stream; UPLC targets are
+# lowered first, so a lowering error leaves no output behind. Cached UPLC
+# entries hold the artifact list as JSON. Cost estimation needs the IR, so it
+# bypasses cache lookups. Reachability warnings go to the warnings list; a
+# cache hit skips the front end and reports none.
+def write_contract(source, key_map, open_output, cache=None, options=None, profiler=None, warnings=None):
+    options = options or {}
+    estimate = options.get("estimate") or options.get("budget")
+    streamed = options.get("target", "haskell") == "haskell"
+    if cache is not None:
+        key = cache.key(source, key_map, options)
+        artifacts = None
+        if not estimate:
+            with stage(profiler, "cache_lookup") as record:
+                code = cache.get(key)
+                if code is not None:
+                    artifacts = [(None, code)] if streamed else [tuple(item) for item in json.loads(code)]
+                    if record:
+                        record.output_bytes = sum(len(text.encode("utf-8")) for _, text in artifacts)
+        if artifacts is not None:
+            write_artifacts(open_output, artifacts)
+            return None, [], True, None
+
+    ir, parties, heading, errors = prepare_ir(source, options, profiler, warnings)
+    if errors:
+        return heading, errors, False, None
+
+    report = None
+    if estimate:
+        with stage(profiler, "estimate"):
+            report = estimate_module_costs(ir, options.get("cost_model"), options)
+        errors = check_budget(report, options.get("budget") or {})
+        if errors:
+            return "Budget errors", errors, False, report
+
+    if streamed and cache is None:
+        with open_output() as stream:
+            with stage(profiler, "codegen") as record:
+                if record:
+                    stream = CountingStream(stream)
+                emit_haskell(ir, key_map, stream, parties, options)
+                if record:
+                    record.output_bytes = stream.written
+        return None, [], False, report
+
+    with stage(profiler, "codegen") as record:
+        artifacts, errors = generate_artifacts(ir, key_map, parties, options)
+        if errors:
+            return "Code generation errors", errors, False, report
+        if record:
+            record.output_bytes = sum(len(code.encode("utf-8")) for _, code in artifacts)
+    write_artifacts(open_output, artifacts)
+    if cache is not None:
+        try:
+            cache.put(key, artifacts[0][1] if streamed else json.dumps(artifacts))
+        except OSError:
+            pass
+    return None, [], False, report
+
+_worker_key_map = None
+_worker_cache = None
+_worker_options = None
+_worker_profile = False
+
+def _init_worker(key_map, cache=None, options=None, profile=False):
+    global _worker_key_map, _worker_cache, _worker_options, _worker_profile
+    _worker_key_map = key_map
+    _worker_cache = cache
+    _worker_options = options
+    _worker_profile = profile
+
+def _compile_job(job):
+    path, out_path = job
+    try:
+        with open(path, 'r') as f:
+            source = f.read()
+    except OSError as e:
+        return ContractResult(path, heading="I/O errors", errors=[str(e)])
+
+    def open_output(name=None):
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        return open(artifact_path(out_path, name), "w")
+
+    profiler = Profiler() if _worker_profile else None
+    warnings = []
+    try:
+        with profiler.contract(path) if profiler else contextlib.nullcontext():
+            heading, errors, cached, cost = write_contract(source, _worker_key_map, open_output, _worker_cache, _worker_options, profiler, warnings)
+    except Exception as e:
+        return ContractResult(path, heading="Internal errors", errors=[f"{type(e).__name__}: {e}"])
+    profile = profiler.contracts[0] if profiler else None
+    if errors:
+        return ContractResult(path, heading=heading, errors=errors, cost=cost, profile=profile)
+    return ContractResult(path, out_path, cached=cached, cost=cost, profile=profile, warnings=warnings)
+
+def compile_batch(paths, out_dir, key_map, jobs=None, cache=None, options=None, profile=False):
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    work = [(path, output_path_for(path, root, out_dir, target_extension(options))) for path in paths]
+
+    if jobs == 1 or len(work) == 1:
+        _init_worker(key_map, cache, options, profile)
+        return [_compile_job(job) for job in work]
+
+    workers = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(work) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(key_map, cache, options, profile)) as pool:
+        return list(pool.map(_compile_job, work, chunksize=chunksize))
+
+def report_batch(results):
+    for result in results:
+        if result.warnings:
+            print(f"{result.path}: Semantic warnings:")
+            for warning in result.warnings:
+                print(f"    {warning}")
+    failures = [r for r in results if r.errors]
+    for result in failures:
+        print(f"{result.path}: {result.heading}:")
+        for error in result.errors:
+            print(f"    {error}")
+    cached = sum(1 for r in results if r.cached)
+    summary = f"Compiled {len(results) - len(failures)} of {len(results)} contracts, {len(failures)} failed"
+    if cached:
+        summary += f" ({cached} from cache)"
+    print(summary)
+    return len(failures)
+
+def _budget_argument(text):
+    try:
+        return parse_budget(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def print_cost_reports(reports, output_format):
+    if output_format == "json":
+        print(json.dumps(reports, indent=2))
         return
+    for report in reports:
+        print(format_report(report))
+
+def parse_args(argv):
+    arg_parser = argparse.ArgumentParser(prog="pylutus_forge.py", description="Compile Pylutus contracts to Plutus Haskell.")
+    arg_parser.add_argument("contracts", nargs="*", help="contract files, directories or glob patterns")
+    arg_parser.add_argument("-o", "--out-dir", help="write one file per contract into this directory (batch mode)")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes in batch mode (default: CPU count)")
+    arg_parser.add_argument("--keys", default="pylutus_key.json", help="key map file (default: pylutus_key.json)")
+    arg_parser.add_argument("--registry", help="SQLite key registry used to resolve party names (overrides the key map's \"registry\")")
+    arg_parser.add_argument("-q", "--quiet", action="store_true", help="do not echo the generated program to stdout")
+    arg_parser.add_argument("-O", dest="opt_level", type=int, choices=[0, 1, 2], default=0,
+                            help="IR optimization level: -O0 (none), -O1, -O2 (default: 0)")
+    arg_parser.add_argument("--dispatch", choices=["linear", "balanced", "tagged"],
+                            help="lowering of redeemer/datum if-chains (default: balanced at -O1 and above, linear at -O0); "
+                                 "tagged changes the redeemer/datum encoding to constructor indices")
+    arg_parser.add_argument("--target", choices=sorted(TARGETS), default="haskell",
+                            help="haskell: PlutusTx source (.hs); uplc: text envelope with the flat-encoded script (.plutus); "
+                                 "uplc-text: UPLC program text (.uplc) (default: haskell)")
+    arg_parser.add_argument("--release", action="store_true", help="strip trace messages from the generated validator")
+    arg_parser.add_argument("--estimate", action="store_true", help="report estimated script size and per-path execution units")
+    arg_parser.add_argument("--estimate-format", choices=["text", "json"], default="text",
+                            help="format of the --estimate report (default: text)")
+    arg_parser.add_argument("--budget", type=_budget_argument, metavar="cpu=N,mem=N,size=N",
+                            help="fail when the worst-case path or script size exceeds these limits")
+    arg_parser.add_argument("--cost-model", metavar="FILE", help="JSON overrides for the default cost model")
+    arg_parser.add_argument("--params", metavar="FILE",
+                            help="treat the contract as a template and write one instance per JSON object in this JSON Lines file")
+    arg_parser.add_argument("--fused", action="store_true", help="use the single-pass front end instead of the staged passes")
+    arg_parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_DIR, metavar="DIR",
+                            help=f"reuse compiled output for unchanged contracts (default dir: {DEFAULT_CACHE_DIR})")
+    arg_parser.add_argument("--cache-max-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar="MB",
+                            help="evict least recently used cache entries beyond this size")
+    arg_parser.add_argument("--profile", metavar="FILE", help="write per-contract, per-stage timings and allocations as JSON")
+    arg_parser.add_argument("--trace", metavar="FILE", help="write the same stage timings in Chrome trace event format")
+    arg_parser.add_argument("--cache-info", action="store_true", help="print cache statistics and exit")
+    arg_parser.add_argument("--cache-clear", action="store_true", help="remove all cache entries and exit")
+    args = arg_parser.parse_args(argv)
+    if not args.contracts and not (args.cache_info or args.cache_clear):
+        arg_parser.error("the following arguments are required: contracts")
+    return args
 
-    key_map = load_key_map("pylutus_key.json")
-    haskell_code = generate_haskell_code(ir.children[0], key_map)
+def is_batch(args):
+    if args.out_dir or len(args.contracts) > 1:
+        return True
+    pattern = args.contracts[0]
+    return os.path.isdir(pattern) or glob.has_magic(pattern)
+
+def compile_options(args, key_map):
+    options = {"fused": args.fused, "opt_level": args.opt_level, "release": args.release, "dispatch": args.dispatch}
+    if args.target != "haskell":
+        options["target"] = args.target
+    if args.estimate or args.budget:
+        options["estimate"] = True
+        options["budget"] = args.budget or {}
+        options["cost_model"] = load_cost_model(args.cost_model)
+    registry = args.registry or key_map.get("registry")
+    if registry:
+        if not args.registry:
+            registry = os.path.join(os.path.dirname(os.path.abspath(args.keys)), registry)
+        options["registry"] = registry
+        options["registry_stamp"] = registry_stamp(registry)
+    return options
+
+def write_profiles(profiler, args):
+    if args.profile:
+        profiler.write_profile(args.profile)
+    if args.trace:
+        profiler.write_trace(args.trace)
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = Profiler() if args.profile or args.trace else None
+
+    cache = None
+    if args.cache or args.cache_info or args.cache_clear:
+        cache = CompileCache(args.cache or DEFAULT_CACHE_DIR, args.cache_max_size * 1024 * 1024)
+    if args.cache_clear:
+        print(f"Removed {cache.clear()} cache entries from {cache.directory}")
+        return 0
+    if args.cache_info:
+        for name, value in cache.stats().items():
+            print(f"{name}: {value}")
+        return 0
+
+    if args.params:
+        if len(args.contracts) != 1 or not os.path.isfile(args.contracts[0]):
+            print("--params needs exactly one template file")
+            return 1
+        with open(args.contracts[0], 'r') as f:
+            source = f.read()
+        key_map = load_key_map(args.keys)
+        options = compile_options(args, key_map)
+        with profiler.contract(args.contracts[0]) if profiler else contextlib.nullcontext():
+            results = write_instances(source, args.contracts[0], args.params, args.out_dir or "build", key_map, options, profiler)
+        if profiler:
+            write_profiles(profiler, args)
+        return 1 if report_batch(results) else 0
+
+    if is_batch(args):
+        paths = collect_contracts(args.contracts)
+        if not paths:
+            print("No contracts found")
+            return 1
+        key_map = load_key_map(args.keys)
+        options = compile_options(args, key_map)
+        results = compile_batch(paths, args.out_dir or "build", key_map, args.jobs, cache, options, profile=bool(profiler))
+        if cache:
+            cache.prune()
+        if profiler:
+            profiler.extend(r.profile for r in results if r.profile)
+            write_profiles(profiler, args)
+        if args.estimate:
+            print_cost_reports([dict(r.cost, contract=r.path) for r in results if r.cost], args.estimate_format)
+        return 1 if report_batch(results) else 0
+
+    file_path = args.contracts[0]
+    with open(file_path, 'r') as f:
+        source = f.read()
+
+    key_map = load_key_map(args.keys)
+    options = compile_options(args, key_map)
+
+    out_path = "output_contract" + target_extension(options)
+    written = []
+
+    @contextlib.contextmanager
+    def open_output(name=None):
+        written.append(artifact_path(out_path, name))
+        with open(written[-1], "w") as f:
+            yield f if args.quiet else TeeStream(f, sys.stdout)
+
+    warnings = []
+    with profiler.contract(file_path) if profiler else contextlib.nullcontext():
+        heading, errors, _, cost = write_contract(source, key_map, open_output, cache, options, profiler, warnings)
+    if cache:
+        cache.prune()
+    if profiler:
+        write_profiles(profiler, args)
+    if cost and args.estimate:
+        print_cost_reports([dict(cost, contract=file_path)], args.estimate_format)
+    if errors:
+        print(f"{heading}:")
+        for error in errors:
+            print(error)
+        return 1
 
-    print(haskell_code)
-    with open("output_contract.hs", "w") as f:
-        f.write(haskell_code)
-    print("Compiled to output_contract.hs")
+    if not args.quiet:
+        print()
+    if warnings:
+        print("Semantic warnings:")
+        for warning in warnings:
+            print(warning)
+    print(f"Compiled to {', '.join(written)}")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
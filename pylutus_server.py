@@ -0,0 +1,163 @@
+import json
+import os
+import sys
+from compiler.fused import FusedFrontEnd
+from compiler.utils import error_line
+from pylutus_forge import generate_haskell_code, load_key_map
+
+SEVERITY_ERROR = 1
+SEVERITY_WARNING = 2
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+class LanguageServer:
+    def __init__(self, reader, writer, key_map=None):
+        self.reader = reader
+        self.writer = writer
+        self.key_map = key_map or {}
+        self.documents = {}
+        self.running = True
+        self.shutdown_requested = False
+
+    def read_message(self):
+        length = None
+        while True:
+            header = self.reader.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.decode("ascii").partition(":")
+            if name.lower() == "content-length":
+                length = int(value.strip())
+        if length is None:
+            return None
+        return json.loads(self.reader.read(length).decode("utf-8"))
+
+    def send(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii"))
+        self.writer.write(body)
+        self.writer.flush()
+
+    def notify(self, method, params):
+        self.send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def serve(self):
+        while self.running:
+            message = self.read_message()
+            if message is None:
+                break
+            self.handle(message)
+        return 0 if self.shutdown_requested else 1
+
+    def handle(self, message):
+        method = message.get("method")
+        handler = self.HANDLERS.get(method)
+        is_request = "id" in message
+        if handler is None:
+            if is_request:
+                self.send({"jsonrpc": "2.0", "id": message["id"],
+                           "error": {"code": METHOD_NOT_FOUND, "message": f"Unknown method {method}"}})
+            return
+        # A failing handler answers its own request (or is logged, for a
+        # notification) and leaves the server running.
+        try:
+            result = handler(self, message.get("params") or {})
+        except Exception as e:
+            if is_request:
+                self.send({"jsonrpc": "2.0", "id": message["id"],
+                           "error": {"code": INTERNAL_ERROR, "message": f"{method} failed: {e!r}"}})
+            else:
+                print(f"pylutus-server: {method} failed: {e!r}", file=sys.stderr)
+            return
+        if is_request:
+            self.send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+    def diagnostics(self, text):
+        front_end = FusedFrontEnd()
+        ir = front_end.compile(text)
+        lines = text.splitlines()
+        for heading, errors in front_end.stage_errors():
+            if errors:
+                return [self.diagnostic(heading, error, lines) for error in errors], None
+        return [self.diagnostic("Semantic warnings", warning, lines, SEVERITY_WARNING)
+                for warning in front_end.semantic_warnings], ir
+
+    def diagnostic(self, heading, message, lines, severity=SEVERITY_ERROR):
+        line_no = error_line(message) or 1
+        line = max(0, line_no - 1)
+        width = len(lines[line]) if line < len(lines) else 0
+        return {
+            "range": {"start": {"line": line, "character": 0}, "end": {"line": line, "character": width}},
+            "severity": severity,
+            "source": "pylutus",
+            "code": heading,
+            "message": message,
+        }
+
+    def publish(self, uri):
+        text = self.documents.get(uri)
+        diagnostics = [] if text is None else self.diagnostics(text)[0]
+        self.notify("textDocument/publishDiagnostics", {"uri": uri, "diagnostics": diagnostics})
+
+    def _initialize(self, params):
+        return {
+            "capabilities": {"textDocumentSync": {"openClose": True, "change": 1}},
+            "serverInfo": {"name": "pylutus-server"},
+        }
+
+    def _initialized(self, params):
+        return None
+
+    def _shutdown(self, params):
+        self.shutdown_requested = True
+        return None
+
+    def _exit(self, params):
+        self.running = False
+
+    def _did_open(self, params):
+        document = params["textDocument"]
+        self.documents[document["uri"]] = document["text"]
+        self.publish(document["uri"])
+
+    def _did_change(self, params):
+        uri = params["textDocument"]["uri"]
+        changes = params.get("contentChanges") or []
+        if changes:
+            self.documents[uri] = changes[-1]["text"]
+        self.publish(uri)
+
+    def _did_close(self, params):
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self.publish(uri)
+
+    def _generate_haskell(self, params):
+        text = self.documents.get(params["textDocument"]["uri"], "")
+        diagnostics, ir = self.diagnostics(text)
+        if ir is None:
+            return {"code": None, "diagnostics": diagnostics}
+        return {"code": generate_haskell_code(ir, self.key_map), "diagnostics": diagnostics}
+
+    HANDLERS = {
+        "initialize": _initialize,
+        "initialized": _initialized,
+        "shutdown": _shutdown,
+        "exit": _exit,
+        "textDocument/didOpen": _did_open,
+        "textDocument/didChange": _did_change,
+        "textDocument/didClose": _did_close,
+        "pylutus/generateHaskell": _generate_haskell,
+    }
+
+def main():
+    key_path = sys.argv[1] if len(sys.argv) > 1 else "pylutus_key.json"
+    key_map = load_key_map(key_path) if os.path.exists(key_path) else {}
+    server = LanguageServer(sys.stdin.buffer, sys.stdout.buffer, key_map)
+    return server.serve()
+
+if __name__ == "__main__":
+    sys.exit(main())
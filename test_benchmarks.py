@@ -0,0 +1,28 @@
+from benchmarks.contract_generator import generate_contract
+from benchmarks.run_benchmarks import STAGES, benchmark, compare_results
+from pylutus_forge import compile_contract
+
+def test_generated_contracts_compile():
+    source = generate_contract(depth=3, and_width=4, pays=2, sigs=2, clauses=3)
+    assert source.count("pylutus_pay(") == 6
+    assert source.count("pylutus_sig(") == 3 * 3 * 2
+    code, _, errors = compile_contract(source, {})
+    assert not errors
+    assert "txSignedBy" in code
+
+def test_every_clause_reaches_the_output():
+    sizes = []
+    for clauses in (1, 2, 4):
+        code, _, errors = compile_contract(generate_contract(depth=2, clauses=clauses), {}, {"opt_level": 2})
+        assert not errors
+        assert all(f"payee{clause}_0" in code for clause in range(clauses))
+        sizes.append(len(code))
+    assert sizes[2] - sizes[1] >= sizes[1] - sizes[0] > 0
+
+def test_benchmark_reports_every_stage():
+    result = benchmark("tiny", {"depth": 1, "and_width": 1, "pays": 1, "sigs": 1, "clauses": 1}, repeat=1)
+    assert set(result["stages"]) == set(STAGES)
+    assert all(stage["peak_bytes"] > 0 for stage in result["stages"].values())
+    assert result["ir_nodes"] == 11
+    comparison = compare_results({"commit": "abc", "results": [result]}, {"results": [result]})
+    assert "tiny: parse 1.00x" in comparison
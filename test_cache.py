@@ -0,0 +1,55 @@
+import os
+from compiler import cache as cache_module
+from compiler.cache import CompileCache
+
+def test_cache_round_trip_and_key_sensitivity(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    key = cache.key("source", {"pylutus_sig": {}})
+    assert cache.get(key) is None
+    cache.put(key, "mkValidator ctx = True")
+    assert cache.get(key) == "mkValidator ctx = True"
+    assert cache.key("source", {"pylutus_sig": {"pubkeyhash": "X"}}) != key
+    assert cache.key("source!", {"pylutus_sig": {}}) != key
+    assert cache.stats()["entries"] == 1
+    assert cache.clear() == 1
+    assert cache.get(key) is None
+
+def test_cache_prune_evicts_least_recently_used(tmp_path):
+    cache = CompileCache(str(tmp_path), max_bytes=10)
+    for i, name in enumerate(["a", "b", "c"]):
+        key = cache.key(name, {})
+        cache.put(key, "x" * 5)
+        path = cache._path(key)
+        os.utime(path, (i, i))
+    assert cache.prune() == 1
+    assert cache.get(cache.key("a", {})) is None
+    assert cache.get(cache.key("c", {})) is not None
+
+def test_cache_entries_are_named_by_target(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    haskell = cache.key("source", {}, {"target": "haskell"})
+    uplc = cache.key("source", {}, {"target": "uplc"})
+    assert haskell.endswith(".hs") and cache.key("source", {}).endswith(".hs")
+    assert uplc.endswith(".json") and uplc != haskell
+    cache.put(haskell, "mkValidator ctx = True")
+    cache.put(uplc, "[]")
+    assert sorted(os.path.basename(path) for path, _, _ in cache.entries()) == sorted([haskell, uplc])
+
+def test_cache_keys_change_with_the_compiler(tmp_path, monkeypatch):
+    cache = CompileCache(str(tmp_path))
+    assert len(cache_module.compiler_fingerprint()) == 64
+    key = cache.key("source", {})
+    cache.put(key, "mkValidator ctx = True")
+    monkeypatch.setattr(cache_module, "_fingerprint", "0" * 64)
+    rebuilt = cache.key("source", {})
+    assert rebuilt != key and cache.get(rebuilt) is None
+
+def test_fingerprint_hashes_compiler_sources(tmp_path, monkeypatch):
+    module = tmp_path / "passes.py"
+    module.write_text("LEVEL = 1\n")
+    monkeypatch.setattr(cache_module, "COMPILER_SOURCES", [str(tmp_path)])
+    monkeypatch.setattr(cache_module, "_fingerprint", None)
+    before = cache_module.compiler_fingerprint()
+    module.write_text("LEVEL = 2\n")
+    monkeypatch.setattr(cache_module, "_fingerprint", None)
+    assert cache_module.compiler_fingerprint() != before
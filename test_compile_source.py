@@ -0,0 +1,60 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pylutus_forge import compile_contract, compile_source, load_key_map
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+KEY_MAP = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+
+def _source(name):
+    with open(os.path.join(ROOT, "tests", name + ".pylutus")) as f:
+        return f.read()
+
+def test_returns_code_and_stage_metadata(capsys, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = compile_source(_source("escrow"), KEY_MAP, {"opt_level": 1})
+    assert result.ok and not result.diagnostics
+    assert result.code == compile_contract(_source("escrow"), KEY_MAP, {"opt_level": 1})[0]
+    assert [s["name"] for s in result.stages] == ["parse", "type_check", "semantic", "ir", "resolve_keys", "optimize", "codegen"]
+    assert result.stages[-1]["output_bytes"] == len(result.code.encode())
+    assert capsys.readouterr().out == ""
+    assert os.listdir(tmp_path) == []
+
+def test_errors_become_structured_diagnostics():
+    result = compile_source(_source("invalid_payment"), KEY_MAP)
+    assert not result.ok and result.code is None
+    assert result.diagnostics
+    diagnostic = result.diagnostics[0]
+    assert diagnostic.stage in ("type_check", "semantic")
+    assert diagnostic.line is not None
+    assert result.to_dict()["diagnostics"][0]["message"] == diagnostic.message
+
+    result = compile_source("def validator(ctx: ScriptContext) -> bool:\n    return (\n")
+    assert [d.stage for d in result.diagnostics] == ["parse"]
+
+def test_unknown_calls_are_type_diagnostics():
+    header = "def validator(ctx: ScriptContext) -> bool:\n"
+    cases = [
+        (header + "    if foo():\n        return True\n    return False\n", ("Condition must be bool, got unknown at line 2", 2)),
+        (header + "    return foo()\n", ("Return value must be bool at line 1", 1)),
+    ]
+    for source, expected in cases:
+        for fused in (False, True):
+            result = compile_source(source, KEY_MAP, {"fused": fused})
+            assert not result.ok
+            assert [(d.stage, d.message, d.line) for d in result.diagnostics] == [("type_check",) + expected]
+
+def test_budget_failures_are_reported_with_cost():
+    result = compile_source(_source("escrow"), KEY_MAP, {"budget": {"cpu": 1}})
+    assert result.code is None and result.cost["worst_case"]
+    assert result.diagnostics[0].stage == "budget"
+
+def test_missing_registry_is_a_diagnostic(tmp_path):
+    result = compile_source(_source("escrow"), KEY_MAP, {"registry": str(tmp_path / "missing.sqlite")})
+    assert result.diagnostics[0].stage == "resolve_keys"
+
+def test_concurrent_calls_are_independent():
+    names = ["escrow", "multi_sig", "complex_contract", "vesting_contract"] * 8
+    expected = {name: compile_contract(_source(name), KEY_MAP)[0] for name in set(names)}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda name: compile_source(_source(name), KEY_MAP), names))
+    assert [r.code for r in results] == [expected[name] for name in names]
@@ -0,0 +1,32 @@
+from compiler.ast_parser import PylutusParser
+from compiler.cost import check_budget, estimate_costs, parse_budget
+from compiler.ir import IRTransformer
+
+SOURCE = """def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:
+    if pylutus_datum("escrow") and pylutus_redeemer("release"):
+        pylutus_pay("abc123", 2000000)
+        return True
+    else:
+        return False
+"""
+
+def _function():
+    return IRTransformer().transform(PylutusParser().parse(SOURCE)).children[0]
+
+def test_estimate_reports_per_branch_costs_and_worst_case():
+    report = estimate_costs(_function())
+    assert [p["path"] for p in report["paths"]] == ["if@2:then", "if@2:else"]
+    then_path, else_path = report["paths"]
+    assert then_path["cpu"] > else_path["cpu"]
+    assert report["worst_case"] is then_path
+
+def test_release_build_is_cheaper_and_smaller():
+    debug = estimate_costs(_function())
+    release = estimate_costs(_function(), options={"release": True})
+    assert release["worst_case"]["cpu"] < debug["worst_case"]["cpu"]
+    assert release["script_size"] < debug["script_size"]
+
+def test_budget_checks():
+    report = estimate_costs(_function())
+    assert check_budget(report, parse_budget("cpu=1000000000,size=100000")) == []
+    assert check_budget(report, parse_budget("mem=1"))[0].startswith("Budget exceeded: mem")
@@ -0,0 +1,164 @@
+import ast
+import gc
+import time
+from compiler.ast_parser import PylutusParser
+from compiler.cost import estimate_costs
+from compiler.fused import FusedFrontEnd
+from compiler.interpreter import ScriptContext, evaluate
+from compiler.ir import FlatIR, IRTransformer
+from compiler.optimizer import optimize
+from compiler.semantic_validator import SemanticValidator
+from compiler.type_checker import TypeChecker
+from compiler.uplc import Program
+from compiler.uplc_codegen import lower_validator, validator_arguments
+from compiler.uplc_eval import run_validator
+from pylutus_forge import generate_haskell_code
+
+DEPTH = 10000
+
+# ast.parse cannot read contracts this deep, so the Python AST is built directly.
+def _call(name, arg, line):
+    func = ast.Name(id=name, ctx=ast.Load(), lineno=line)
+    return ast.Call(func=func, args=[ast.Constant(value=arg, lineno=line)], keywords=[], lineno=line)
+
+def _return(value, line):
+    return ast.Return(value=ast.Constant(value=value, lineno=line), lineno=line)
+
+def _module(body):
+    args = ast.arguments(posonlyargs=[], args=[ast.arg(arg=a) for a in ("datum", "redeemer", "ctx")],
+                         kwonlyargs=[], kw_defaults=[], defaults=[])
+    function = ast.FunctionDef(name="validator", args=args, body=body, decorator_list=[], lineno=1)
+    return ast.Module(body=[function], type_ignores=[])
+
+def _elif_chain(depth):
+    orelse = [_return(False, 2 * depth + 2)]
+    for i in reversed(range(depth)):
+        line = 2 * i + 2
+        orelse = [ast.If(test=_call("pylutus_redeemer", f"action{i}", line), body=[_return(True, line + 1)], orelse=orelse, lineno=line)]
+    return _module(orelse)
+
+def _nested_ifs(depth):
+    body = [_call("pylutus_pay", "payee", depth + 1), _return(True, depth + 1)]
+    body[0].args.append(ast.Constant(value=2000000, lineno=depth + 1))
+    body[0] = ast.Expr(value=body[0], lineno=depth + 1)
+    for i in reversed(range(depth)):
+        body = [ast.If(test=_call("pylutus_sig", f"party{i}", i + 2), body=body, orelse=[_return(False, i + 2)], lineno=i + 2)]
+    return _module(body)
+
+def _and_chain(depth):
+    test = _call("pylutus_sig", f"party{depth}", 2)
+    for i in reversed(range(depth)):
+        test = ast.BoolOp(op=ast.And(), values=[_call("pylutus_sig", f"party{i}", 2), test], lineno=2)
+    return _module([ast.If(test=test, body=[_return(True, 3)], orelse=[_return(False, 4)], lineno=2)])
+
+# Nested tuples this deep cannot be compared without recursion, so IR trees are
+# compared through their flat array form.
+def _flat(ir):
+    flat = FlatIR.from_tree(ir)
+    return list(flat.kinds), [flat.value(i) for i in range(len(flat))], list(flat.first_child), list(flat.next_sibling), list(flat.line_nos)
+
+def _compile_staged(tree):
+    parser = PylutusParser()
+    node = parser.parse_tree(tree)
+    type_checker = TypeChecker()
+    type_checker.check(node)
+    semantic_validator = SemanticValidator()
+    semantic_validator.validate(node)
+    transformer = IRTransformer()
+    ir = transformer.transform(node)
+    assert not (parser.errors or type_checker.errors or semantic_validator.errors or transformer.errors)
+    return ir
+
+def _compile(tree):
+    ir = _compile_staged(tree)
+    fused = FusedFrontEnd()
+    assert _flat(fused.compile_tree(tree)) == _flat(ir)
+    assert not any(errors for _, errors in fused.stage_errors())
+    return ir
+
+def test_deep_elif_chain_compiles():
+    ir = _compile(_elif_chain(DEPTH))
+    for level in (1, 2):
+        function = optimize(ir, level).children[0]
+        assert "redeemer == \"action0\"" in generate_haskell_code(function, {})
+        assert estimate_costs(function)["paths"]
+    function = ir.children[0]
+    assert evaluate(function, ScriptContext(redeemer="action0"))
+    assert evaluate(function, ScriptContext(redeemer=f"action{DEPTH - 1}"))
+    assert not evaluate(function, ScriptContext(redeemer="missing"))
+    tagged = generate_haskell_code(function, {}, options={"opt_level": 1, "dispatch": "tagged"})
+    assert tagged.count(" -> (") == DEPTH
+    report = estimate_costs(function, options={"dispatch": "tagged"})
+    assert len(report["paths"]) == DEPTH
+
+def test_deep_elif_chain_lowers_to_uplc():
+    function = optimize(_compile_staged(_elif_chain(DEPTH)), 2).children[0]
+    program, errors = lower_validator(function, options={"opt_level": 2})
+    assert not errors
+    flat = program.flat()
+    assert Program.from_flat(flat).flat() == flat
+    assert run_validator(program, *validator_arguments(ScriptContext(redeemer=f"action{DEPTH - 1}"))).ok
+    assert not run_validator(program, *validator_arguments(ScriptContext(redeemer="missing"))).ok
+
+def test_deep_nested_ifs_compile():
+    ir = _compile(_nested_ifs(DEPTH))
+    optimized = optimize(ir, 2)
+    assert "txSignedBy" in generate_haskell_code(optimized.children[0], {}, options={"opt_level": 2})
+
+# The cycle collector is paused while timing: its full collections rescan every
+# live node, which would make the measurement grow with the tree rather than
+# with the work the pass itself does.
+def _best_seconds(run, repeat=2):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Eight runs at one depth against one run at eight times the depth: when the
+# work per level is constant both take about as long, and when it grows with
+# the depth the deep run takes about eight times longer. Timing the same amount
+# of work on both sides keeps short runs from skewing the ratio.
+def test_nested_ifs_lower_in_linear_time():
+    timings = []
+    for depth, runs in ((1000, 8), (8000, 1)):
+        function = optimize(_compile_staged(_nested_ifs(depth)), 2).children[0]
+
+        def lower():
+            for _ in range(runs):
+                lower_validator(function, options={"opt_level": 2})
+
+        def emit():
+            for _ in range(runs):
+                generate_haskell_code(function, {}, options={"opt_level": 2})
+
+        timings.append((_best_seconds(lower), _best_seconds(emit)))
+    for small, large in zip(*timings):
+        assert large < 1.6 * small
+
+def test_deep_and_chain_compiles_and_flattens():
+    ir = _compile(_and_chain(DEPTH))
+    function = ir.children[0]
+    code = generate_haskell_code(function, {})
+    assert code.count("txSignedBy") == DEPTH + 1
+    signatories = [f"party{i}" for i in range(DEPTH + 1)]
+    assert evaluate(function, ScriptContext(signatories=signatories))
+    assert not evaluate(function, ScriptContext(signatories=signatories[1:]))
+    flat = optimize(ir, 2).children[0].children[0].children[0]
+    assert flat.node_type == "And" and len(flat.children) == DEPTH + 1
+
+def test_source_too_deep_for_python_parser_is_reported():
+    lines = ["def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:",
+             '    if pylutus_redeemer("a0"):', "        return True"]
+    for i in range(1, 20000):
+        lines += [f'    elif pylutus_redeemer("a{i}"):', "        return True"]
+    parser = PylutusParser()
+    assert parser.parse("\n".join(lines)) is None
+    assert parser.errors == ["Syntax error: contract is nested too deeply for the Python parser"]
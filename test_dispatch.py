@@ -0,0 +1,141 @@
+import pytest
+from compiler.cost import estimate_costs
+from compiler.dispatch import DispatchPlan
+from compiler.interpreter import ScriptContext, TransactionBatch, TxOut, evaluate, evaluate_batch
+from pylutus_forge import compile_contract, run_front_end
+
+SOURCE = """def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:
+    if pylutus_redeemer("release"):
+        pylutus_sig("abc123")
+        return True
+    elif pylutus_redeemer("refund"):
+        pylutus_pay("def456", 2000000)
+        return True
+    elif pylutus_redeemer("cancel") and pylutus_datum("open"):
+        return True
+    elif pylutus_redeemer("extend"):
+        return True
+    else:
+        return False
+"""
+
+FALLTHROUGH = """def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:
+    pylutus_sig("abc123")
+    if pylutus_redeemer("release"):
+        return True
+    if pylutus_redeemer("refund"):
+        if pylutus_datum("open"):
+            pylutus_pay("def456", 2000000)
+            return True
+        return False
+    return False
+"""
+
+def _function(source=SOURCE):
+    ir, _, errors = run_front_end(source)
+    assert not errors
+    return ir.children[0]
+
+def _code(source, options):
+    code, _, errors = compile_contract(source, {}, options)
+    assert not errors
+    return code
+
+def test_plan_finds_mutually_exclusive_chain():
+    function = _function()
+    assert DispatchPlan(function).chains == {}
+    plan = DispatchPlan(function, "tagged")
+    chain = plan.chain(function.children[0])
+    assert [clause.value for clause in chain.clauses] == ["release", "refund", "cancel", "extend"]
+    assert plan.tagged == {"redeemer": ["release", "refund", "cancel", "extend"]}
+    assert chain.clauses[2].rest.node_type == "DatumCheck"
+
+def test_chain_needs_invalid_default():
+    source = SOURCE.replace("        return False\n", "        pylutus_sig(\"abc123\")\n        return True\n")
+    assert DispatchPlan(_function(source), "balanced").chains == {}
+
+def test_lowering_depends_on_strategy():
+    linear = _code(SOURCE, {})
+    assert linear.count("else if redeemer ==") == 3
+    balanced = _code(SOURCE, {"opt_level": 1})
+    assert 'if redeemer < "refund" then (' in balanced
+    assert "case" not in balanced
+    tagged = _code(SOURCE, {"opt_level": 1, "dispatch": "tagged"})
+    assert "data RedeemerAction = Release | Refund | Cancel | Extend" in tagged
+    assert "PlutusTx.makeIsDataIndexed ''RedeemerAction [('Release, 0), ('Refund, 1), ('Cancel, 2), ('Extend, 3)]" in tagged
+    assert "case PlutusTx.unsafeFromBuiltinData (getRedeemer redeemer) of" in tagged
+    assert 'redeemer ==' not in tagged and 'if datum == "open" then (' in tagged
+    assert _code(SOURCE, {"opt_level": 1, "dispatch": "linear"}).count("else if redeemer ==") == 3
+
+def test_subjects_sharing_values_keep_distinct_constructors():
+    source = """def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:
+    if pylutus_redeemer("open"):
+        if pylutus_datum("open"):
+            return True
+        elif pylutus_datum("close"):
+            return True
+        elif pylutus_datum("hold"):
+            return True
+        return False
+    elif pylutus_redeemer("close"):
+        return True
+    return False
+"""
+    plan = DispatchPlan(_function(source), "tagged")
+    assert plan.tagged == {"redeemer": ["open", "close"]}
+    assert [chain.strategy for chain in plan.chains.values()] == ["tagged", "balanced"]
+    tagged = _code(source, {"opt_level": 1, "dispatch": "tagged"})
+    assert "data RedeemerAction = Open | Close" in tagged and "DatumState" not in tagged
+    assert 'if datum < "hold" then (' in tagged
+
+def test_fallthrough_blocks_are_emitted():
+    code = _code(FALLTHROUGH, {"dispatch": "linear"})
+    assert 'if redeemer == "refund" then (' in code
+    assert 'if datum == "open" then (' in code
+
+def _actions(count):
+    lines = ["def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:"]
+    for i in range(count):
+        lines += [f'    {"if" if i == 0 else "elif"} pylutus_redeemer("action{i}"):', "        return True"]
+    return "\n".join(lines + ["    else:", "        return False", ""])
+
+def test_dispatch_keeps_per_action_cost_flat():
+    function = _function(_actions(16))
+    options = {"opt_level": 1, "release": True}
+
+    def action_costs(strategy):
+        report = estimate_costs(function, options=dict(options, dispatch=strategy))
+        return [path["cpu"] for path in report["paths"] if not path["path"].endswith(("else", "default"))]
+
+    linear = action_costs("linear")
+    assert linear == sorted(linear) and linear[0] < linear[-1]
+    assert len(set(action_costs("tagged"))) == 1
+    balanced = action_costs("balanced")
+    assert max(balanced) - min(balanced) <= max(balanced) // 10
+    assert max(balanced) < max(linear) and max(action_costs("tagged")) < max(balanced)
+
+def test_interpreter_follows_chains_and_fallthrough():
+    chain = _function()
+    assert evaluate(chain, ScriptContext(signatories=["abc123"], redeemer="release"))
+    assert not evaluate(chain, ScriptContext(redeemer="release"))
+    assert evaluate(chain, ScriptContext(redeemer="cancel", datum="open"))
+    assert not evaluate(chain, ScriptContext(redeemer="cancel", datum="closed"))
+    assert not evaluate(chain, ScriptContext(redeemer="withdraw"))
+
+    fallthrough = _function(FALLTHROUGH)
+    paid = [TxOut("def456", 2000000)]
+    assert evaluate(fallthrough, ScriptContext(signatories=["abc123"], outputs=paid, redeemer="refund", datum="open"))
+    assert not evaluate(fallthrough, ScriptContext(signatories=["abc123"], outputs=paid, redeemer="refund"))
+    assert not evaluate(fallthrough, ScriptContext(outputs=paid, redeemer="refund", datum="open"))
+    assert not evaluate(fallthrough, ScriptContext(signatories=["abc123"], redeemer="cancel"))
+
+@pytest.mark.parametrize("source", [SOURCE, FALLTHROUGH])
+def test_batch_interpreter_matches_nested_blocks(source):
+    pytest.importorskip("numpy")
+    function = _function(source)
+    batch = TransactionBatch.random(
+        300, ["abc123", "def456"], datums=("open", "closed"), redeemers=("release", "refund", "cancel", "extend", "withdraw"),
+        seed=11,
+    )
+    results = evaluate_batch(function, batch)
+    assert list(results) == [evaluate(function, batch.context(row)) for row in range(len(batch))]
@@ -0,0 +1,28 @@
+import glob
+import os
+from pylutus_forge import compile_contract, load_key_map
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+EXTRA_SOURCES = [
+    "def validator(ctx):\n    if pylutus_sig('a') or pylutus_sig('b'):\n        return True\n    return False\n",
+    "def check(ctx):\n    return True\n",
+    "def validator(ctx):\n    if 1 == pylutus_sig('a'):\n        return True\n    return 1 < 2 < 3\n",
+    "def validator(ctx):\n    pylutus_pay('a', 0)\n    return pylutus_sig('a') and 5\n",
+    "def validator(ctx):\n    pylutus_pay('a', 1j)\n    return True\n",
+    "def validator(ctx):\n    pylutus_pay('a', 'lots')\n    return True\n",
+    "def validator(ctx):\n    unknown()\n    return True\n",
+    "def validator(ctx):\n    if ctx:\n        x = 1\n    return True\n",
+    "def validator(ctx)\n    return True\n",
+]
+
+def test_fused_front_end_matches_staged_pipeline():
+    key_map = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+    sources = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "tests", "*.pylutus"))):
+        with open(path) as f:
+            sources.append(f.read())
+    for source in sources + EXTRA_SOURCES:
+        staged = compile_contract(source, key_map)
+        fused = compile_contract(source, key_map, {"fused": True})
+        assert fused == staged, source
@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+from golden.run_golden import ROOT, format_results, main, run_golden, stale_goldens, structural_diff
+from pylutus_forge import collect_contracts, load_key_map
+
+KEY_MAP = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+
+def test_checked_in_goldens_match():
+    paths = collect_contracts([os.path.join(ROOT, "tests"), os.path.join(ROOT, "templates")])
+    results = run_golden(paths, KEY_MAP, jobs=2)
+    assert [r.path for r in results if r.failed] == []
+    assert stale_goldens(results, ROOT, os.path.join(ROOT, "tests", "golden")) == []
+
+def test_invalid_contracts_keep_their_diagnostics():
+    expected = {
+        "invalid_contract": [{"stage": "type_check", "line": 1, "message": "Return value must be bool at line 1"}],
+        "invalid_payment": [{"stage": "semantic", "line": 2, "message": "Payment amount must be at least 1 ADA at line 2"}],
+        "unreachable_contract": [{"stage": "semantic", "line": 2, "message": "Unreachable else clause at line 2"}],
+    }
+    for name, diagnostics in expected.items():
+        with open(os.path.join(ROOT, "tests", "golden", "tests", name + ".diagnostics.json")) as f:
+            assert json.load(f) == diagnostics
+
+def test_diff_ignores_whitespace_and_names_constructs():
+    golden = 'mkValidator ctx =\n    if redeemer == "a" && txSignedBy ctx pkh1 then (\n        True\n    )'
+    assert structural_diff(golden, golden.replace("    ", "  ").replace(" == ", "==")) is None
+    changed, first, constructs = structural_diff(golden, golden.replace('"a"', '"b"'))
+    assert changed == 1 and constructs == ["RedeemerCheck"]
+    assert first == (2, 'if redeemer == "a" && txSignedBy ctx pkh1 then (', 2, 'if redeemer == "b" && txSignedBy ctx pkh1 then (')
+    assert structural_diff(golden, golden.replace('"a"', '"a "')) is not None
+
+def test_update_then_detect_changes(tmp_path, capsys):
+    contracts = tmp_path / "tests"
+    contracts.mkdir()
+    for name in ("escrow", "invalid_payment", "multi_sig"):
+        shutil.copy(os.path.join(ROOT, "tests", name + ".pylutus"), contracts)
+    keys = os.path.join(ROOT, "pylutus_key.json")
+    args = ["--root", str(tmp_path), "--keys", keys, "-j", "1"]
+    assert main(args + [str(contracts)]) == 1
+    assert "3 missing" in capsys.readouterr().out
+    assert main(args + ["--update"]) == 0
+    assert (tmp_path / "tests" / "golden" / "tests" / "invalid_payment.diagnostics.json").exists()
+    assert main(args + [str(contracts)]) == 0
+
+    escrow = contracts / "escrow.pylutus"
+    escrow.write_text(escrow.read_text().replace("2000000", "3000000"))
+    payment = contracts / "invalid_payment.pylutus"
+    payment.write_text(payment.read_text().replace("500000", "5000000"))
+    (contracts / "multi_sig.pylutus").unlink()
+    capsys.readouterr()
+    assert main(args) == 1
+    out = capsys.readouterr().out
+    assert "escrow.pylutus: 1 tokens changed in Pay" in out
+    assert "invalid_payment.pylutus: compiled, but" in out
+    assert "multi_sig.hs: stale golden with no contract" in out
+    assert "Changed IR constructs: Pay (1)" in out
+    assert main(args + ["--update"]) == 0
+    assert not (tmp_path / "tests" / "golden" / "tests" / "multi_sig.hs").exists()
+    assert format_results([]) == "Checked 0 contracts: 0 unchanged"
@@ -0,0 +1,39 @@
+import glob
+import os
+import pytest
+from compiler.interpreter import ScriptContext, TransactionBatch, TxOut, evaluate, evaluate_batch
+from pylutus_forge import run_front_end
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def _function(name):
+    with open(os.path.join(ROOT, "tests", name + ".pylutus")) as f:
+        ir, _, errors = run_front_end(f.read())
+    assert not errors
+    return ir.children[0]
+
+def test_escrow_releases_only_with_payment():
+    escrow = _function("escrow")
+    paid = ScriptContext(outputs=[TxOut("abc123", 2000000)], datum="escrow", redeemer="release")
+    assert evaluate(escrow, paid)
+    assert not evaluate(escrow, ScriptContext(outputs=[TxOut("abc123", 1999999)], datum="escrow", redeemer="release"))
+    assert not evaluate(escrow, ScriptContext(outputs=[TxOut("abc123", 2000000)], datum="escrow", redeemer="refund"))
+
+def test_multi_sig_requires_both_signatures():
+    multi_sig = _function("multi_sig")
+    assert evaluate(multi_sig, ScriptContext(signatories=["def456", "abc123"]))
+    assert not evaluate(multi_sig, ScriptContext(signatories=["abc123"]))
+
+def test_batch_evaluation_matches_reference_interpreter():
+    pytest.importorskip("numpy")
+    names = [os.path.basename(p)[:-8] for p in glob.glob(os.path.join(ROOT, "tests", "*.pylutus"))]
+    for name in sorted(n for n in names if not n.startswith(("invalid", "unreachable"))):
+        function = _function(name)
+        batch = TransactionBatch.random(
+            500, ["abc123", "def456"], datums=("escrow", "vesting", ""), redeemers=("release", "unlock", ""),
+            amounts=(2000000, 1000000), seed=7,
+        )
+        results = evaluate_batch(function, batch)
+        assert results.shape == (500,)
+        assert results.any() or name == "payment_contract"
+        assert list(results) == [evaluate(function, batch.context(row)) for row in range(len(batch))], name
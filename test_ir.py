@@ -0,0 +1,28 @@
+import os
+from compiler.ast_parser import EMPTY_CHILDREN, PylutusParser
+from compiler.ir import FlatIR, IRKind, IRTransformer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def _escrow_ir():
+    with open(os.path.join(ROOT, "tests", "escrow.pylutus")) as f:
+        ast = PylutusParser().parse(f.read())
+    return IRTransformer().transform(ast)
+
+def _shape(node):
+    return (node.node_type, repr(node.value), node.line_no, [_shape(c) for c in node.children])
+
+def test_ir_nodes_are_slotted_and_share_empty_children():
+    ir = _escrow_ir()
+    leaf = ir.children[0].children[0].children[0].children[0]
+    assert leaf.node_type == "DatumCheck"
+    assert leaf.children is EMPTY_CHILDREN
+    assert not hasattr(leaf, "__dict__")
+
+def test_flat_ir_round_trip():
+    ir = _escrow_ir()
+    flat = FlatIR.from_tree(ir)
+    assert len(flat) == 11
+    assert flat.kind(0) is IRKind.Module
+    assert [flat.kind(i) for i in flat.children(1)][0] is IRKind.If
+    assert _shape(flat.to_tree()) == _shape(ir)
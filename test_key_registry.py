@@ -0,0 +1,45 @@
+import os
+import pickle
+from compiler.key_registry import SqliteKeyRegistry, build_registry, open_registry
+from pylutus_forge import compile_contract, load_key_map
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ALICE = "a1" * 28
+TREASURY = "7e" * 28
+
+SOURCE = """def validator(ctx: ScriptContext) -> bool:
+    if pylutus_sig("alice"):
+        pylutus_pay("treasury", 2000000)
+        return True
+    return False
+"""
+
+def _registry(tmp_path):
+    path = str(tmp_path / "parties.sqlite")
+    build_registry(path, [("alice", ALICE), ("treasury", TREASURY)] + [(f"party{i}", f"{i:056x}") for i in range(1000)])
+    return path
+
+def test_registry_lookup_and_pickling(tmp_path):
+    registry = SqliteKeyRegistry(_registry(tmp_path))
+    assert registry.lookup_many(["alice", "party999", "nobody"]) == {"alice": ALICE, "party999": f"{999:056x}"}
+    assert pickle.loads(pickle.dumps(registry)).lookup_many(["treasury"]) == {"treasury": TREASURY}
+
+def test_party_names_resolve_through_registry(tmp_path):
+    key_map = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+    options = {"registry": _registry(tmp_path)}
+    code, _, errors = compile_contract(SOURCE, key_map, options)
+    assert not errors
+    assert f'txSignedBy ctx PubKeyHash "{ALICE}"' in code
+    assert f'checkPayment ctx PubKeyHash "{TREASURY}" 2000000' in code
+
+    _, heading, errors = compile_contract(SOURCE.replace("alice", "mallory"), key_map, options)
+    assert heading == "Key resolution errors"
+    assert errors == ["Unknown party 'mallory' at line 2"]
+
+def test_open_registry_sees_a_rebuilt_file(tmp_path):
+    path = _registry(tmp_path)
+    registry = open_registry(path)
+    assert open_registry(path) is registry
+    assert registry.lookup_many(["alice"]) == {"alice": ALICE}
+    build_registry(path, [("alice", TREASURY)])
+    assert open_registry(path).lookup_many(["alice", "treasury"]) == {"alice": TREASURY}
@@ -0,0 +1,91 @@
+import json
+import os
+from compiler.cost import check_budget
+from compiler.interpreter import ScriptContext, TxOut, evaluate
+from compiler.uplc import Program
+from compiler.uplc_codegen import validator_arguments
+from compiler.uplc_eval import run_validator
+from pylutus_forge import compile_source, compile_template, load_key_map, main, prepare_ir
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+KEY_MAP = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+
+PROTOCOL = """def spend_validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:
+    if pylutus_redeemer("release") and pylutus_sig("abc123"):
+        pylutus_pay("def456", 2000000)
+        return True
+    elif pylutus_redeemer("refund") and pylutus_sig("def456"):
+        return True
+    else:
+        return False
+
+def mint_validator(ctx: ScriptContext) -> bool:
+    if pylutus_sig("abc123"):
+        pylutus_pay("def456", 1500000)
+        return True
+    return False
+"""
+
+def test_validator_names_are_checked_by_both_front_ends():
+    invalid = "def helper(ctx: ScriptContext) -> bool:\n    return True\n"
+    duplicate = ("def spend_validator(ctx: ScriptContext) -> bool:\n    return True\n\n"
+                 "def Spend_validator(ctx: ScriptContext) -> bool:\n    return True\n")
+    for fused in (False, True):
+        result = compile_source(invalid, KEY_MAP, {"fused": fused})
+        assert [d.message for d in result.diagnostics] == [
+            "Invalid function name 'helper' at line 1. Expected 'validator' or a name ending in '_validator'."]
+        result = compile_source(duplicate, KEY_MAP, {"fused": fused})
+        assert [d.message for d in result.diagnostics] == ["Duplicate validator 'Spend_validator' at line 4."]
+        ir, _, _, errors = prepare_ir(PROTOCOL, {"fused": fused})
+        assert not errors
+        assert [f.value["name"] for f in ir.children] == ["spend_validator", "mint_validator"]
+
+def test_one_haskell_module_shares_imports_keys_and_helpers():
+    code = compile_source(PROTOCOL, KEY_MAP, {"opt_level": 1, "dispatch": "tagged"}).code
+    assert code.count("import PlutusTx.Prelude") == 1
+    assert code.count("checkPayment :: ") == 1
+    assert code.count('= PubKeyHash "abc123"') == 1 and code.count('PubKeyHash "def456"') == 1
+    assert "mkSpendValidator datum redeemer ctx =" in code and "mkMintValidator ctx =" in code
+    assert "{-# INLINABLE mkSpendValidator #-}\n{-# INLINABLE mkMintValidator #-}" in code
+    assert "data SpendRedeemerAction = SpendRelease | SpendRefund" in code
+    assert "        SpendRelease -> (" in code
+
+def test_uplc_targets_give_one_script_per_validator():
+    result = compile_source(PROTOCOL, KEY_MAP, {"target": "uplc", "opt_level": 2})
+    assert sorted(result.code) == ["mint_validator", "spend_validator"]
+    assert result.stages[-1]["output_bytes"] == sum(len(code) for code in result.code.values())
+    ir, _, _, _ = prepare_ir(PROTOCOL)
+    functions = {function.value["name"]: function for function in ir.children}
+    contexts = [ScriptContext(signatories=["abc123"], outputs=[TxOut("def456", amount)], redeemer="release")
+                for amount in (1500000, 2000000)] + [ScriptContext(signatories=["def456"], redeemer="refund")]
+    for name, envelope in result.code.items():
+        program = Program.from_envelope(json.loads(envelope))
+        for ctx in contexts:
+            assert run_validator(program, *validator_arguments(ctx)).ok == evaluate(functions[name], ctx)
+
+def test_budget_and_reports_cover_every_validator():
+    result = compile_source(PROTOCOL, KEY_MAP, {"estimate": True})
+    report = result.cost
+    assert [r["validator"] for r in report["validators"]] == ["spend_validator", "mint_validator"]
+    assert report["worst_case"]["path"] == "spend_validator:if@2:then"
+    assert report["script_size"] == max(r["script_size"] for r in report["validators"])
+    errors = check_budget(report, {"cpu": 1})
+    assert errors and "worst path spend_validator:if@2:then" in errors[0]
+
+def test_validators_share_template_parameters():
+    source = PROTOCOL.replace("ctx: ScriptContext)", 'ctx: ScriptContext, *, owner: ParamStr = "abc123")')
+    source = source.replace('pylutus_sig("abc123")', "pylutus_sig(owner)")
+    template, _, errors = compile_template(source, KEY_MAP)
+    assert not errors and list(template.params) == ["owner"]
+    code, _, errors = template.instantiate({"owner": "0badc0de"})
+    assert not errors
+    assert code.count('PubKeyHash "0badc0de"') == 2 and "abc123" not in code
+
+def test_cli_writes_each_uplc_artifact(tmp_path, capsys):
+    contract = tmp_path / "protocol.pylutus"
+    contract.write_text(PROTOCOL)
+    keys = os.path.join(ROOT, "pylutus_key.json")
+    assert main([str(contract), "-o", str(tmp_path / "out"), "--keys", keys, "--target", "uplc-text"]) == 0
+    assert sorted(os.listdir(tmp_path / "out")) == ["protocol.mint_validator.uplc", "protocol.spend_validator.uplc"]
+    assert main([str(contract), "-o", str(tmp_path / "hs"), "--keys", keys]) == 0
+    assert os.listdir(tmp_path / "hs") == ["protocol.hs"]
@@ -0,0 +1,71 @@
+import random
+from benchmarks.contract_generator import HEADER, random_contract
+from compiler.ast_parser import PylutusParser
+from compiler.interpreter import ScriptContext, TxOut, evaluate
+from compiler.ir import IRTransformer, split_if
+from compiler.optimizer import optimize
+
+SOURCE = """def validator(ctx: ScriptContext) -> bool:
+    if pylutus_sig("abc123") and 1 == 1 and pylutus_sig("abc123"):
+        return True
+        pylutus_pay("def456", 2000000)
+    else:
+        return False
+    pylutus_pay("def456", 2000000)
+"""
+
+def _function(source, level):
+    ast = PylutusParser().parse(source)
+    return optimize(IRTransformer().transform(ast), level).children[0]
+
+def test_folds_constants_and_drops_unreachable_statements():
+    function = _function(SOURCE, 1)
+    assert [c.node_type for c in function.children] == ["If"]
+    test, then_branch, else_branch = split_if(function.children[0])
+    assert test.node_type == "And"
+    assert [c.node_type for c in test.children] == ["SigCheck", "SigCheck"]
+    assert [c.node_type for c in then_branch] == ["Pay"]
+    assert [c.node_type for c in else_branch] == ["Return"]
+
+def test_level_two_deduplicates_conjuncts():
+    test, _, _ = split_if(_function(SOURCE, 2).children[0])
+    assert test.node_type == "SigCheck"
+
+def test_constant_branches_are_inlined():
+    source = "def validator(ctx):\n    if 2 < 1:\n        return True\n    else:\n        pylutus_pay('def456', 2000000)\n    return True\n"
+    function = _function(source, 1)
+    assert [c.node_type for c in function.children] == ["Pay"]
+
+CONTEXTS = [ScriptContext(signatories, outputs, datum, redeemer)
+            for signatories in ([], ["k1"], ["k2", "k3"], ["k1", "k2", "k3"], ["abc123"], ["def456"])
+            for outputs in ([], [TxOut("k1", 2000000)])
+            for datum in ("a", "b", "z")
+            for redeemer in ("a", "b", "z")]
+
+def _assert_levels_agree(source):
+    base = _function(source, 0)
+    for level in (1, 2):
+        function = _function(source, level)
+        for ctx in CONTEXTS:
+            assert bool(evaluate(function, ctx)) == bool(evaluate(base, ctx)), (source, level, vars(ctx))
+
+def test_statements_after_a_returning_statement_keep_their_meaning():
+    # The then branch of the outer if ends with an if without an else, so it
+    # does not always return and the final return is not its else.
+    _assert_levels_agree(HEADER + """
+    if pylutus_sig("abc123"):
+        if pylutus_datum("a"):
+            return True
+        else:
+            return True
+        if pylutus_redeemer("b"):
+            return False
+    return pylutus_sig("def456")
+""")
+    _assert_levels_agree(HEADER + "\n    return True\n    return False\n")
+    assert [c.node_type for c in _function(HEADER + "\n    return True\n    return False\n", 1).children] == ["Return"]
+
+def test_optimization_levels_agree_on_random_contracts():
+    rng = random.Random(8)
+    for _ in range(300):
+        _assert_levels_agree(random_contract(rng))
@@ -0,0 +1,47 @@
+import json
+import os
+from compiler.profiler import Profiler, tree_shape
+from pylutus_forge import compile_contract, main
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def _source(name):
+    with open(os.path.join(ROOT, "tests", name + ".pylutus")) as f:
+        return f.read()
+
+def test_profiler_records_each_stage():
+    profiler = Profiler()
+    with profiler.contract("complex"):
+        code, _, errors = compile_contract(_source("complex_contract"), {}, {"opt_level": 1}, profiler)
+    assert not errors
+    stages = {stage["name"]: stage for stage in profiler.contracts[0]["stages"]}
+    assert list(stages) == ["parse", "type_check", "semantic", "ir", "resolve_keys", "optimize", "codegen"]
+    assert stages["parse"]["nodes"] > 0 and stages["ir"]["depth"] > 1
+    assert stages["codegen"]["output_bytes"] == len(code.encode("utf-8"))
+    assert all("peak_bytes" in stage for stage in stages.values())
+    assert compile_contract(_source("complex_contract"), {}, {"opt_level": 1})[0] == code
+
+def test_chrome_trace_has_one_event_per_stage():
+    profiler = Profiler(memory=False)
+    with profiler.contract("easy"):
+        compile_contract(_source("easy_contract"), {}, {"fused": True}, profiler)
+    events = profiler.chrome_trace()["traceEvents"]
+    assert [e["name"] for e in events if e["ph"] == "X"] == ["front_end", "resolve_keys", "codegen"]
+    assert all(e["dur"] >= 0 and e["ts"] >= 0 for e in events if e["ph"] == "X")
+
+def test_stage_outside_contract_and_tree_shape():
+    profiler = Profiler(memory=False)
+    with profiler.stage("parse") as record:
+        pass
+    assert record.seconds >= 0 and record.peak_bytes is None
+    assert profiler.contracts[0]["contract"] == "<source>"
+    assert tree_shape(None) == (0, 0)
+
+def test_main_writes_profile_and_trace(tmp_path):
+    profile = tmp_path / "profile.json"
+    trace = tmp_path / "trace.json"
+    out_dir = tmp_path / "build"
+    assert main([os.path.join(ROOT, "tests", "easy_contract.pylutus"), "-o", str(out_dir), "-j", "1",
+                 "--profile", str(profile), "--trace", str(trace)]) == 0
+    assert json.loads(profile.read_text())["contracts"][0]["contract"].endswith("easy_contract.pylutus")
+    assert any(e["name"] == "codegen" for e in json.loads(trace.read_text())["traceEvents"])
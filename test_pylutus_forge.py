@@ -0,0 +1,43 @@
+import os
+from pylutus_forge import collect_contracts, compile_batch, load_key_map, main
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def test_batch_writes_one_output_per_contract(tmp_path):
+    paths = collect_contracts([os.path.join(ROOT, "tests", "escrow.pylutus"), os.path.join(ROOT, "templates")])
+    key_map = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+    results = compile_batch(paths, str(tmp_path), key_map, jobs=2)
+    assert all(not result.errors for result in results)
+    assert (tmp_path / "tests" / "escrow.hs").exists()
+    assert (tmp_path / "templates" / "escrow.hs").exists()
+    assert (tmp_path / "templates" / "multi_sig.hs").exists()
+
+def test_batch_reports_failures_with_nonzero_exit(tmp_path, capsys):
+    pattern = os.path.join(ROOT, "tests", "invalid_*.pylutus")
+    code = main([pattern, "-o", str(tmp_path), "--keys", os.path.join(ROOT, "pylutus_key.json")])
+    out = capsys.readouterr().out
+    assert code == 1
+    assert "Return value must be bool at line 1" in out
+    assert "Payment amount must be at least 1 ADA at line 2" in out
+    assert "Compiled 0 of 2 contracts, 2 failed" in out
+
+def test_emitter_streams_and_tracks_helpers():
+    import io
+    from pylutus_forge import emit_haskell, run_front_end
+    key_map = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+    for name, helpers in (("payment_contract", ["checkPayment"]), ("easy_contract", [])):
+        with open(os.path.join(ROOT, "tests", name + ".pylutus")) as f:
+            ir, _, errors = run_front_end(f.read())
+        assert not errors
+        out = io.StringIO()
+        emitter = emit_haskell(ir.children[0], key_map, out)
+        assert emitter.helpers == helpers
+        assert ("checkPayment ::" in out.getvalue()) == bool(helpers)
+
+def test_single_file_mode_writes_output_contract(tmp_path, monkeypatch, capsys):
+    import shutil
+    shutil.copy(os.path.join(ROOT, "pylutus_key.json"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    assert main([os.path.join(ROOT, "tests", "easy_contract.pylutus"), "-q"]) == 0
+    assert "Compiled to output_contract.hs" in capsys.readouterr().out
+    assert "txSignedBy ctx PubKeyHash \"abc123\"" in (tmp_path / "output_contract.hs").read_text()
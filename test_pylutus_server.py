@@ -0,0 +1,56 @@
+import io
+import json
+from pylutus_server import LanguageServer
+
+def _frame(payload):
+    body = json.dumps(payload).encode("utf-8")
+    return f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+
+def _messages(data):
+    reader = io.BytesIO(data)
+    server = LanguageServer(reader, io.BytesIO())
+    messages = []
+    while True:
+        message = server.read_message()
+        if message is None:
+            return messages
+        messages.append(message)
+
+def test_server_publishes_diagnostics_for_edits():
+    uri = "file:///contract.pylutus"
+    requests = [
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}},
+        {"jsonrpc": "2.0", "method": "textDocument/didOpen",
+         "params": {"textDocument": {"uri": uri, "text": "def validator(ctx):\n    return 42\n"}}},
+        {"jsonrpc": "2.0", "method": "textDocument/didChange",
+         "params": {"textDocument": {"uri": uri}, "contentChanges": [{"text": "def validator(ctx):\n    return True\n"}]}},
+        {"jsonrpc": "2.0", "id": 2, "method": "shutdown"},
+        {"jsonrpc": "2.0", "method": "exit"},
+    ]
+    out = io.BytesIO()
+    server = LanguageServer(io.BytesIO(b"".join(_frame(r) for r in requests)), out)
+    assert server.serve() == 0
+
+    messages = _messages(out.getvalue())
+    assert messages[0]["result"]["capabilities"]["textDocumentSync"]["change"] == 1
+    first, second = [m["params"] for m in messages if m.get("method") == "textDocument/publishDiagnostics"]
+    assert first["diagnostics"][0]["message"] == "Return value must be bool at line 1"
+    assert first["diagnostics"][0]["range"]["start"]["line"] == 0
+    assert second["diagnostics"] == []
+    assert messages[-1] == {"jsonrpc": "2.0", "id": 2, "result": None}
+
+def test_handler_errors_answer_the_request_and_keep_serving(capsys):
+    requests = [
+        {"jsonrpc": "2.0", "method": "textDocument/didOpen", "params": {}},
+        {"jsonrpc": "2.0", "id": 1, "method": "pylutus/generateHaskell", "params": {}},
+        {"jsonrpc": "2.0", "id": 2, "method": "shutdown"},
+        {"jsonrpc": "2.0", "method": "exit"},
+    ]
+    out = io.BytesIO()
+    server = LanguageServer(io.BytesIO(b"".join(_frame(r) for r in requests)), out)
+    assert server.serve() == 0
+
+    failed, shutdown = _messages(out.getvalue())
+    assert failed["id"] == 1 and failed["error"]["code"] == -32603
+    assert shutdown == {"jsonrpc": "2.0", "id": 2, "result": None}
+    assert "textDocument/didOpen failed" in capsys.readouterr().err
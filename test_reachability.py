@@ -0,0 +1,122 @@
+import os
+import random
+from benchmarks.contract_generator import random_contract
+from compiler.bdd import BDD, FALSE, TRUE
+from compiler.interpreter import ScriptContext, TxOut, evaluate
+from compiler.optimizer import prune_unreachable
+from pylutus_forge import compile_source, load_key_map, main, prepare_ir
+from pylutus_server import LanguageServer, SEVERITY_WARNING
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+KEY_MAP = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+HEADER = "def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:\n"
+
+SOURCE = HEADER + """    if pylutus_redeemer("release") and pylutus_redeemer("refund"):
+        return True
+    elif pylutus_redeemer("release") and pylutus_sig("abc123"):
+        pylutus_pay("def456", 2000000)
+        return True
+    elif pylutus_sig("abc123") and pylutus_redeemer("release"):
+        return True
+    elif datum > 3:
+        if 3 < datum:
+            return pylutus_sig("def456")
+        return False
+    return False
+"""
+
+WARNINGS = [
+    "Unreachable branch at line 2: its condition can never hold",
+    "Unreachable branch at line 7: earlier conditions already cover it",
+    "Redundant condition at line 10: it always holds there",
+]
+
+def test_bdd_nodes_are_canonical():
+    bdd = BDD()
+    a, b, c = bdd.variable(0), bdd.variable(1), bdd.variable(2)
+    assert bdd.disjoin(bdd.conjoin(a, b), bdd.conjoin(a, c)) == bdd.conjoin(a, bdd.disjoin(b, c))
+    assert bdd.negate(bdd.negate(b)) == b
+    assert bdd.conjoin(a, bdd.negate(a)) == FALSE and bdd.disjoin(a, bdd.negate(a)) == TRUE
+    size = len(bdd)
+    bdd.conjoin(a, bdd.disjoin(b, c))
+    assert len(bdd) == size
+
+def test_unreachable_and_redundant_branches_are_warnings():
+    for fused in (False, True):
+        result = compile_source(SOURCE, KEY_MAP, {"fused": fused})
+        assert result.ok
+        assert [(d.stage, d.severity, d.message, d.line) for d in result.diagnostics] == [
+            ("semantic", "warning", message, int(message.split()[4].rstrip(":"))) for message in WARNINGS]
+
+def test_optimizer_prunes_what_the_analysis_proves():
+    base, _, _, _ = prepare_ir(SOURCE)
+    for level in (1, 2):
+        ir, _, _, _ = prepare_ir(SOURCE, {"opt_level": level})
+        function = ir.children[0]
+        lines = []
+        pending = list(function.children)
+        while pending:
+            node = pending.pop()
+            if node.node_type == "If":
+                lines.append(node.line_no)
+                pending.extend(node.children[1:])
+        assert sorted(lines) == [4, 9]
+        for datum in ("x", 2, 5):
+            for redeemer in ("release", "refund", "other"):
+                for signatories in ([], ["abc123"], ["def456"]):
+                    for outputs in ([], [TxOut("def456", 2000000)]):
+                        ctx = ScriptContext(signatories, outputs, datum, redeemer)
+                        assert bool(evaluate(function, ctx)) == bool(evaluate(base.children[0], ctx))
+    code = compile_source(SOURCE, KEY_MAP, {"opt_level": 1, "dispatch": "tagged"}).code
+    assert "Refund" not in code
+
+def test_pruning_keeps_the_meaning_of_random_contracts():
+    contexts = [ScriptContext(signatories, outputs, datum, redeemer)
+                for signatories in ([], ["k1"], ["k2", "k3"], ["k1", "k2", "k3"])
+                for outputs in ([], [TxOut("k1", 2000000)])
+                for datum in ("a", "b", "z")
+                for redeemer in ("a", "b", "z")]
+    rng = random.Random(21)
+    for _ in range(500):
+        source = random_contract(rng, 4)
+        base, _, _, errors = prepare_ir(source)
+        if errors:
+            continue
+        pruned = prune_unreachable(base).children[0]
+        optimized = [prepare_ir(source, {"opt_level": level})[0].children[0] for level in (1, 2)]
+        for ctx in contexts:
+            expected = bool(evaluate(base.children[0], ctx))
+            assert bool(evaluate(pruned, ctx)) == expected, (source, vars(ctx))
+            assert [bool(evaluate(function, ctx)) for function in optimized] == [expected, expected], (source, vars(ctx))
+
+def test_template_parameters_stay_symbolic():
+    source = HEADER.replace("ctx: ScriptContext)", 'ctx: ScriptContext, *, action: ParamStr = "release")') + """    if pylutus_redeemer("release"):
+        return True
+    elif pylutus_redeemer(action) and pylutus_redeemer("refund"):
+        return True
+    return False
+"""
+    result = compile_source(source, KEY_MAP, {"opt_level": 2})
+    assert result.ok and result.diagnostics == []
+
+def test_long_guard_chains_stay_linear():
+    branches = [f'    {"if" if i == 0 else "elif"} pylutus_redeemer("action{i}") and pylutus_sig("abc123"):\n        return True\n'
+                for i in range(2000)]
+    source = HEADER + "".join(branches) + '    elif pylutus_sig("abc123") and pylutus_redeemer("action0"):\n        return True\n    return False\n'
+    for fused in (False, True):
+        result = compile_source(source, KEY_MAP, {"fused": fused, "opt_level": 1})
+        assert [d.message for d in result.diagnostics] == ["Unreachable branch at line 4002: earlier conditions already cover it"]
+        assert "action0" in result.code and result.code.count("abc123") == 1
+
+def test_warnings_reach_the_cli_and_the_language_server(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    contract = tmp_path / "guards.pylutus"
+    contract.write_text(SOURCE)
+    keys = os.path.join(ROOT, "pylutus_key.json")
+    assert main([str(contract), "--keys", keys, "-q"]) == 0
+    assert capsys.readouterr().out == "Semantic warnings:\n" + "".join(w + "\n" for w in WARNINGS) + "Compiled to output_contract.hs\n"
+    assert main([str(tmp_path), "--keys", keys, "-o", "out"]) == 0
+    assert f"{contract}: Semantic warnings:\n    {WARNINGS[0]}" in capsys.readouterr().out
+    diagnostics, ir = LanguageServer(None, None).diagnostics(SOURCE)
+    assert ir is not None
+    assert [(d["severity"], d["range"]["start"]["line"]) for d in diagnostics] == [(SEVERITY_WARNING, 1), (SEVERITY_WARNING, 6), (SEVERITY_WARNING, 9)]
@@ -0,0 +1,93 @@
+from compiler.cost import estimate_costs
+from compiler.fused import FusedFrontEnd
+from compiler.ir import IRNode, hash_cons
+from compiler.optimizer import optimize
+from pylutus_forge import compile_contract, compile_template, run_front_end
+
+SOURCE = """def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:
+    if pylutus_redeemer("release") and pylutus_sig("owner") and pylutus_sig("arbiter"):
+        pylutus_pay("owner", 2000000)
+        return True
+    elif pylutus_redeemer("refund") and pylutus_sig("owner") and pylutus_sig("arbiter"):
+        pylutus_sig("owner")
+        return True
+    else:
+        return False
+"""
+
+def _function(options=None):
+    ir, _, errors = run_front_end(SOURCE, options)
+    assert not errors
+    return ir.children[0]
+
+def _tests(function):
+    release = function.children[0]
+    refund = release.children[-1]
+    return release.children[0], refund.children[0]
+
+def test_identical_expressions_are_one_node():
+    for options in ({}, {"fused": True}):
+        release, refund = _tests(_function(options))
+        assert release is not refund
+        assert release.children[1] is refund.children[1]
+        assert release.children[2] is refund.children[2]
+        assert release.children[1].line_no == 2
+
+def test_fused_and_staged_front_ends_share_alike():
+    staged = _tests(_function())
+    fused = _tests(FusedFrontEnd().compile(SOURCE).children[0])
+    assert [test.children[1].line_no for test in staged] == [test.children[1].line_no for test in fused] == [2, 2]
+
+def test_hash_cons_reshares_rebuilt_expressions():
+    sig = IRNode("SigCheck", value="owner", line_no=2)
+    copy = IRNode("SigCheck", value="owner", line_no=5)
+    root = IRNode("And", children=[sig, IRNode("And", children=[copy, IRNode("Bool", value=True)])])
+    shared = hash_cons(root)
+    assert shared.children[0] is shared.children[1].children[0]
+    release, refund = _tests(optimize(run_front_end(SOURCE)[0], 2).children[0])
+    assert release.children[1] is refund.children[1]
+
+def test_shared_conditions_are_let_bound_from_o1():
+    plain = compile_contract(SOURCE, {})[0]
+    assert "let" not in plain and "pkh1" not in plain
+    code = compile_contract(SOURCE, {}, {"opt_level": 1, "dispatch": "linear"})[0]
+    assert "pkh1 :: PubKeyHash\npkh1 = PubKeyHash \"owner\"\n" in code
+    assert "    let\n        cond1 = txSignedBy ctx pkh1\n        cond2 = txSignedBy ctx PubKeyHash \"arbiter\"\n    in\n" in code
+    assert 'if redeemer == "release" && cond1 && cond2 then (' in code
+    assert 'traceIfFalse "Signature check" cond1' in code
+    assert "checkPayment ctx pkh1 2000000" in code
+
+def test_shared_conditions_are_costed_once_per_path():
+    options = {"opt_level": 1, "dispatch": "linear", "release": True}
+    function = _function()
+    shared = {p["path"]: p["cpu"] for p in estimate_costs(function, options=options)["paths"]}
+    function = hash_cons(function)
+    unshared_ir = IRNode(function.node_type, function.value, [_unshare(child) for child in function.children], function.line_no)
+    unshared = {p["path"]: p["cpu"] for p in estimate_costs(unshared_ir, options=options)["paths"]}
+    assert shared["if@5:then"] < unshared["if@5:then"]
+    assert shared["if@2:then"] == unshared["if@2:then"]
+    plain = dict(options, opt_level=0)
+    assert estimate_costs(function, options=options)["script_size"] < estimate_costs(function, options=plain)["script_size"]
+
+def _unshare(node):
+    stack = [(node, None, None)]
+    root = None
+    while stack:
+        node, parent, position = stack.pop()
+        copy = IRNode(node.node_type, node.value, list(node.children), node.line_no)
+        if parent is None:
+            root = copy
+        else:
+            parent.children[position] = copy
+        stack.extend((child, copy, index) for index, child in enumerate(node.children))
+    return root
+
+def test_template_instances_keep_shared_parameter_nodes():
+    source = SOURCE.replace('pylutus_sig("owner")', "pylutus_sig(owner)").replace(
+        "ctx: ScriptContext)", 'ctx: ScriptContext, *, owner: ParamStr = "owner")')
+    template, _, errors = compile_template(source, {})
+    assert not errors
+    ir, _ = template.template.instantiate({"owner": "alice"})
+    release, refund = _tests(ir.children[0])
+    assert release.children[1] is refund.children[1]
+    assert release.children[1].value == "alice"
@@ -0,0 +1,112 @@
+import json
+import os
+import pickle
+from compiler.ast_parser import ParamStr, PylutusParser
+from compiler.fused import FusedFrontEnd
+from pylutus_forge import compile_contract, compile_template, load_key_map, main, write_instances
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+KEY_MAP = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+
+def _source(name):
+    with open(os.path.join(ROOT, "templates", name + ".pylutus")) as f:
+        return f.read()
+
+def _template(name, options=None):
+    template, _, errors = compile_template(_source(name), KEY_MAP, options)
+    assert not errors
+    return template
+
+def test_defaults_match_plain_compile():
+    for name in ("escrow", "multi_sig"):
+        code, _, _ = _template(name).instantiate()
+        assert code == compile_contract(_source(name), KEY_MAP)[0]
+
+def test_instance_matches_compiling_substituted_source():
+    template = _template("escrow", {"opt_level": 1})
+    code, _, errors = template.instantiate({"beneficiary": "f00d", "amount": 5000000})
+    assert not errors
+    source = _source("escrow").replace("pylutus_pay(beneficiary, amount)", 'pylutus_pay("f00d", 5000000)')
+    assert code == compile_contract(source, KEY_MAP, {"opt_level": 1})[0]
+    assert template.template.ir.children[0].value["params"]["amount"] == 2000000
+
+def test_instances_share_unchanged_subtrees():
+    template = _template("escrow")
+    ir, _ = template.template.instantiate({"amount": 3000000})
+    original = template.template.ir.children[0].children[0]
+    instance = ir.children[0].children[0]
+    assert instance is not original
+    assert instance.children[0] is original.children[0]
+    assert instance.children[1].value == {"addr": "abc123", "amount": 3000000}
+    assert "params" not in ir.children[0].value
+
+def test_parameters_with_equal_defaults_are_not_merged():
+    source = _source("multi_sig").replace('"def456"', '"abc123"')
+    template, _, _ = compile_template(source, KEY_MAP, {"opt_level": 2})
+    code, _, _ = template.instantiate({"cosigner": "def456"})
+    assert 'txSignedBy ctx PubKeyHash "abc123"' in code
+    assert 'txSignedBy ctx PubKeyHash "def456"' in code
+
+def test_instantiate_many_streams_results():
+    template = _template("multi_sig")
+    consumed = []
+
+    def param_sets():
+        for i in range(3):
+            consumed.append(i)
+            yield {"owner": f"owner{i}"}
+
+    results = template.instantiate_many(param_sets())
+    values, code, _, errors = next(results)
+    assert consumed == [0] and values == {"owner": "owner0"} and not errors
+    assert 'PubKeyHash "owner0"' in code
+    assert [values["owner"] for values, _, _, _ in results] == ["owner1", "owner2"]
+
+def test_invalid_parameter_values_are_reported():
+    template = _template("escrow")
+    assert template.instantiate({"payee": "x"})[2] == ["Unknown template parameter 'payee'"]
+    assert template.instantiate({"amount": "5"})[2] == ["Template parameter 'amount' must be an integer"]
+    assert template.instantiate({"amount": True})[2] == ["Template parameter 'amount' must be an integer"]
+    code, heading, errors = template.instantiate({"amount": 999999})
+    assert code is None and heading == "Parameter errors"
+    assert errors == ["Payment amount must be at least 1 ADA at line 3"]
+
+def test_invalid_parameter_declarations():
+    sources = [
+        'def validator(ctx: ScriptContext, *, owner: str = "abc") -> bool:\n    return True\n',
+        'def validator(ctx: ScriptContext, *, owner: ParamStr = 5) -> bool:\n    return True\n',
+        'def validator(ctx: ScriptContext, *, amount: ParamInt) -> bool:\n    return True\n',
+    ]
+    for source in sources:
+        parser = PylutusParser()
+        parser.parse(source)
+        fused = FusedFrontEnd()
+        fused.compile(source)
+        assert parser.errors == fused.parse_errors
+        assert parser.errors[0].startswith("Invalid template parameter")
+    source = 'def validator(ctx: ScriptContext, *, amount: ParamInt = 1) -> bool:\n    pylutus_sig(amount)\n    return True\n'
+    parser = PylutusParser()
+    parser.parse(source)
+    assert parser.errors == ["Invalid pylutus_sig call at line 2."]
+
+def test_param_values_pickle():
+    param = pickle.loads(pickle.dumps(ParamStr("abc123", "owner")))
+    assert param == "abc123" and param.name == "owner"
+
+def test_cli_writes_one_file_per_parameter_set(tmp_path):
+    params = tmp_path / "params.jsonl"
+    params.write_text(json.dumps({"beneficiary": "f00d"}) + "\n\n" + json.dumps({"amount": 1}) + "\n")
+    template = os.path.join(ROOT, "templates", "escrow.pylutus")
+    keys = os.path.join(ROOT, "pylutus_key.json")
+    assert main([template, "--params", str(params), "-o", str(tmp_path / "out"), "--keys", keys]) == 1
+    assert 'PubKeyHash "f00d"' in (tmp_path / "out" / "escrow_1.hs").read_text()
+    assert not (tmp_path / "out" / "escrow_2.hs").exists()
+
+def test_instance_results_are_named_by_parameter_set(tmp_path):
+    params = tmp_path / "params.jsonl"
+    params.write_text(json.dumps({"beneficiary": "f00d"}) + "\n" + json.dumps({"amount": 1}) + "\n")
+    path = os.path.join(ROOT, "templates", "escrow.pylutus")
+    for options in ({}, {"target": "uplc"}):
+        results = write_instances(_source("escrow"), path, str(params), str(tmp_path / "out"), KEY_MAP, options)
+        assert [result.path for result in results] == [f"{path}[1]", f"{path}[2]"]
+        assert results[0].out_path and not results[0].errors and results[1].errors
@@ -0,0 +1,118 @@
+import glob
+import json
+import os
+import random
+import re
+from compiler.interpreter import Interpreter, ScriptContext, TxOut
+from compiler.uplc import Program, constr, data_bytes, data_int, data_list, decode_data, encode_data, term_size
+from compiler.uplc_codegen import lower_validator, validator_arguments
+from compiler.uplc_eval import run_validator
+from pylutus_forge import compile_source, load_key_map, main, prepare_ir
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+KEY_MAP = load_key_map(os.path.join(ROOT, "pylutus_key.json"))
+ALWAYS_SUCCEEDS = "4e4d01000033222220051200120011"
+
+def _sources():
+    paths = glob.glob(os.path.join(ROOT, "tests", "*.pylutus")) + glob.glob(os.path.join(ROOT, "templates", "*.pylutus"))
+    sources = {}
+    for path in sorted(paths):
+        with open(path) as f:
+            source = f.read()
+        if not prepare_ir(source)[3]:
+            sources[os.path.basename(path)] = source
+    return sources
+
+def _lower(source, options):
+    ir, parties, _, errors = prepare_ir(source, options)
+    assert not errors
+    program, errors = lower_validator(ir.children[0], parties, options)
+    assert not errors
+    return ir.children[0], program
+
+def test_known_script_round_trips():
+    envelope = {"type": "PlutusScriptV1", "description": "", "cborHex": ALWAYS_SUCCEEDS}
+    program = Program.from_envelope(envelope)
+    assert program.text().startswith("(program 1.0.0 [")
+    assert program.envelope() == envelope
+    assert program.script_hash() == "67f33146617a5e61936081db3b2117cbf59bd2123748f58ac9678656"
+    assert run_validator(program, data_int(0), data_int(0), constr(0)).ok
+
+def test_data_uses_ledger_cbor_encoding():
+    vectors = {
+        "d87980": constr(0),
+        "d905009f01ff": constr(7, data_int(1)),
+        "d8668218c89f00ff": constr(200, data_int(0)),
+        "80": data_list([]),
+        "c249010000000000000000": data_int(1 << 64),
+        "5f5840" + "00" * 64 + "4100ff": data_bytes(bytes(65)),
+    }
+    for hex_text, data in vectors.items():
+        assert encode_data(data).hex() == hex_text
+        assert decode_data(bytes.fromhex(hex_text)) == data
+
+def test_scripts_agree_with_interpreter():
+    rng = random.Random(7)
+    for name, source in _sources().items():
+        strings = sorted(set(re.findall(r'"([^"]*)"', source))) + ["other"]
+        amounts = sorted(set(int(a) for a in re.findall(r"\d{6,}", source))) + [1]
+        for options in ({"opt_level": 0}, {"opt_level": 2}, {"opt_level": 2, "release": True}):
+            function, program = _lower(source, options)
+            interpreter = Interpreter()
+            for _ in range(60):
+                ctx = ScriptContext(signatories=rng.sample(strings, rng.randint(0, min(3, len(strings)))),
+                                    outputs=[TxOut(rng.choice(strings), rng.choice(amounts)) for _ in range(rng.randint(0, 2))],
+                                    datum=rng.choice(strings), redeemer=rng.choice(strings))
+                result = run_validator(program, *validator_arguments(ctx))
+                assert result.ok == bool(interpreter.run(function, ctx)), (name, options, ctx.__dict__)
+
+def test_flat_encoding_round_trips_and_shrinks_with_optimization():
+    for name, source in _sources().items():
+        _, unoptimized = _lower(source, {"opt_level": 0})
+        _, optimized = _lower(source, {"opt_level": 2})
+        for program in (unoptimized, optimized):
+            flat = program.flat()
+            assert Program.from_flat(flat).flat() == flat
+            assert Program.from_envelope(program.envelope()).flat() == flat
+        assert term_size(optimized.term) < term_size(unoptimized.term), name
+        assert len(optimized.flat()) < len(unoptimized.flat()), name
+
+def test_traces_are_logged_unless_release():
+    with open(os.path.join(ROOT, "tests", "escrow.pylutus")) as f:
+        source = f.read()
+    unpaid = validator_arguments(ScriptContext(datum="escrow", redeemer="release"))
+    for level in (0, 2):
+        _, program = _lower(source, {"opt_level": level})
+        result = run_validator(program, *unpaid)
+        assert not result.ok and "Payment failed" in result.logs
+        _, program = _lower(source, {"opt_level": level, "release": True})
+        result = run_validator(program, *unpaid)
+        assert not result.ok and result.logs == []
+        assert "Payment failed" not in program.text()
+
+def test_unsupported_comparisons_are_codegen_diagnostics():
+    header = "def validator(datum: Datum, redeemer: Redeemer, ctx: ScriptContext) -> bool:\n"
+    for condition, message in (("ctx < datum", "The script context cannot be ordered"), ("datum < 3", "Cannot compare 3")):
+        result = compile_source(header + f"    if {condition}:\n        return True\n    return False\n", KEY_MAP, {"target": "uplc"})
+        assert [(d.stage, d.line) for d in result.diagnostics] == [("codegen", 2)]
+        assert result.diagnostics[0].message.startswith(message)
+
+def test_fractional_payment_amounts_are_codegen_diagnostics():
+    source = "def validator(ctx: ScriptContext) -> bool:\n    pylutus_pay('def456', 1.5e6)\n    return True\n"
+    for target in ("uplc", "uplc-text"):
+        result = compile_source(source, KEY_MAP, {"target": target})
+        assert not result.ok
+        assert [(d.stage, d.message, d.line) for d in result.diagnostics] == [
+            ("codegen", "UPLC supports integer payment amounts only at line 2", 2)]
+
+def test_cli_writes_text_envelope(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    keys = os.path.join(ROOT, "pylutus_key.json")
+    assert main([os.path.join(ROOT, "tests", "multi_sig.pylutus"), "--keys", keys, "--target", "uplc", "-O2", "-q"]) == 0
+    assert capsys.readouterr().out == "Compiled to output_contract.plutus\n"
+    with open(tmp_path / "output_contract.plutus") as f:
+        program = Program.from_envelope(json.load(f))
+    accepted = validator_arguments(ScriptContext(signatories=["abc123", "def456"]))
+    assert run_validator(program, *accepted).ok
+    assert main([os.path.join(ROOT, "tests"), "--keys", keys, "--target", "uplc-text", "-o", "out", "-j", "1"]) == 1
+    assert (tmp_path / "out" / "escrow.uplc").read_text().startswith("(program 1.0.0 (lam datum")
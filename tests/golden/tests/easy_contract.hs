@@ -0,0 +1,9 @@
+-- Auto-generated by Pylutus Forge
+{-# INLINABLE mkValidator #-}
+import PlutusTx.Prelude
+import Plutus.V1.Ledger.Api
+mkValidator :: ScriptContext -> Bool
+mkValidator ctx =
+    traceIfFalse "Signature check" (txSignedBy ctx PubKeyHash "abc123")
+    traceIfFalse "Return" True
+    traceIfFalse "Valid" True
\ No newline at end of file
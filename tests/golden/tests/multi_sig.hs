@@ -0,0 +1,12 @@
+-- Auto-generated by Pylutus Forge
+{-# INLINABLE mkValidator #-}
+import PlutusTx.Prelude
+import Plutus.V1.Ledger.Api
+mkValidator :: Datum -> Redeemer -> ScriptContext -> Bool
+mkValidator datum redeemer ctx =
+    if txSignedBy ctx PubKeyHash "abc123" && txSignedBy ctx PubKeyHash "def456" then (
+        traceIfFalse "Return" True
+        traceIfFalse "Valid" True
+    ) else (
+        traceIfFalse "Invalid" False
+    )
\ No newline at end of file